@@ -0,0 +1,56 @@
+# src/api/endpoints/metrics.py
+"""
+此模块定义了运行指标相关的API端点。
+提供数据获取执行器的调用统计、各上游接口的熔断状态和自适应并发上限、数据库连接池的使用情况和数据新鲜度，
+便于观察超时、卡住的请求、被熔断的接口、数据源能承受的并发数、连接池是否耗尽以及落后的代码数。
+Authors: hovi.hyw & AI
+Date: 2026-10-18
+"""
+
+from fastapi import APIRouter
+
+from ...database.session import pool_stats
+from ...services.concurrency_limiter import get_concurrency_states
+from ...services.fetch_executor import get_fetch_executor
+from ...services.retry_policy import get_circuit_breaker_states
+from ...services.watermarks import freshness_report
+
+router = APIRouter()
+
+
+@router.get("/metrics/fetch")
+def get_fetch_metrics():
+    """
+    获取数据获取执行器的调用统计、熔断器状态和自适应并发上限。
+
+    Returns:
+        dict: executor 为进行中、已超时未结束、完成、失败与超时的调用次数，circuits 为各接口的熔断状态，
+            concurrency 为各接口当前的并发上限和进行中的请求数。
+    """
+    return {
+        'executor': get_fetch_executor().stats(),
+        'circuits': get_circuit_breaker_states(),
+        'concurrency': get_concurrency_states(),
+    }
+
+
+@router.get("/metrics/db")
+def get_db_metrics():
+    """
+    获取数据库连接池的使用情况。
+
+    Returns:
+        dict: 各数据库的连接池配置与当前的空闲、借出和溢出连接数。
+    """
+    return pool_stats()
+
+
+@router.get("/metrics/freshness")
+def get_freshness_metrics():
+    """
+    按入库水位目录统计股票和指数日线数据的新鲜度。
+
+    Returns:
+        dict: stock 和 index 分别为最近交易日、代码总数、已是最新和落后的代码数、最近一次获取失败的代码数。
+    """
+    return {kind: freshness_report(kind) for kind in ('stock', 'index')}
@@ -1,40 +1,73 @@
 # src/api/endpoints/stock.py
 """
 此模块定义了股票数据相关的API端点。
-使用FastAPI框架，提供了获取股票日线数据的接口。
+使用FastAPI框架，提供了获取股票日线数据的接口，支持后复权、前复权和不复权三种价格。
 Authors: hovi.hyw & AI
 Date: 2024-07-03
 """
 
 from datetime import date
+from typing import List, Literal, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from ..models import StockData
-from ...database.models.stock import StockDailyData
 from ...database.session import get_db
+from ...services.normalizers import frame_to_records
+from ...services.price_views import load_stock_prices
 
 router = APIRouter()
 
+AdjustMode = Literal['hfq', 'qfq', 'none']
+
+
+def _load_prices(db, symbol, start_date, end_date, adjust):
+    prices = load_stock_prices(db, symbol, start_date, end_date, adjust)
+    if prices is None:
+        raise HTTPException(status_code=404, detail="Adjust factors not found")
+    if prices.empty:
+        raise HTTPException(status_code=404, detail="Stock data not found")
+    return frame_to_records(prices)
+
 
 @router.get("/stock/{symbol}/{date}", response_model=StockData)
-def get_stock_data(symbol: str, date: date, db: Session = Depends(get_db)):
+def get_stock_data(symbol: str, date: date, adjust: AdjustMode = 'hfq', db: Session = Depends(get_db)):
     """
     获取指定股票指定日期的日线数据。
 
     Args:
         symbol (str): 股票代码。
         date (date): 日期。
+        adjust (str): 复权方式，'hfq'（后复权，默认）、'qfq'（前复权）或 'none'（不复权）。
         db (Session): 数据库会话。
 
     Returns:
         StockData: 股票日线数据。
 
     Raises:
-        HTTPException: 如果找不到股票数据，则抛出404异常。
+        HTTPException: 如果找不到股票数据或所需的复权因子，则抛出404异常。
     """
-    stock_data = db.query(StockDailyData).filter(StockDailyData.symbol == symbol, StockDailyData.date == date).first()
-    if stock_data is None:
-        raise HTTPException(status_code=404, detail="Stock data not found")
-    return stock_data
+    return _load_prices(db, symbol, date, date, adjust)[0]
+
+
+@router.get("/stock/{symbol}", response_model=List[StockData])
+def get_stock_history(symbol: str, start_date: Optional[date] = None, end_date: Optional[date] = None,
+                      adjust: AdjustMode = 'hfq', db: Session = Depends(get_db)):
+    """
+    获取指定股票一段时间的日线数据。
+
+    Args:
+        symbol (str): 股票代码。
+        start_date (date, optional): 开始日期（含），默认为最早的数据。
+        end_date (date, optional): 结束日期（含），默认为最新的数据。
+        adjust (str): 复权方式，'hfq'（后复权，默认）、'qfq'（前复权）或 'none'（不复权）。
+        db (Session): 数据库会话。
+
+    Returns:
+        List[StockData]: 按日期升序排列的股票日线数据。
+
+    Raises:
+        HTTPException: 如果找不到股票数据或所需的复权因子，则抛出404异常。
+    """
+    return _load_prices(db, symbol, start_date, end_date, adjust)
@@ -25,12 +25,62 @@ class Settings:
     Attributes:
         PROJECT_ROOT (str): 项目根目录的绝对路径。
         DATABASE_URL (str): 数据库连接 URL。
+        DB_POOL_SIZE (int): 连接池常驻连接数。
+        DB_MAX_OVERFLOW (int): 连接池允许超出常驻连接数的临时连接数。
+        DB_POOL_TIMEOUT (int): 等待空闲连接的超时时间（秒）。
+        DB_POOL_RECYCLE (int): 连接的最长使用时间（秒），超过后重新建立。
+        DB_POOL_PRE_PING (bool): 借出连接前是否检测连接可用。
+        PARTITION_YEARS_AHEAD (int): PostgreSQL 日线表预先创建的未来年度分区数。
         LOG_LEVEL (str): 日志级别。
         MAX_CSV_AGE_DAYS (int): 股票列表 CSV 文件最大有效天数。
         MAX_RETRIES (int): API 请求最大重试次数。
         RETRY_DELAY (int): API 请求重试间隔（秒）。
         GET_TIMEOUT (int): API 请求超时时间（秒）。
-        MAX_THREADS (int): 最大线程数。
+        MAX_HUNG_FETCHES (int): 已超时但仍未结束的API调用数上限。
+        THROTTLE_RETRY_DELAY (int): 被限流时的基础重试间隔（秒）。
+        MAX_RETRY_DELAY (int): 指数退避的最大间隔（秒）。
+        PARSE_ERROR_RETRIES (int): 响应无法解析（KeyError、空表格等）时的最多重试次数，仍失败时视为该代码没有数据。
+        CIRCUIT_FAILURE_THRESHOLD (int): 触发熔断的连续失败次数。
+        CIRCUIT_RESET_TIMEOUT (int): 熔断冷却时间（秒）。
+        CIRCUIT_MAX_TRIPS (int): 连续熔断次数上限，超过后冷却期间直接快速失败。
+        FETCH_CACHE_MODE (str): 响应缓存模式，off、readwrite 或 replay（只从缓存读取）。
+        FETCH_CACHE_MAX_MB (int): 响应缓存总大小上限（MB）。
+        FETCH_CACHE_TTL_* (int): 各类接口响应缓存的有效期（秒）。
+        DATA_PROVIDER (str): 数据源，akshare 或 synthetic（离线合成数据）。
+        SYNTHETIC_* : 合成数据源的规模、起始日期、延迟、错误率和随机种子。
+        MAX_THREADS (int): 最大线程数，也是每个上游接口自适应并发上限的上限。
+        FETCH_ADAPTIVE_CONCURRENCY (bool): 是否按请求结果自适应调整每个上游接口的并发请求数（AIMD）。
+        FETCH_CONCURRENCY_MIN (int): 自适应并发上限的下限。
+        FETCH_CONCURRENCY_INITIAL (int): 自适应并发上限的初始值。
+        FETCH_CONCURRENCY_DECREASE (float): 超时、限流或连续空响应时并发上限乘以的系数。
+        FETCH_SLOW_SECONDS (float): 超过该耗时的成功请求不增加并发上限。
+        FETCH_EMPTY_STREAK (int): 连续多少个空响应视为数据源过载。
+        BATCH_SIZE (int): 入库流水线每个事务包含的最大代码数。
+        PIPELINE_QUEUE_SIZE (int): 入库流水线各阶段之间队列的最大长度。
+        WRITE_BUFFER_MAX_ROWS (int): 写回缓冲区每个事务包含的最大记录数。
+        WRITE_BUFFER_FLUSH_SECONDS (float): 写回缓冲区两次写出之间的最长间隔（秒）。
+        BULK_LOAD_USE_COPY (bool): 全量下载时是否在 PostgreSQL 上使用 COPY 批量导入。
+        BULK_LOAD_MAINTENANCE_WORK_MEM (str): 批量导入后重建索引时使用的 maintenance_work_mem。
+        PLAN_MERGE_GAP_DAYS (int): 获取计划中合并为一个请求的缺口最大间隔（交易日）。
+        PLAN_MAX_WINDOWS (int): 每个代码最多生成的获取区间数，超过时合并为一个区间。
+        PLAN_AVG_REQUEST_SECONDS (float): 估算获取耗时使用的平均请求耗时（秒）。
+        ADJUST_CHECK_DAYS (int): 股票增量更新时向前重叠的已入库交易日数，用于检测历史复权价格变化，0 表示不检测。
+        ADJUST_CHECK_TOLERANCE (float): 重叠区间收盘价的相对误差超过该值时重写该股票的完整历史。
+        ADJUST_FACTOR_FETCH (bool): 是否获取后复权因子，用于读取时计算不复权和前复权价格。全量下载时随日线获取，
+            增量更新只为库中没有因子或检测到除权除息的股票获取。
+        ADJUST_FACTOR_DRIFT (float): 增量更新时由成交额/成交量估算的近似因子相对重叠区间的变化超过该值时，视为除权除息。
+        WORK_QUEUE_ENABLED (bool): 是否通过数据库任务队列在多个副本之间分配下载和更新任务。
+        WORK_QUEUE_BATCH_SIZE (int): 每次从任务队列领取的代码数。
+        WORK_QUEUE_LEASE_SECONDS (int): 领取的代码的租约时长（秒），持有者停止续约超过该时长后由其他副本重新领取。
+        WORK_QUEUE_MAX_ATTEMPTS (int): 每个代码在同一轮任务中最多被领取的次数。
+        INGEST_PROCESSES (int): 下载和更新任务的工作进程数，1 为在当前进程内用线程处理，0 为使用全部 CPU 核数。
+        INFO_SYNC_MAX_DELIST_RATIO (float): 同步基本信息时允许一次标记为退市的代码比例上限。
+        DAILY_UPDATE_MODE (str): 股票日线增量更新方式，snapshot（全市场快照）或 history（逐只请求）。
+        SNAPSHOT_READY_TIME (str): 可以使用快照生成当日日线的最早时间，格式为 HH:MM。
+        SCHEDULE_STOCK_LIST_TIME (str): 交易日下载股票列表的时间，格式为 HH:MM。
+        SCHEDULE_DAILY_UPDATE_TIME (str): 交易日收盘后增量更新日线的时间，格式为 HH:MM。
+        SCHEDULER_MAX_CONCURRENT (int): 调度器同时执行的最大任务数。
+        RATE_LIMIT_* (float): 各上游接口的每秒请求数，*_BURST 为允许的突发请求数。
 
     """
     # 基础路径配置
@@ -44,6 +94,14 @@ class Settings:
 
     # 数据库配置
     DATABASE_URL = os.getenv("DATABASE_URL")
+    # 连接池：进程内所有线程共享，最多 DB_POOL_SIZE + DB_MAX_OVERFLOW 个连接
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    # PostgreSQL 日线表按年分区，预先创建的未来年份数
+    PARTITION_YEARS_AHEAD = int(os.getenv("PARTITION_YEARS_AHEAD", 1))
 
     # 日志配置
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
@@ -62,10 +120,96 @@ class Settings:
     MAX_RETRIES = int(os.getenv("MAX_RETRIES", 3))
     RETRY_DELAY = int(os.getenv("RETRY_DELAY", 5))
     GET_TIMEOUT = int(os.getenv("GET_TIMEOUT", 10))
+    MAX_HUNG_FETCHES = int(os.getenv("MAX_HUNG_FETCHES", 8))
+    THROTTLE_RETRY_DELAY = int(os.getenv("THROTTLE_RETRY_DELAY", 15))
+    MAX_RETRY_DELAY = int(os.getenv("MAX_RETRY_DELAY", 60))
+    PARSE_ERROR_RETRIES = int(os.getenv("PARSE_ERROR_RETRIES", 1))
+
+    # 上游接口熔断配置
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 10))
+    CIRCUIT_RESET_TIMEOUT = int(os.getenv("CIRCUIT_RESET_TIMEOUT", 60))
+    CIRCUIT_MAX_TRIPS = int(os.getenv("CIRCUIT_MAX_TRIPS", 3))
+
+    # 上游接口限流（每秒请求数与突发量），所有获取线程共享；速率小于等于0表示不限流
+    RATE_LIMIT_STOCK_DAILY = float(os.getenv("RATE_LIMIT_STOCK_DAILY", 3))
+    RATE_LIMIT_STOCK_DAILY_BURST = int(os.getenv("RATE_LIMIT_STOCK_DAILY_BURST", 5))
+    RATE_LIMIT_INDEX_DAILY = float(os.getenv("RATE_LIMIT_INDEX_DAILY", 3))
+    RATE_LIMIT_INDEX_DAILY_BURST = int(os.getenv("RATE_LIMIT_INDEX_DAILY_BURST", 5))
+    RATE_LIMIT_SPOT = float(os.getenv("RATE_LIMIT_SPOT", 0.2))
+    RATE_LIMIT_SPOT_BURST = int(os.getenv("RATE_LIMIT_SPOT_BURST", 1))
+    RATE_LIMIT_DEFAULT = float(os.getenv("RATE_LIMIT_DEFAULT", 2))
+    RATE_LIMIT_DEFAULT_BURST = int(os.getenv("RATE_LIMIT_DEFAULT_BURST", 2))
+
+    # 数据源配置：akshare 为真实数据源，synthetic 为离线压测用的确定性合成数据源
+    DATA_PROVIDER = os.getenv("DATA_PROVIDER", "akshare")
+    SYNTHETIC_STOCK_COUNT = int(os.getenv("SYNTHETIC_STOCK_COUNT", 5000))
+    SYNTHETIC_INDEX_COUNT = int(os.getenv("SYNTHETIC_INDEX_COUNT", 100))
+    SYNTHETIC_START_DATE = os.getenv("SYNTHETIC_START_DATE", "19950101")
+    SYNTHETIC_LATENCY_MS = float(os.getenv("SYNTHETIC_LATENCY_MS", 200))
+    SYNTHETIC_ERROR_RATE = float(os.getenv("SYNTHETIC_ERROR_RATE", 0.01))
+    SYNTHETIC_THROTTLE_RATE = float(os.getenv("SYNTHETIC_THROTTLE_RATE", 0.0))
+    SYNTHETIC_EMPTY_RATE = float(os.getenv("SYNTHETIC_EMPTY_RATE", 0.0))
+    SYNTHETIC_SEED = int(os.getenv("SYNTHETIC_SEED", 42))
+
+    # AKShare 响应磁盘缓存（保存在 CACHE_PATH/responses 下）
+    FETCH_CACHE_MODE = os.getenv("FETCH_CACHE_MODE", "readwrite")
+    FETCH_CACHE_MAX_MB = int(os.getenv("FETCH_CACHE_MAX_MB", 2048))
+    FETCH_CACHE_TTL_HISTORY = int(os.getenv("FETCH_CACHE_TTL_HISTORY", 86400))
+    FETCH_CACHE_TTL_SPOT = int(os.getenv("FETCH_CACHE_TTL_SPOT", 600))
+    FETCH_CACHE_TTL_DEFAULT = int(os.getenv("FETCH_CACHE_TTL_DEFAULT", 3600))
 
     # 并行线程数
     MAX_THREADS = int(os.getenv("MAX_THREADS", 10))
 
+    # 自适应并发：请求正常时加性增加并发上限，超时、限流或连续空响应时乘性减少，上限不超过 MAX_THREADS
+    FETCH_ADAPTIVE_CONCURRENCY = os.getenv("FETCH_ADAPTIVE_CONCURRENCY", "true").lower() in ("1", "true", "yes")
+    FETCH_CONCURRENCY_MIN = int(os.getenv("FETCH_CONCURRENCY_MIN", 1))
+    FETCH_CONCURRENCY_INITIAL = int(os.getenv("FETCH_CONCURRENCY_INITIAL", 4))
+    FETCH_CONCURRENCY_DECREASE = float(os.getenv("FETCH_CONCURRENCY_DECREASE", 0.5))
+    FETCH_SLOW_SECONDS = float(os.getenv("FETCH_SLOW_SECONDS", GET_TIMEOUT / 2))
+    FETCH_EMPTY_STREAK = int(os.getenv("FETCH_EMPTY_STREAK", 5))
+
+    # 入库流水线配置
+    BATCH_SIZE = int(os.getenv("BATCH_SIZE", 100))
+    PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 2 * MAX_THREADS))
+    # 写回缓冲区：缓冲的记录数达到上限或距上次写出超过该秒数时提交一个事务
+    WRITE_BUFFER_MAX_ROWS = int(os.getenv("WRITE_BUFFER_MAX_ROWS", 50000))
+    WRITE_BUFFER_FLUSH_SECONDS = float(os.getenv("WRITE_BUFFER_FLUSH_SECONDS", 5))
+    # 首次全量下载时在 PostgreSQL 上使用 COPY 批量导入
+    BULK_LOAD_USE_COPY = os.getenv("BULK_LOAD_USE_COPY", "true").lower() in ("1", "true", "yes")
+    BULK_LOAD_MAINTENANCE_WORK_MEM = os.getenv("BULK_LOAD_MAINTENANCE_WORK_MEM", "1GB")
+
+    # 获取计划：合并相距不超过该交易日数的缺口，每个代码的区间数上限，估算耗时使用的平均请求耗时（秒）
+    PLAN_MERGE_GAP_DAYS = int(os.getenv("PLAN_MERGE_GAP_DAYS", 5))
+    PLAN_MAX_WINDOWS = int(os.getenv("PLAN_MAX_WINDOWS", 3))
+    PLAN_AVG_REQUEST_SECONDS = float(os.getenv("PLAN_AVG_REQUEST_SECONDS", 1.5))
+
+    # 增量更新时与已入库数据重叠的交易日数，以及判定历史复权价格变化的收盘价相对误差
+    ADJUST_CHECK_DAYS = int(os.getenv("ADJUST_CHECK_DAYS", 5))
+    ADJUST_CHECK_TOLERANCE = float(os.getenv("ADJUST_CHECK_TOLERANCE", 0.001))
+    ADJUST_FACTOR_FETCH = os.getenv("ADJUST_FACTOR_FETCH", "true").lower() in ("1", "true", "yes")
+    ADJUST_FACTOR_DRIFT = float(os.getenv("ADJUST_FACTOR_DRIFT", 0.01))
+
+    # 多副本任务队列：每次领取的代码数、租约时长（秒）和每个代码的最多领取次数
+    WORK_QUEUE_ENABLED = os.getenv("WORK_QUEUE_ENABLED", "false").lower() in ("1", "true", "yes")
+    WORK_QUEUE_BATCH_SIZE = int(os.getenv("WORK_QUEUE_BATCH_SIZE", 200))
+    WORK_QUEUE_LEASE_SECONDS = int(os.getenv("WORK_QUEUE_LEASE_SECONDS", 300))
+    WORK_QUEUE_MAX_ATTEMPTS = int(os.getenv("WORK_QUEUE_MAX_ATTEMPTS", 3))
+    # 入库工作进程数：多个进程从同一个任务队列领取代码，解析响应不再受 GIL 限制
+    INGEST_PROCESSES = int(os.getenv("INGEST_PROCESSES", 1))
+
+    # 基本信息同步：从列表中消失的代码超过该比例时视为列表不完整，不标记退市
+    INFO_SYNC_MAX_DELIST_RATIO = float(os.getenv("INFO_SYNC_MAX_DELIST_RATIO", 0.1))
+
+    # 日线增量更新方式：snapshot 为收盘后用全市场快照生成当日日线，history 为逐只请求历史数据
+    DAILY_UPDATE_MODE = os.getenv("DAILY_UPDATE_MODE", "snapshot")
+    SNAPSHOT_READY_TIME = os.getenv("SNAPSHOT_READY_TIME", "15:30")
+
+    # 调度器：按交易日历在固定时间执行任务
+    SCHEDULE_STOCK_LIST_TIME = os.getenv("SCHEDULE_STOCK_LIST_TIME", "09:26")
+    SCHEDULE_DAILY_UPDATE_TIME = os.getenv("SCHEDULE_DAILY_UPDATE_TIME", SNAPSHOT_READY_TIME)
+    SCHEDULER_MAX_CONCURRENT = int(os.getenv("SCHEDULER_MAX_CONCURRENT", 2))
+
     # 下载配置
     INDICES_NAMES= os.getenv("INDICES_NAMES", "沪深重要指数")
     START_DATE = os.getenv("START_DATE","19900101")
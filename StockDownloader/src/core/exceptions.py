@@ -23,6 +23,24 @@ class DataFetchError(Exception):
     pass
 
 
+class FetchTimeoutError(DataFetchError):
+    """等待数据获取超时时抛出的异常，future 为仍在运行的调用，已结束时为 None"""
+
+    def __init__(self, message, future=None):
+        super().__init__(message)
+        self.future = future
+
+
+class PermanentFetchError(DataFetchError):
+    """重试也无法成功的数据获取错误，例如代码不存在或已退市"""
+    pass
+
+
+class CircuitOpenError(DataFetchError):
+    """上游接口熔断期间拒绝请求时抛出的异常"""
+    pass
+
+
 class DataSaveError(Exception):
     """数据保存异常"""
     pass
@@ -0,0 +1,58 @@
+# src/database/locks.py
+"""
+此模块提供跨副本的互斥锁。
+PostgreSQL 上使用会话级 advisory lock：锁绑定在一条独占的连接上，持有锁的进程退出或连接断开时自动释放，
+不会因为副本崩溃而留下死锁。其他数据库只有单个进程写入，退化为进程内的锁。
+Authors: hovi.hyw & AI
+Date: 2026-10-18
+"""
+
+import threading
+import zlib
+from contextlib import contextmanager
+
+from sqlalchemy import text
+
+from .session import engine
+
+# 非 PostgreSQL 数据库使用的进程内锁
+_local_locks = {}
+_local_locks_lock = threading.Lock()
+
+
+def lock_key(name):
+    """把锁名映射为 advisory lock 使用的整数键。"""
+    return zlib.crc32(name.encode("utf-8"))
+
+
+@contextmanager
+def advisory_lock(name):
+    """
+    尝试获取一个跨副本的互斥锁，不等待。
+
+    Args:
+        name (str): 锁名。
+
+    Yields:
+        bool: 获取成功时为 True，锁已被其他进程持有时为 False。
+    """
+    if engine.dialect.name != "postgresql":
+        with _local_locks_lock:
+            lock = _local_locks.setdefault(name, threading.Lock())
+        acquired = lock.acquire(blocking=False)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                lock.release()
+        return
+
+    key = lock_key(name)
+    # 自动提交模式，持有锁期间连接不会停留在未结束的事务中
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {'key': key}).scalar()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': key})
@@ -1,4 +1,9 @@
 from .stock import StockDailyData
 from .index import IndexDailyData
 from .info import StockInfo, IndexInfo
-from .auction import AuctionStock, AuctionIndex
\ No newline at end of file
+from .auction import AuctionStock, AuctionIndex
+from .calendar import TradeCalendar
+from .watermark import IngestWatermark
+from .factor import AdjustFactor
+from .work import IngestJob, WorkItem
+from .schedule import ScheduleRun
\ No newline at end of file
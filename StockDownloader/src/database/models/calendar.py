@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Date
+
+from ..base import Base
+
+
+class TradeCalendar(Base):
+    __tablename__ = "trade_calendar"
+
+    date = Column(Date, primary_key=True, nullable=False)  # 交易日
+
+    def __repr__(self):
+        return f"<TradeCalendar(date={self.date})>"
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Date, Float, PrimaryKeyConstraint, String
+
+from ..base import Base
+
+
+class AdjustFactor(Base):
+    __tablename__ = "adjust_factor"
+
+    symbol = Column(String, nullable=False)  # 股票代码
+    date = Column(Date, nullable=False)  # 因子生效日期，到下一条记录的日期之前有效
+    hfq_factor = Column(Float, nullable=False)  # 后复权因子，后复权价格 = 不复权价格 × 因子
+
+    __table_args__ = (
+        PrimaryKeyConstraint('symbol', 'date'),
+    )
+
+    def __repr__(self):
+        return f"<AdjustFactor(symbol={self.symbol}, date={self.date}, hfq_factor={self.hfq_factor})>"
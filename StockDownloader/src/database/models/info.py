@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, PrimaryKeyConstraint
+from sqlalchemy import Column, String, Date, PrimaryKeyConstraint
 
 from ..base import Base
 
@@ -8,6 +8,8 @@ class StockInfo(Base):
 
     symbol = Column(String, primary_key=True, nullable=False)  # 股票代码
     name = Column(String(100), nullable=False)  # 股票名称
+    list_date = Column(Date)  # 上市日期
+    delist_date = Column(Date)  # 退市日期
 
     def __repr__(self):
         return f"<StockInfo(symbol={self.symbol}, name={self.name})>"
@@ -18,6 +20,8 @@ class IndexInfo(Base):
 
     symbol = Column(String, primary_key=True, nullable=False)  # 指数代码
     name = Column(String(100), nullable=False)  # 指数名称
+    list_date = Column(Date)  # 发布日期
+    delist_date = Column(Date)  # 终止日期
 
     def __repr__(self):
         return f"<IndexInfo(symbol={self.symbol}, name={self.name})>"
\ No newline at end of file
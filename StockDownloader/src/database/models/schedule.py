@@ -0,0 +1,22 @@
+from sqlalchemy import Column, DateTime, PrimaryKeyConstraint, String
+
+from ..base import Base
+
+
+class ScheduleRun(Base):
+    __tablename__ = "schedule_run"
+
+    job_name = Column(String, nullable=False)  # 定时任务名称
+    scheduled_for = Column(DateTime, nullable=False)  # 计划执行时间
+    status = Column(String, nullable=False)  # running、succeeded、failed、overdue 或 skipped
+    owner = Column(String)  # 执行该次任务的工作进程
+    started_at = Column(DateTime)  # 开始时间
+    finished_at = Column(DateTime)  # 结束时间
+    error = Column(String)  # 失败原因
+
+    __table_args__ = (
+        PrimaryKeyConstraint('job_name', 'scheduled_for'),
+    )
+
+    def __repr__(self):
+        return f"<ScheduleRun(job_name={self.job_name}, scheduled_for={self.scheduled_for}, status={self.status})>"
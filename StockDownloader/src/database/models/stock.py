@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, Date, PrimaryKeyConstraint, BigInteger
+from sqlalchemy import Column, String, Float, Date, PrimaryKeyConstraint, BigInteger, Index
 
 from ..base import Base
 
@@ -19,6 +19,10 @@ class StockDailyData(Base):
 
     __table_args__ = (
         PrimaryKeyConstraint('symbol', 'date'),
+        # PostgreSQL 上按日期分年分区，并为按日期的横截面查询建立以日期开头的索引；SQLite 保持原有结构。
+        # 全量导入按代码逐只写入，分区内数据并不按日期排列，因此不使用 BRIN 索引
+        Index('ix_daily_stock_date_symbol', 'date', 'symbol').ddl_if(dialect='postgresql'),
+        {'postgresql_partition_by': 'RANGE (date)'},
     )
 
     # 定义字段映射关系，用于DataFrame转换
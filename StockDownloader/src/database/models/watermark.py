@@ -0,0 +1,22 @@
+from sqlalchemy import BigInteger, Column, Date, DateTime, PrimaryKeyConstraint, String
+
+from ..base import Base
+
+
+class IngestWatermark(Base):
+    __tablename__ = "ingest_watermark"
+
+    kind = Column(String, nullable=False)  # 数据类型，stock 或 index
+    symbol = Column(String, nullable=False)  # 代码
+    first_date = Column(Date)  # 已入库的最早日期
+    last_date = Column(Date)  # 已入库的最晚日期
+    row_count = Column(BigInteger)  # 已入库的记录数
+    last_fetch_at = Column(DateTime)  # 最近一次获取时间
+    last_status = Column(String)  # 最近一次获取结果：ok、empty 或 failed
+
+    __table_args__ = (
+        PrimaryKeyConstraint('kind', 'symbol'),
+    )
+
+    def __repr__(self):
+        return f"<IngestWatermark(kind={self.kind}, symbol={self.symbol}, last_date={self.last_date})>"
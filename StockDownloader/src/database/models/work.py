@@ -0,0 +1,45 @@
+from sqlalchemy import Column, DateTime, Index, Integer, PrimaryKeyConstraint, String
+
+from ..base import Base
+
+
+class IngestJob(Base):
+    __tablename__ = "ingest_job"
+
+    job_id = Column(String, primary_key=True)  # 任务标识，例如 stock-update-20261016
+    kind = Column(String, nullable=False)  # 数据类型，stock 或 index
+    mode = Column(String, nullable=False)  # download（全量下载）或 update（增量更新）
+    status = Column(String, nullable=False)  # running、done、failed（部分区间失败）或 interrupted
+    total = Column(Integer)  # 获取区间总数
+    created_at = Column(DateTime)  # 创建时间
+    updated_at = Column(DateTime)  # 最近一次状态变化时间
+    finished_at = Column(DateTime)  # 完成时间
+
+    def __repr__(self):
+        return f"<IngestJob(job_id={self.job_id}, status={self.status})>"
+
+
+class WorkItem(Base):
+    __tablename__ = "ingest_work"
+
+    job_id = Column(String, nullable=False)  # 所属任务标识
+    symbol = Column(String, nullable=False)  # 代码，同一代码的多个获取区间各占一行
+    kind = Column(String, nullable=False)  # 数据类型，stock 或 index
+    name = Column(String)  # 名称，仅用于日志
+    start_date = Column(String, nullable=False)  # 获取区间开始日期，格式为 YYYYMMDD
+    end_date = Column(String, nullable=False)  # 获取区间结束日期，格式为 YYYYMMDD
+    overlap_until = Column(String)  # 与已入库数据重叠到该日期，用于检测历史复权价格变化
+    status = Column(String, nullable=False, default='pending')  # pending、leased、done 或 failed
+    owner = Column(String)  # 持有租约的工作进程
+    lease_until = Column(DateTime)  # 租约到期时间，到期未续约时可被其他工作进程领取
+    attempts = Column(Integer, nullable=False, default=0)  # 已领取次数
+    last_error = Column(String)  # 最近一次失败原因
+    updated_at = Column(DateTime)  # 最近一次状态变化时间
+
+    __table_args__ = (
+        PrimaryKeyConstraint('job_id', 'symbol', 'start_date'),
+        Index('ix_ingest_work_claim', 'job_id', 'status', 'lease_until'),
+    )
+
+    def __repr__(self):
+        return f"<WorkItem(job_id={self.job_id}, symbol={self.symbol}, start_date={self.start_date}, status={self.status})>"
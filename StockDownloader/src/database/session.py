@@ -1,11 +1,60 @@
+import threading
+from contextlib import contextmanager
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 
 from StockDownloader.src.core.config import config
 from StockDownloader.src.database.base import Base
 
+# 数据库 URL -> 引擎，同一进程内所有任务、保存器和API共享同一个连接池
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def _engine_options(url):
+    """
+    根据配置生成连接池参数。内存 SQLite 使用单连接池，不支持池大小参数。
+
+    Args:
+        url (str): 数据库连接 URL。
+
+    Returns:
+        dict: create_engine 的关键字参数。
+    """
+    options = {'pool_pre_ping': config.DB_POOL_PRE_PING}
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return options
+    options.update(
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+    )
+    return options
+
+
+def get_engine(url=None):
+    """
+    获取数据库引擎。同一个 URL 只创建一次引擎，连接数受 config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW 限制。
+
+    Args:
+        url (str, optional): 数据库连接 URL，默认为 config.DATABASE_URL。
+
+    Returns:
+        Engine: 数据库引擎。
+    """
+    url = str(url or config.DATABASE_URL)
+    with _engines_lock:
+        if url not in _engines:
+            _engines[url] = create_engine(url, **_engine_options(url))
+        return _engines[url]
+
+
 # 创建数据库引擎
-engine = create_engine(config.DATABASE_URL)
+engine = get_engine()
 
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -23,3 +72,47 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+@contextmanager
+def session_scope():
+    """
+    任务代码使用的会话上下文：正常结束时提交，出错时回滚，最后关闭会话把连接归还连接池。
+
+    Yields:
+        Session: 数据库会话。
+    """
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def pool_stats():
+    """
+    获取各引擎连接池的使用情况。
+
+    Returns:
+        dict: 数据库 URL（隐藏密码）-> 连接池配置与当前的空闲、借出和溢出连接数。
+    """
+    with _engines_lock:
+        engines = list(_engines.values())
+    stats = {}
+    for item in engines:
+        pool = item.pool
+        entry = {'pool': type(pool).__name__}
+        if hasattr(pool, 'checkedout'):
+            entry.update(
+                size=pool.size(),
+                max_overflow=getattr(pool, '_max_overflow', None),
+                checked_in=pool.checkedin(),
+                checked_out=pool.checkedout(),
+                overflow=max(0, pool.overflow()),
+            )
+        stats[item.url.render_as_string(hide_password=True)] = entry
+    return stats
@@ -0,0 +1,29 @@
+def upsert_statement(db, model, columns=None, where=None):
+    """
+    构造按主键冲突时更新的批量插入语句，支持 PostgreSQL 和 SQLite。
+
+    Args:
+        db (Session): 数据库会话。
+        model: 模型类。
+        columns (list, optional): 冲突时更新的列，默认为所有非主键列。
+        where (ColumnElement, optional): 冲突时只更新满足该条件的已有行，其余保持不变。
+
+    Returns:
+        Insert: INSERT ... ON CONFLICT DO UPDATE 语句；其他数据库返回 None。
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    table = model.__table__
+    statement = insert(table)
+    key_columns = [column.name for column in table.primary_key.columns]
+    columns = columns or [column.name for column in table.columns if column.name not in key_columns]
+    return statement.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={name: statement.excluded[name] for name in columns},
+        where=where
+    )
@@ -1,7 +1,7 @@
 # src/main.py
 """
 此模块是应用程序的主入口点。
-它负责初始化数据库、启动 FastAPI 应用，并定期执行数据下载任务。
+它负责初始化数据库、启动 FastAPI 应用，并按交易日历执行定时数据下载任务。
 支持通过命令行参数指定特定的数据下载或更新任务。
 Authors: hovi.hyw & AI
 Date: 2024-07-03
@@ -9,34 +9,22 @@ Date: 2024-07-03
 
 import argparse
 import sys
-import threading
 import time
 
 import uvicorn
 
 from .api.app import app
 from .core.logger import logger
-from .tasks.download_index_task import download_all_index_data, download_index_data
-from .tasks.download_stock_task import download_all_stock_data, download_stock_task
+from .tasks.download_index_task import download_all_index_data
+from .tasks.download_stock_task import download_all_stock_data
 from .services.data_fetcher import DataFetcher
 from .services.data_saver import DataSaver
+from .services.work_queue import resume_job
 from .tasks.scheduled_tasks import start_scheduled_tasks
 from .tasks.complete_data_task import run_complete_data_task
 from .utils.db_utils import initialize_database_if_needed
 
 
-def run_scheduled_tasks():
-    """
-    定期运行数据下载任务。
-    """
-    while True:
-        logger.info("开始执行定时数据下载任务...")
-        download_all_stock_data(update_only=True)
-        download_all_index_data(update_only=True)
-        logger.info("定时数据下载任务执行完成，等待下次执行...")
-        time.sleep(86400)  # 每天执行一次，86400秒 = 1天
-
-
 def ensure_directories():
     """
     确保必要的目录存在。
@@ -80,6 +68,11 @@ def parse_args():
              "7：更新stock_info以及index_info表\n"
              "8：补全特定股票或指数的历史数据"
     )
+    parser.add_argument(
+        "--resume",
+        metavar="JOB_ID",
+        help="从进度日志继续中断的下载或更新任务，例如 stock-download-20261016，只处理未完成的获取区间并重试失败的区间"
+    )
     
     return parser.parse_args()
 
@@ -121,54 +114,61 @@ def main():
     # 解析命令行参数
     args = parse_args()
     
+    # 继续中断的任务
+    if args.resume:
+        logger.info(f"继续任务 {args.resume}...")
+        try:
+            report = resume_job(args.resume)
+        except ValueError as e:
+            logger.error(f"无法继续任务 {args.resume}: {e}")
+            sys.exit(2)
+        logger.info(f"任务 {args.resume} 继续完成: {report.summary()}")
+        sys.exit(0 if not report.failed else 1)
+
     # 如果指定了运行模式，执行特定任务
     if args.mode is not None:
+        reports = []
         if args.mode == 1:  # 只下载指数日线数据
             logger.info("开始下载指数日线数据...")
-            download_all_index_data()
+            reports.append(download_all_index_data())
             logger.info("指数日线数据下载完成")
         elif args.mode == 2:  # 只下载股票日线数据
             logger.info("开始下载股票日线数据...")
-            download_all_stock_data()
+            reports.append(download_all_stock_data())
             logger.info("股票日线数据下载完成")
         elif args.mode == 3:  # 只更新指数日线数据
             logger.info("开始更新指数日线数据...")
-            download_all_index_data(update_only=True)
+            reports.append(download_all_index_data(update_only=True))
             logger.info("指数日线数据更新完成")
         elif args.mode == 4:  # 只更新股票日线数据
             logger.info("开始更新股票日线数据...")
-            download_all_stock_data(update_only=True)
+            reports.append(download_all_stock_data(update_only=True))
             logger.info("股票日线数据更新完成")
         elif args.mode == 5:  # 只下载股票和指数日线数据
             logger.info("开始下载股票和指数日线数据...")
-            download_all_stock_data()
+            reports.append(download_all_stock_data())
             logger.info("股票日线数据下载完成，等待1分钟后开始下载指数日线数据...")
             time.sleep(60)  # 等待1分钟
-            download_all_index_data()
+            reports.append(download_all_index_data())
             logger.info("股票和指数日线数据下载完成")
         elif args.mode == 6:  # 只更新股票和指数日线数据
             logger.info("开始更新股票和指数日线数据...")
-            download_all_stock_data(update_only=True)
+            reports.append(download_all_stock_data(update_only=True))
             logger.info("股票日线数据更新完成，等待1分钟后开始更新指数日线数据...")
             time.sleep(60)  # 等待1分钟
-            download_all_index_data(update_only=True)
+            reports.append(download_all_index_data(update_only=True))
             logger.info("股票和指数日线数据更新完成")
         elif args.mode == 7:  # 更新stock_info以及index_info表
             update_stock_and_index_info()
         elif args.mode == 8:  # 补全特定股票或指数的历史数据
             run_complete_data_task()
         
-        # 执行完特定任务后退出
-        sys.exit(0)
+        # 执行完特定任务后退出，有代码下载或更新失败时返回非零退出码
+        sys.exit(1 if any(report is not None and report.failed for report in reports) else 0)
     
     # 如果没有指定运行模式，启动完整的API服务和定时任务
     
-    # 启动每日数据下载定时任务
-    task_thread = threading.Thread(target=run_scheduled_tasks)
-    task_thread.daemon = True  # 设置为守护线程，主线程退出时自动结束
-    task_thread.start()
-    
-    # 启动交易日特定时间任务（股票列表下载）
+    # 启动定时任务调度器（交易日股票列表下载和收盘后增量更新）
     start_scheduled_tasks()
 
     # 启动API服务
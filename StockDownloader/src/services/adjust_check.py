@@ -0,0 +1,221 @@
+# src/services/adjust_check.py
+"""
+此模块检测已入库的后复权历史是否发生变化（分红送转后数据源修订复权因子等）。
+增量更新时获取计划为每只股票的尾部区间向前多取 config.ADJUST_CHECK_DAYS 个已入库的交易日，
+入库前把这段重叠数据与库中的收盘价做向量化比较：一致则只写入新数据，
+不一致说明该股票的历史需要重写，流水线结束后只为这些股票获取完整历史并在一个事务中整体替换。
+复权因子只在全量下载时随日线获取；增量更新用已获取的日线估算近似因子，只为疑似除权除息的股票重新获取因子。
+Authors: hovi.hyw & AI
+Date: 2026-10-18
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from ..core.config import config
+from ..core.logger import logger
+from ..database.models.factor import AdjustFactor
+from ..database.session import session_scope
+from ..utils.trading_calendar import to_date
+from .download_engine import DownloadEngine
+
+# 单条 IN 查询包含的最大代码数
+_CHUNK_SIZE = 1000
+
+
+class AdjustmentCheck:
+    """
+    重叠区间比较器。创建时一次性读取所有待比较代码在重叠区间内的已入库收盘价。
+
+    Attributes:
+        model: 日线数据模型类。
+        tolerance (float): 允许的收盘价相对误差。
+        changed (list): 历史发生变化的代码列表。
+    """
+
+    def __init__(self, model, jobs, tolerance=None):
+        """
+        初始化AdjustmentCheck实例。
+
+        Args:
+            model: 日线数据模型类。
+            jobs (list[FetchJob]): 获取任务，只比较设置了 overlap_until 的任务。
+            tolerance (float, optional): 收盘价相对误差阈值，默认为 config.ADJUST_CHECK_TOLERANCE。
+        """
+        self.model = model
+        self.tolerance = config.ADJUST_CHECK_TOLERANCE if tolerance is None else tolerance
+        self.changed = []
+        self._overlaps = {job.symbol: (to_date(job.start_date), to_date(job.overlap_until))
+                          for job in jobs if job.overlap_until}
+        self._reference = self._load_reference()
+
+    def __contains__(self, symbol):
+        return symbol in self._overlaps
+
+    def _load_reference(self):
+        """按重叠区间分组批量读取已入库收盘价，每个代码只读取自己的重叠区间。"""
+        groups = {}
+        for symbol, window in self._overlaps.items():
+            groups.setdefault(window, []).append(symbol)
+        rows = []
+        with session_scope() as db:
+            # 同一批更新的代码水位通常相同，分组后查询数与不同的重叠区间数成正比
+            for (start, end), symbols in groups.items():
+                for offset in range(0, len(symbols), _CHUNK_SIZE):
+                    query = (
+                        select(self.model.symbol, self.model.date, self.model.close)
+                        .where(self.model.date.between(start, end),
+                               self.model.symbol.in_(symbols[offset:offset + _CHUNK_SIZE]))
+                    )
+                    rows.extend(db.execute(query).all())
+        reference = pd.DataFrame(rows, columns=['symbol', 'date', 'close'])
+        return {symbol: frame.set_index('date')['close'] for symbol, frame in reference.groupby('symbol')}
+
+    def split(self, symbol, frame):
+        """
+        比较重叠区间并去掉重叠部分。
+
+        Args:
+            symbol (str): 代码。
+            frame (pandas.DataFrame): 规范化后的日线数据，包含重叠区间。
+
+        Returns:
+            pandas.DataFrame: 历史一致时返回重叠区间之后的新数据；历史发生变化时返回 None，并记录到 changed。
+        """
+        if symbol not in self._overlaps:
+            return frame
+        _, overlap_until = self._overlaps[symbol]
+        overlap = frame['date'] <= overlap_until
+        stored = self._reference.get(symbol)
+        if stored is not None and overlap.any():
+            fetched = frame.loc[overlap].set_index('date')['close']
+            old, new = stored.align(fetched, join='inner')
+            valid = (old > 0) & new.notna()
+            deviation = np.abs(new[valid] / old[valid] - 1)
+            if (deviation > self.tolerance).any():
+                logger.info(f"{symbol} 的历史复权价格已变化（最大偏差 {deviation.max():.4%}），将重写完整历史")
+                self.changed.append(symbol)
+                return None
+        return frame.loc[~overlap]
+
+
+class FactorCheck:
+    """
+    增量更新时判断哪些股票需要重新获取复权因子，不为每只股票额外请求一次因子接口。
+    库中还没有因子的股票需要获取；其余股票用日线中的成交额/成交量估算不复权均价，后复权典型价 (开盘+最高+最低+收盘)/4
+    与之相除即为当日因子的近似值。单日近似值受日内价格分布影响有噪声，因此比较中位数：新数据最后几天（与重叠区间等长）的近似因子中位数
+    相对重叠区间（已入库，因子未变）的中位数变化超过 drift 时，说明期间发生了除权除息，流水线结束后为这些股票获取精确因子。
+
+    Attributes:
+        drift (float): 近似因子允许的相对变化。
+        refresh (list): 需要重新获取复权因子的代码列表。
+    """
+
+    def __init__(self, jobs, drift=None):
+        """
+        初始化FactorCheck实例。
+
+        Args:
+            jobs (list[FetchJob]): 获取任务。
+            drift (float, optional): 近似因子允许的相对变化，默认为 config.ADJUST_FACTOR_DRIFT。
+        """
+        self.drift = config.ADJUST_FACTOR_DRIFT if drift is None else drift
+        self.refresh = []
+        self._overlap_until = {job.symbol: to_date(job.overlap_until) for job in jobs if job.overlap_until}
+        self._known = self._load_known(list(dict.fromkeys(job.symbol for job in jobs)))
+
+    @staticmethod
+    def _load_known(symbols):
+        """查询库中已有复权因子的代码。"""
+        known = set()
+        with session_scope() as db:
+            for offset in range(0, len(symbols), _CHUNK_SIZE):
+                query = select(AdjustFactor.symbol).where(
+                    AdjustFactor.symbol.in_(symbols[offset:offset + _CHUNK_SIZE])).distinct()
+                known.update(db.execute(query).scalars())
+        return known
+
+    def check(self, symbol, frame):
+        """
+        检查一个代码规范化后的日线数据（包含重叠区间），需要重新获取因子时记录到 refresh。
+
+        Args:
+            symbol (str): 代码。
+            frame (pandas.DataFrame): 规范化后的日线数据。
+        """
+        if symbol in self.refresh:
+            return
+        if symbol not in self._known:
+            self.refresh.append(symbol)
+            return
+        overlap_until = self._overlap_until.get(symbol)
+        if overlap_until is None or frame.empty:
+            return
+        average = frame['amount'] / frame['volume'].where(frame['volume'] > 0)
+        typical = (frame['open'] + frame['high'] + frame['low'] + frame['close']) / 4
+        implied = (typical / average).replace([np.inf, -np.inf], np.nan)
+        overlap = frame['date'] <= overlap_until
+        baseline = implied[overlap].median()
+        latest = implied[~overlap].dropna().tail(max(1, int(overlap.sum()))).median()
+        if pd.isna(baseline) or baseline <= 0 or pd.isna(latest):
+            return
+        deviation = abs(latest / baseline - 1)
+        if deviation > self.drift:
+            logger.info(f"{symbol} 的近似复权因子变化 {deviation:.2%}，疑似除权除息，将重新获取复权因子")
+            self.refresh.append(symbol)
+
+
+def refresh_factors(kind, symbols):
+    """
+    并发获取这些代码的完整复权因子并替换库中的因子，请求经过与日线相同的限流、熔断和并发控制。
+
+    Args:
+        kind (str): 数据类型，只有 'stock' 有复权因子。
+        symbols (list): 代码列表。
+
+    Returns:
+        DownloadReport: 每个代码的获取结果。
+    """
+    from .pipeline import FetchJob, fetch_factors
+
+    end_date = datetime.today().strftime("%Y%m%d")
+
+    def task(symbol, fetcher, saver):
+        factors = fetch_factors(kind, fetcher, FetchJob(symbol, config.START_DATE, end_date))
+        if factors is None:
+            return False
+        saver.save_adjust_factors({symbol: factors})
+        return True
+
+    return DownloadEngine(label="获取复权因子").run(symbols, task)
+
+
+def rewrite_histories(kind, symbols):
+    """
+    为历史发生变化的代码并发获取完整历史和复权因子，并在一个事务中整体替换库中的数据。
+    请求经过与日线相同的限流、熔断和并发控制。
+
+    Args:
+        kind (str): 数据类型，'stock' 或 'index'。
+        symbols (list): 代码列表。
+
+    Returns:
+        DownloadReport: 每个代码的重写结果，完整历史为空的代码记为失败，原有数据保持不变。
+    """
+    from .pipeline import PIPELINE_KINDS, FetchJob, fetch_factors
+
+    model, fetch, normalize = PIPELINE_KINDS[kind]
+    end_date = datetime.today().strftime("%Y%m%d")
+
+    def task(symbol, fetcher, saver):
+        job = FetchJob(symbol, config.START_DATE, end_date)
+        frame = normalize(fetch(fetcher, job), symbol)
+        if frame.empty:
+            return False
+        saver.replace_daily_history(model, symbol, frame, fetch_factors(kind, fetcher, job))
+        return True
+
+    return DownloadEngine(label=f"重写{kind}完整历史").run(symbols, task)
@@ -0,0 +1,325 @@
+# src/services/bulk_loader.py
+"""
+此模块实现了基于 PostgreSQL COPY 的日线批量导入，用于首次全量下载。
+规范化后的日线数据先在内存中写成 CSV，通过 COPY 导入会话级临时表，
+再用一条 INSERT ... SELECT ... ON CONFLICT 语句合并到 daily_stock / daily_index。
+其他数据库不支持 COPY，调用方应回退到批量 upsert。
+bulk_load() 管理整个批量导入的生命周期：导入前删除二级索引（空表时连同主键一起推迟），
+导入后一次性重建索引并执行 ANALYZE/VACUUM，记录各阶段耗时。
+导入期间持有以表名命名的 advisory lock；进程在导入中被终止时主键和索引不会恢复，
+启动时 repair_interrupted_loads() 在没有其他进程导入该表时去重并重建它们。
+Authors: hovi.hyw & AI
+Date: 2026-10-18
+"""
+
+import io
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from sqlalchemy import inspect, text
+
+from ..core.config import config
+from ..core.logger import logger
+from ..database.locks import advisory_lock
+from ..database.models.index import IndexDailyData
+from ..database.models.stock import StockDailyData
+from ..database.session import engine
+
+# 批量导入会删除主键和索引的日线表
+_DAILY_MODELS = (StockDailyData, IndexDailyData)
+
+# 主键已被推迟的表，导入时直接插入，不做冲突处理
+_deferred_keys = set()
+_deferred_lock = threading.Lock()
+
+
+def supports_copy(db):
+    """
+    判断会话连接的数据库是否支持 COPY 导入。
+
+    Args:
+        db (Session): 数据库会话。
+
+    Returns:
+        bool: PostgreSQL 返回 True。
+    """
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def is_key_deferred(table_name):
+    """
+    判断表的主键是否因批量导入而暂时删除。
+
+    Args:
+        table_name (str): 表名。
+
+    Returns:
+        bool: 主键已推迟时返回 True。
+    """
+    with _deferred_lock:
+        return table_name in _deferred_keys
+
+
+def deferred_keys():
+    """
+    获取当前主键已推迟的表，用于传给工作进程。
+
+    Returns:
+        list: 表名列表。
+    """
+    with _deferred_lock:
+        return sorted(_deferred_keys)
+
+
+def mark_keys_deferred(table_names):
+    """
+    在工作进程中登记由协调进程推迟了主键的表，使导入走不依赖唯一约束的路径。
+
+    Args:
+        table_names (list): 表名列表。
+    """
+    with _deferred_lock:
+        _deferred_keys.update(table_names)
+
+
+def _lock_name(table):
+    return f"bulk_load:{table.name}"
+
+
+def _staging_table(model):
+    return f"_stage_{model.__tablename__}"
+
+
+def _frame_to_csv(frame, columns):
+    """把规范化后的日线数据按表列顺序写成 CSV，缺失值写为空字段。"""
+    buffer = io.StringIO()
+    frame.reindex(columns=columns).to_csv(buffer, index=False, header=False, na_rep="", date_format="%Y-%m-%d")
+    buffer.seek(0)
+    return buffer
+
+
+def copy_daily_frame(db, model, frame):
+    """
+    通过 COPY 把日线数据导入临时表，再合并到目标表。不提交事务。
+
+    Args:
+        db (Session): PostgreSQL 数据库会话。
+        model: 日线数据模型类，StockDailyData 或 IndexDailyData。
+        frame (pandas.DataFrame): 规范化后的日线数据，可以包含多个代码，(symbol, date) 不能重复。
+
+    Returns:
+        int: 导入的记录数。
+    """
+    if frame is None or frame.empty:
+        return 0
+    table = model.__table__
+    staging = _staging_table(model)
+    columns = [column.name for column in table.columns]
+    key_columns = [column.name for column in table.primary_key.columns]
+    column_list = ", ".join(columns)
+    updates = ", ".join(f"{name} = EXCLUDED.{name}" for name in columns if name not in key_columns)
+
+    # 临时表只对当前连接可见，事务提交时自动清空
+    db.execute(text(
+        f"CREATE TEMP TABLE IF NOT EXISTS {staging} "
+        f"(LIKE {table.name} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"))
+
+    buffer = _frame_to_csv(frame, columns)
+    raw_connection = db.connection().connection
+    with raw_connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '')", buffer)
+
+    merge = f"INSERT INTO {table.name} ({column_list}) SELECT {column_list} FROM {staging}"
+    if not is_key_deferred(table.name):
+        merge += f" ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {updates}"
+    db.execute(text(merge))
+    # 同一事务中可能还有下一批数据
+    db.execute(text(f"TRUNCATE {staging}"))
+    logger.debug(f"Copied {len(frame)} rows into {table.name} via {staging}")
+    return len(frame)
+
+
+def _is_empty(conn, table):
+    return conn.execute(text(f"SELECT 1 FROM {table.name} LIMIT 1")).first() is None
+
+
+def _drop_indexes(models):
+    """删除二级索引；PostgreSQL 上的空表同时删除主键，上次导入中断后仍没有主键的表继续推迟。返回需要恢复的内容。"""
+    state = []
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for model in models:
+            table = model.__table__
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            indexes = [index for index in table.indexes if index.name in existing]
+            for index in indexes:
+                index.drop(bind=conn)
+            primary_key = None
+            # 推迟主键要求导入走 COPY 路径（不依赖唯一约束做冲突处理）
+            if engine.dialect.name == "postgresql" and config.BULK_LOAD_USE_COPY:
+                current_key = inspector.get_pk_constraint(table.name)
+                if not current_key.get('name'):
+                    # 上次批量导入中断，主键尚未恢复：继续推迟，导入结束后去重并恢复
+                    primary_key = {'name': f"{table.name}_pkey",
+                                   'constrained_columns': [column.name for column in table.primary_key.columns]}
+                elif _is_empty(conn, table):
+                    primary_key = current_key
+                    conn.execute(text(f"ALTER TABLE {table.name} DROP CONSTRAINT {primary_key['name']}"))
+                if primary_key:
+                    with _deferred_lock:
+                        _deferred_keys.add(table.name)
+            state.append((table, indexes, primary_key))
+            logger.info(f"Bulk load on {table.name}: dropped {len(indexes)} secondary indexes"
+                        f"{' and deferred primary key' if primary_key else ''}")
+    return state
+
+
+def _deduplicate(conn, table, key_columns):
+    """删除主键重复的行，只保留最后写入的一行。返回删除了重复行的代码。"""
+    condition = " AND ".join(f"a.{name} = b.{name}" for name in key_columns)
+    symbols = conn.execute(text(
+        f"DELETE FROM {table.name} a USING {table.name} b WHERE a.ctid < b.ctid AND {condition} "
+        f"RETURNING a.symbol")).scalars().all()
+    logger.warning(f"Removed {len(symbols)} duplicate rows from {table.name} before restoring primary key")
+    return sorted(set(symbols))
+
+
+def _rebuild_indexes(state):
+    """一次性重建主键和二级索引。去重后重新统计相关代码的水位，推迟主键期间重复写入的记录数已被累加。"""
+    from .watermarks import recount_watermarks
+
+    for table, indexes, primary_key in state:
+        duplicated = []
+        with engine.begin() as conn:
+            if engine.dialect.name == "postgresql":
+                conn.execute(text(f"SET LOCAL maintenance_work_mem = '{config.BULK_LOAD_MAINTENANCE_WORK_MEM}'"))
+            if primary_key:
+                key_columns = primary_key['constrained_columns']
+                add_key = (f"ALTER TABLE {table.name} ADD CONSTRAINT {primary_key['name']} "
+                           f"PRIMARY KEY ({', '.join(key_columns)})")
+                try:
+                    with conn.begin_nested():
+                        conn.execute(text(add_key))
+                except Exception as e:
+                    logger.warning(f"Failed to restore primary key on {table.name}: {e}")
+                    duplicated = _deduplicate(conn, table, key_columns)
+                    conn.execute(text(add_key))
+            for index in indexes:
+                index.create(bind=conn)
+        with _deferred_lock:
+            _deferred_keys.discard(table.name)
+        if duplicated:
+            recount_watermarks(table.name, duplicated)
+
+
+def _analyze(models):
+    """刷新查询优化器的统计信息，PostgreSQL 上同时执行 VACUUM 以更新可见性映射。"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for model in models:
+            table_name = model.__tablename__
+            if engine.dialect.name == "postgresql":
+                conn.execute(text(f"VACUUM (ANALYZE) {table_name}"))
+            else:
+                conn.execute(text(f"ANALYZE {table_name}"))
+
+
+def interrupted_loads(inspector=None):
+    """
+    找出批量导入中断后缺少主键或二级索引的日线表。日线表的二级索引只在 PostgreSQL 上创建。
+
+    Args:
+        inspector (Inspector, optional): 数据库检查器。
+
+    Returns:
+        dict: 表名 -> (缺失的二级索引列表, 需要恢复的主键或 None)。
+    """
+    inspector = inspector or inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    interrupted = {}
+    for model in _DAILY_MODELS:
+        table = model.__table__
+        if table.name not in existing_tables:
+            continue
+        missing = []
+        if engine.dialect.name == "postgresql":
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            missing = [index for index in table.indexes if index.name not in existing]
+        primary_key = None
+        if not inspector.get_pk_constraint(table.name).get('constrained_columns'):
+            primary_key = {'name': f"{table.name}_pkey",
+                           'constrained_columns': [column.name for column in table.primary_key.columns]}
+        if missing or primary_key:
+            interrupted[table.name] = (missing, primary_key)
+    return interrupted
+
+
+def repair_interrupted_loads(inspector=None):
+    """
+    恢复批量导入中断后缺失的主键（先去重）和二级索引。正在批量导入的表（其他进程持有导入锁）不做处理。
+
+    Args:
+        inspector (Inspector, optional): 数据库检查器。
+
+    Returns:
+        list: 已修复的表名。
+    """
+    repaired = []
+    for name, (indexes, primary_key) in interrupted_loads(inspector).items():
+        table = next(model.__table__ for model in _DAILY_MODELS if model.__tablename__ == name)
+        with advisory_lock(_lock_name(table)) as acquired:
+            if not acquired:
+                logger.info(f"{name} is being bulk loaded by another process, skipping index repair")
+                continue
+            logger.warning(f"Previous bulk load of {name} was interrupted, restoring "
+                           f"{'primary key and ' if primary_key else ''}{len(indexes)} secondary indexes")
+            _rebuild_indexes([(table, indexes, primary_key)])
+            repaired.append(name)
+    return repaired
+
+
+@contextmanager
+def bulk_load(*models):
+    """
+    批量导入的生命周期：删除/推迟索引 → 导入 → 重建索引 → ANALYZE/VACUUM，并记录各阶段耗时。
+    导入期间其他任务不应写入这些表。
+
+    Args:
+        *models: 需要批量导入的日线数据模型类。其他进程正在导入的表保留索引，按普通方式写入。
+
+    Yields:
+        dict: 各阶段耗时（秒），导入结束后填充完整。
+    """
+    with ExitStack() as stack:
+        locked = []
+        for model in models:
+            if stack.enter_context(advisory_lock(_lock_name(model.__table__))):
+                locked.append(model)
+            else:
+                logger.warning(f"{model.__tablename__} is being bulk loaded by another process, keeping its indexes")
+        with _bulk_load(locked) as timings:
+            yield timings
+
+
+@contextmanager
+def _bulk_load(models):
+    timings = {}
+    start_time = time.monotonic()
+    state = _drop_indexes(models)
+    timings['prepare'] = time.monotonic() - start_time
+
+    load_start = time.monotonic()
+    try:
+        yield timings
+    finally:
+        timings['load'] = time.monotonic() - load_start
+        phase_start = time.monotonic()
+        _rebuild_indexes(state)
+        timings['rebuild_indexes'] = time.monotonic() - phase_start
+        phase_start = time.monotonic()
+        _analyze(models)
+        timings['analyze'] = time.monotonic() - phase_start
+        tables = ", ".join(model.__tablename__ for model in models)
+        logger.info(f"Bulk load of {tables} finished: " +
+                    ", ".join(f"{phase} {seconds:.1f}s" for phase, seconds in timings.items()))
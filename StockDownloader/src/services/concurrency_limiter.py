@@ -0,0 +1,224 @@
+# src/services/concurrency_limiter.py
+"""
+此模块实现了按上游接口自适应调整并发请求数的 AIMD 限流器。
+每个上游接口有一个并发上限，获取线程发起请求前先占用一个名额。请求成功且耗时正常时上限加性增长
+（每成功约一个上限数量的请求加 1），出现超时、限流、连接错误或连续的空响应时上限乘性减少，
+同一时刻发出的一批请求接连失败只减少一次。等待超时的请求立即按失败调整上限，但调用线程仍在运行时名额保留到其结束，
+卡住的请求不会让新的请求越过上限。上限在 [config.FETCH_CONCURRENCY_MIN, config.MAX_THREADS] 之间，
+稳定后的并发数接近数据源实际能承受的水平，不需要为每个环境手工调整 MAX_THREADS。
+Authors: hovi.hyw & AI
+Date: 2026-10-18
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from ..core.config import config
+from ..core.logger import logger
+from .retry_policy import ErrorClass
+
+# 请求结果
+OUTCOME_OK = "ok"
+OUTCOME_EMPTY = "empty"
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD 并发限流器。
+
+    Attributes:
+        endpoint (str): 上游接口名称。
+        min_limit (int): 并发上限的下限。
+        max_limit (int): 并发上限的上限。
+        decrease_factor (float): 乘性减少的系数。
+        slow_seconds (float): 超过该耗时的成功请求视为变慢，不增加上限。
+        empty_streak (int): 连续多少个空响应视为数据源过载。
+    """
+
+    def __init__(self, endpoint, min_limit=None, max_limit=None, initial_limit=None, decrease_factor=None,
+                 slow_seconds=None, empty_streak=None, adaptive=None):
+        """
+        初始化AdaptiveConcurrencyLimiter实例。
+
+        Args:
+            endpoint (str): 上游接口名称。
+            min_limit (int, optional): 并发上限的下限，默认为 config.FETCH_CONCURRENCY_MIN。
+            max_limit (int, optional): 并发上限的上限，默认为 config.MAX_THREADS。
+            initial_limit (int, optional): 初始并发上限，默认为 config.FETCH_CONCURRENCY_INITIAL。
+            decrease_factor (float, optional): 乘性减少的系数，默认为 config.FETCH_CONCURRENCY_DECREASE。
+            slow_seconds (float, optional): 慢请求阈值（秒），默认为 config.FETCH_SLOW_SECONDS。
+            empty_streak (int, optional): 连续空响应阈值，默认为 config.FETCH_EMPTY_STREAK。
+            adaptive (bool, optional): 是否自适应调整，默认为 config.FETCH_ADAPTIVE_CONCURRENCY；关闭时上限固定为 max_limit。
+        """
+        self.endpoint = endpoint
+        self.max_limit = max(1, max_limit or config.MAX_THREADS)
+        self.min_limit = min(self.max_limit, max(1, min_limit or config.FETCH_CONCURRENCY_MIN))
+        self.decrease_factor = decrease_factor or config.FETCH_CONCURRENCY_DECREASE
+        self.slow_seconds = slow_seconds or config.FETCH_SLOW_SECONDS
+        self.empty_streak = empty_streak or config.FETCH_EMPTY_STREAK
+        self.adaptive = config.FETCH_ADAPTIVE_CONCURRENCY if adaptive is None else adaptive
+        initial = (initial_limit or config.FETCH_CONCURRENCY_INITIAL) if self.adaptive else self.max_limit
+        self._limit = float(min(self.max_limit, max(self.min_limit, initial)))
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._empty_count = 0
+        self._last_decrease = 0.0
+        self._increases = 0
+        self._decreases = 0
+
+    @property
+    def limit(self):
+        """当前并发上限。"""
+        return int(self._limit)
+
+    def acquire(self):
+        """
+        占用一个并发名额，名额用完时阻塞等待。
+
+        Returns:
+            float: 占用名额的时间（time.monotonic），传给 release()。
+        """
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+        return time.monotonic()
+
+    def release(self, started_at, outcome, latency=0.0, pending=None):
+        """
+        释放名额并按请求结果调整并发上限。
+
+        Args:
+            started_at (float): acquire() 的返回值。
+            outcome: 请求结果，OUTCOME_OK、OUTCOME_EMPTY 或失败的 ErrorClass。
+            latency (float, optional): 请求耗时（秒）。
+            pending (Future, optional): 等待超时但仍在运行的调用，名额保留到它结束后才释放。
+        """
+        with self._condition:
+            if self.adaptive:
+                self._adjust(started_at, outcome, latency)
+            if pending is None:
+                self._free()
+        if pending is not None:
+            # 调用已结束时回调立即执行
+            pending.add_done_callback(lambda _: self._release_pending())
+
+    def _free(self):
+        self._in_flight -= 1
+        self._condition.notify_all()
+
+    def _release_pending(self):
+        with self._condition:
+            self._free()
+
+    def _adjust(self, started_at, outcome, latency):
+        if outcome == OUTCOME_OK:
+            self._empty_count = 0
+            if latency <= self.slow_seconds and self._limit < self.max_limit:
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+                self._increases += 1
+            return
+        if outcome == OUTCOME_EMPTY:
+            self._empty_count += 1
+            if self._empty_count < self.empty_streak:
+                return
+            self._empty_count = 0
+        elif outcome in (ErrorClass.PERMANENT, ErrorClass.PARSE):
+            # 代码本身没有数据或响应无法解析，与数据源负载无关
+            return
+        # 上次减少之前发出的请求反映的是旧的并发水平，不重复减少
+        if started_at < self._last_decrease:
+            return
+        previous = self.limit
+        self._limit = max(self.min_limit, self._limit * self.decrease_factor)
+        self._last_decrease = time.monotonic()
+        self._decreases += 1
+        if self.limit != previous:
+            reason = outcome.value if isinstance(outcome, ErrorClass) else outcome
+            logger.info(f"{self.endpoint} 并发上限由 {previous} 降为 {self.limit}（{reason}）")
+
+    @contextmanager
+    def slot(self):
+        """
+        占用一个并发名额的上下文，退出时按记录的结果调整上限；抛出异常时按临时错误处理，调用方应先记录具体结果。
+
+        Yields:
+            dict: 请求结果，调用方设置 outcome 为 OUTCOME_OK、OUTCOME_EMPTY 或 ErrorClass；
+                调用超时但仍在运行时设置 pending 为该调用的 future。
+        """
+        started_at = self.acquire()
+        result = {'outcome': ErrorClass.TRANSIENT, 'pending': None}
+        try:
+            yield result
+        finally:
+            self.release(started_at, result['outcome'], time.monotonic() - started_at, result['pending'])
+
+    def state(self):
+        """
+        获取限流器的当前状态。
+
+        Returns:
+            dict: 当前并发上限、上下限、进行中的请求数以及增加和减少的次数。
+        """
+        with self._condition:
+            return {
+                'limit': self.limit,
+                'min_limit': self.min_limit,
+                'max_limit': self.max_limit,
+                'in_flight': self._in_flight,
+                'adaptive': self.adaptive,
+                'increases': self._increases,
+                'decreases': self._decreases,
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+# 同一副本内分担并发上限的进程数
+_process_share = 1
+
+
+def set_process_share(processes):
+    """
+    设置同一副本内分担并发上限的进程数。多进程入库时每个工作进程的并发上限为 MAX_THREADS / processes（向上取整）。
+
+    Args:
+        processes (int): 工作进程数。
+    """
+    global _process_share
+    with _limiters_lock:
+        _process_share = max(1, int(processes))
+        _limiters.clear()
+
+
+def get_concurrency_limiter(endpoint):
+    """
+    获取指定上游接口的共享并发限流器，首次调用时创建。
+
+    Args:
+        endpoint (str): 上游接口名称，通常为AKShare函数名。
+
+    Returns:
+        AdaptiveConcurrencyLimiter: 该接口的并发限流器。
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(endpoint)
+        if limiter is None:
+            limiter = AdaptiveConcurrencyLimiter(endpoint, max_limit=math.ceil(config.MAX_THREADS / _process_share))
+            _limiters[endpoint] = limiter
+        return limiter
+
+
+def get_concurrency_states():
+    """
+    获取所有并发限流器的状态。
+
+    Returns:
+        dict: 上游接口名称 -> 限流器状态。
+    """
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {name: limiter.state() for name, limiter in limiters.items()}
@@ -1,40 +1,47 @@
 # src/services/data_fetcher.py
 """
 此模块负责从网络API获取股票相关数据。
-主要使用AKShare作为数据源，实现了重试机制和异常处理。
+数据源通过 providers 抽象（默认为AKShare），实现了重试机制和异常处理。
 Authors: hovi.hyw & AI
 Date: 2024-07-03
 """
 
 import time
 import pandas as pd
-from concurrent.futures import ThreadPoolExecutor, TimeoutError
 from datetime import datetime, timedelta
 
-import akshare as ak
-
 from ..core.config import config
-from ..core.exceptions import DataFetchError
+from ..core.exceptions import DataFetchError, FetchTimeoutError, PermanentFetchError
 from ..core.logger import logger
+from .concurrency_limiter import OUTCOME_EMPTY, OUTCOME_OK, get_concurrency_limiter
+from .fetch_executor import get_fetch_executor
+from .providers import get_provider
+from .rate_limiter import get_rate_limiter
+from .response_cache import get_response_cache
+from .retry_policy import ErrorClass, backoff_delay, classify_error, get_circuit_breaker
 
 
 class DataFetcher:
     """
     数据获取类。
-    该类负责从AKShare获取股票、指数和概念板块数据。
+    该类负责从数据源（默认为AKShare）获取股票、指数和概念板块数据。
 
     Attributes:
         today (datetime): 当前日期。
+        provider (DataProvider): 数据源。
     """
 
-    def __init__(self):
+    def __init__(self, provider=None):
         """
         初始化DataFetcher实例。
+
+        Args:
+            provider (DataProvider, optional): 数据源，默认为 config.DATA_PROVIDER 指定的共享数据源。
         """
         self.today = datetime.today()
+        self.provider = provider or get_provider()
 
-    @staticmethod
-    def fetch_stock_list():
+    def fetch_stock_list(self):
         """
         获取股票列表。
 
@@ -45,15 +52,21 @@ class DataFetcher:
             DataFetchError: 如果获取股票列表失败，则抛出此异常。
         """
         try:
+            cache = get_response_cache()
+            stock_list = cache.get('stock_zh_a_spot', (), {}, namespace=self.provider.name)
+            if stock_list is not None:
+                logger.info("Loaded stock list from response cache")
+                return stock_list
             logger.info("Fetching stock list...")
-            stock_list = ak.stock_zh_a_spot()
+            get_rate_limiter('stock_zh_a_spot').acquire()
+            stock_list = self.provider.stock_zh_a_spot()
+            cache.put('stock_zh_a_spot', (), {}, stock_list, namespace=self.provider.name)
             return stock_list
         except Exception as e:
             logger.error(f"Failed to fetch stock list: {e}")
             raise DataFetchError(f"Failed to fetch stock list: {e}")
 
-    @staticmethod
-    def fetch_index_list():
+    def fetch_index_list(self):
         """
         获取指数列表。
 
@@ -64,8 +77,16 @@ class DataFetcher:
             DataFetchError: 如果获取指数列表失败，则抛出此异常。
         """
         try:
+            cache = get_response_cache()
+            cache_kwargs = {'symbol': config.INDICES_NAMES}
+            index_list = cache.get('stock_zh_index_spot_em', (), cache_kwargs, namespace=self.provider.name)
+            if index_list is not None:
+                logger.info("Loaded index list from response cache")
+                return index_list
             logger.info("Fetching index list from EastMoney...")
-            index_list = ak.stock_zh_index_spot_em(symbol=config.INDICES_NAMES)
+            get_rate_limiter('stock_zh_index_spot_em').acquire()
+            index_list = self.provider.stock_zh_index_spot_em(symbol=config.INDICES_NAMES)
+            cache.put('stock_zh_index_spot_em', (), cache_kwargs, index_list, namespace=self.provider.name)
             return index_list
         except Exception as e:
             logger.error(f"Failed to fetch index list: {e}")
@@ -75,6 +96,7 @@ class DataFetcher:
     def _fetch_with_timeout(fetch_func, *args, **kwargs):
         """
         带超时的数据获取。
+        调用在进程共享的 FetchExecutor 中执行，超时后立即返回，不等待卡住的线程。
 
         Args:
             fetch_func (callable): 数据获取函数。
@@ -87,48 +109,78 @@ class DataFetcher:
         Raises:
             DataFetchError: 如果操作超时，则抛出此异常。
         """
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(fetch_func, *args, **kwargs)
-            try:
-                return future.result(timeout=config.GET_TIMEOUT)
-            except TimeoutError:
-                raise DataFetchError(f"Operation timed out after {config.GET_TIMEOUT} seconds")
+        return get_fetch_executor().call(fetch_func, *args, **kwargs)
 
-    @staticmethod
-    def _fetch_with_retry(fetch_func, *args, max_retries=config.MAX_RETRIES, retry_delay=config.RETRY_DELAY, **kwargs):
+    def _fetch_with_retry(self, fetch_func, *args, max_retries=config.MAX_RETRIES, retry_delay=config.RETRY_DELAY, **kwargs):
         """
-        带重试和超时的数据获取。
+        带缓存、重试和超时的数据获取。
+        先查询响应缓存，命中则直接返回；否则每次请求前先经过该接口的熔断器和共享令牌桶。失败后按错误分类决定是否重试：
+        永久错误立即放弃，限流和临时错误按各自的指数退避加随机抖动后重试，解析错误最多重试 config.PARSE_ERROR_RETRIES 次，
+        仍无法解析时按永久错误处理。
 
         Args:
-            fetch_func (callable): 数据获取函数。
+            fetch_func (callable): 数据源方法，方法名即上游接口名称。
             *args: 参数。
             max_retries (int): 最大重试次数。
-            retry_delay (int): 重试间隔（秒）。
+            retry_delay (int): 临时错误的基础重试间隔（秒）。
             **kwargs: 关键字参数。
 
         Returns:
             Any: 数据获取函数的结果。
 
         Raises:
+            PermanentFetchError: 如果遇到重试也无法成功的错误（包括多次重试后仍无法解析的响应），则抛出此异常。
+            CircuitOpenError: 如果该接口处于熔断状态且已快速失败，则抛出此异常。
             DataFetchError: 如果在最大重试次数后仍然失败，则抛出此异常。
         """
+        endpoint = fetch_func.__name__
+        cache = get_response_cache()
+        cached = cache.get(endpoint, args, kwargs, namespace=self.provider.name)
+        if cached is not None:
+            logger.debug(f"Response cache hit for {endpoint} {kwargs}")
+            return cached
+
+        limiter = get_rate_limiter(endpoint)
+        breaker = get_circuit_breaker(endpoint)
+        concurrency = get_concurrency_limiter(endpoint)
+        parse_failures = 0
         for attempt in range(max_retries):
-            try:
-                result = DataFetcher._fetch_with_timeout(fetch_func, *args, **kwargs)
-                time.sleep(0.5)  # 成功后等待1秒
-                return result
-            except DataFetchError as e:
-                logger.warning(f"Timeout on attempt {attempt + 1}/{max_retries}")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
-                    continue
-                raise DataFetchError(f"Failed to fetch data after {max_retries} attempts: {str(e)}")
-            except Exception as e:
-                logger.warning(f"Error on attempt {attempt + 1}/{max_retries}: {str(e)}")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
-                    continue
-                raise DataFetchError(f"Failed to fetch data after {max_retries} attempts: {e}")
+            breaker.before_call()
+            limiter.acquire()
+            error = None
+            with concurrency.slot() as slot:
+                try:
+                    result = DataFetcher._fetch_with_timeout(fetch_func, *args, **kwargs)
+                    empty = isinstance(result, pd.DataFrame) and result.empty
+                    slot['outcome'] = OUTCOME_EMPTY if empty else OUTCOME_OK
+                except Exception as e:
+                    error = e
+                    slot['outcome'] = classify_error(e)
+                    if isinstance(e, FetchTimeoutError):
+                        # 超时的调用线程仍在请求上游，结束前继续占用并发名额
+                        slot['pending'] = e.future
+            if error is not None:
+                error_class = slot['outcome']
+                breaker.record_failure(error_class)
+                if error_class is ErrorClass.PERMANENT:
+                    logger.warning(f"Permanent error from {endpoint}, not retrying: {error}")
+                    raise PermanentFetchError(f"Permanent error from {endpoint}: {error}")
+                if error_class is ErrorClass.PARSE:
+                    parse_failures += 1
+                    if parse_failures > config.PARSE_ERROR_RETRIES:
+                        logger.warning(f"Unparseable response from {endpoint} after {parse_failures} attempts, "
+                                       f"not retrying: {error}")
+                        raise PermanentFetchError(f"Unparseable response from {endpoint}: {error}")
+                if attempt >= max_retries - 1:
+                    raise DataFetchError(f"Failed to fetch data after {max_retries} attempts: {error}")
+                delay = backoff_delay(error_class, attempt, retry_delay)
+                logger.warning(f"{error_class.value.capitalize()} error on attempt {attempt + 1}/{max_retries} "
+                               f"from {endpoint}, retrying in {delay:.1f}s: {error}")
+                time.sleep(delay)
+                continue
+            breaker.record_success()
+            cache.put(endpoint, args, kwargs, result, namespace=self.provider.name)
+            return result
 
     def fetch_stock_daily_data(self, symbol, start_date, end_date, adjust='hfq'):
         """
@@ -148,13 +200,35 @@ class DataFetcher:
         """
         logger.info(f"Fetching daily data in mode {adjust}: for {symbol} from {start_date} to {end_date}...")
         return self._fetch_with_retry(
-            ak.stock_zh_a_daily,
+            self.provider.stock_zh_a_daily,
             symbol=symbol,
             start_date=start_date,
             end_date=end_date,
             adjust=adjust
         )
 
+    def fetch_stock_adjust_factors(self, symbol):
+        """
+        获取股票的后复权因子变化点。
+
+        Args:
+            symbol (str): 股票代码。
+
+        Returns:
+            pandas.DataFrame: 列为 date、hfq_factor 的DataFrame。
+
+        Raises:
+            DataFetchError: 如果获取复权因子失败，则抛出此异常。
+        """
+        logger.info(f"Fetching adjust factors for {symbol}...")
+        return self._fetch_with_retry(
+            self.provider.stock_zh_a_daily,
+            symbol=symbol,
+            start_date=config.START_DATE,
+            end_date=self.today.strftime("%Y%m%d"),
+            adjust='hfq-factor'
+        )
+
     def fetch_index_daily_data(self, symbol, start_date, end_date):
         """
         获取指数日数据。
@@ -179,7 +253,7 @@ class DataFetcher:
                 symbol = symbol.zfill(6)  # 补齐6位
                 
             return self._fetch_with_retry(
-                ak.index_zh_a_hist,  # 修改为东财的历史数据接口
+                self.provider.index_zh_a_hist,  # 东财的历史数据接口
                 symbol=symbol,
                 start_date=start_date,
                 end_date=end_date,
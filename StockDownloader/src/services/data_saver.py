@@ -6,24 +6,72 @@ Authors: hovi.hyw & AI
 Date: 2024-07-03
 """
 
+from datetime import date
+
 import pandas as pd
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
 
+from ..core.config import config
 from ..core.exceptions import DataSaveError
 from ..core.logger import logger
+from ..database.models.factor import AdjustFactor
 from ..database.models.index import IndexDailyData
 from ..database.models.stock import StockDailyData
 from ..database.models.info import StockInfo, IndexInfo
-from ..database.session import get_db
+from ..database.session import SessionLocal
+from ..database.upsert import upsert_statement
+from .bulk_loader import copy_daily_frame, supports_copy
+from .normalizers import frame_to_records, normalize_index_daily, normalize_stock_daily
+from .watermarks import update_watermarks
 
 
 class DataSaver:
     """
     数据保存类。
     该类负责将股票、指数和概念板块数据保存到数据库。
+
+    Attributes:
+        db (Session): 外部传入的数据库会话，为 None 时使用保存器自己持有的会话。
     """
 
+    def __init__(self, db: Session = None):
+        """
+        初始化DataSaver实例。
+
+        Args:
+            db (Session, optional): 数据库会话。并行下载时每个工作线程传入自己的会话。
+        """
+        self.db = db
+        self._own_session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _get_session(self) -> Session:
+        """
+        获取用于保存数据的数据库会话。
+
+        Returns:
+            Session: 外部传入的会话，或该保存器自己持有的会话。每次提交或回滚后连接即归还连接池。
+        """
+        if self.db is not None:
+            return self.db
+        if self._own_session is None:
+            self._own_session = SessionLocal()
+        return self._own_session
+
+    def close(self):
+        """
+        关闭保存器自己创建的会话。外部传入的会话由调用方关闭。
+        """
+        if self._own_session is not None:
+            self._own_session.close()
+            self._own_session = None
+
     def save_stock_list_to_csv(self, stock_list, file_path):
         """
         保存股票列表到 CSV 文件。
@@ -60,9 +108,213 @@ class DataSaver:
             logger.error(f"Failed to save index list to CSV: {e}")
             raise DataSaveError(f"Failed to save index list to CSV: {e}")
 
+    @staticmethod
+    def _upsert_statement(db: Session, model):
+        """
+        构造按主键 (symbol, date) 冲突时更新的批量插入语句，支持 PostgreSQL 和 SQLite。
+
+        Args:
+            db (Session): 数据库会话。
+            model: 日线数据模型类。
+
+        Returns:
+            Insert: INSERT ... ON CONFLICT DO UPDATE 语句；其他数据库返回 None。
+        """
+        return upsert_statement(db, model)
+
+    def _save_daily_frame(self, db: Session, model, frame):
+        """
+        把规范化日线数据批量写入会话，已存在的 (symbol, date) 用新数据覆盖。不提交事务。
+
+        Args:
+            db (Session): 数据库会话。
+            model: 日线数据模型类，StockDailyData 或 IndexDailyData。
+            frame (pandas.DataFrame): 由 normalizers 规范化后的日线数据，可以包含多个代码。
+
+        Returns:
+            int: 写入的记录数。
+        """
+        records = frame_to_records(frame)
+        if not records:
+            return 0
+        statement = self._upsert_statement(db, model)
+        if statement is None:
+            for record in records:
+                db.merge(model(**record))
+        else:
+            # executemany 由 SQLAlchemy 分页为多行 VALUES 语句
+            db.execute(statement, records)
+        return len(records)
+
+    def _replace_adjust_factors(self, db: Session, factors):
+        """
+        用新获取的因子序列替换这些代码的全部复权因子。不提交事务。
+
+        Args:
+            db (Session): 数据库会话。
+            factors (dict): 代码 -> 规范化后的复权因子DataFrame，空DataFrame表示保留原有因子。
+
+        Returns:
+            int: 写入的因子记录数。
+        """
+        factors = {symbol: frame for symbol, frame in (factors or {}).items() if frame is not None and not frame.empty}
+        if not factors:
+            return 0
+        db.execute(delete(AdjustFactor).where(AdjustFactor.symbol.in_(list(factors))))
+        records = frame_to_records(pd.concat(factors.values(), ignore_index=True))
+        db.execute(insert(AdjustFactor), records)
+        return len(records)
+
+    def _write_daily_frames(self, db: Session, model, frames, bulk_load=False, factors=None):
+        """
+        把多个代码的规范化日线数据写入会话，PostgreSQL 批量导入时使用 COPY，否则使用批量 upsert，
+        并更新这些代码的入库水位和复权因子。不提交事务。
+
+        Args:
+            db (Session): 数据库会话。
+            model: 日线数据模型类。
+            frames (list): (代码, 规范化DataFrame) 元组列表。
+            bulk_load (bool): 是否使用 COPY 批量导入。
+            factors (dict, optional): 代码 -> 规范化后的复权因子DataFrame，只替换其中代码的因子。
+
+        Returns:
+            int: 写入的记录数。
+        """
+        if not frames:
+            return 0
+        frame = pd.concat([frame for _, frame in frames], ignore_index=True)
+        if bulk_load and config.BULK_LOAD_USE_COPY and supports_copy(db):
+            count = copy_daily_frame(db, model, frame)
+        else:
+            count = self._save_daily_frame(db, model, frame)
+        # 水位、复权因子与日线数据在同一事务中提交
+        update_watermarks(db, model, frame)
+        self._replace_adjust_factors(db, factors)
+        return count
+
+    def save_daily_frames_to_db(self, model, frames, bulk_load=False):
+        """
+        在一个事务中保存多个代码的规范化日线数据。
+
+        Args:
+            model: 日线数据模型类，StockDailyData 或 IndexDailyData。
+            frames (list): (代码, 规范化DataFrame) 元组列表。
+            bulk_load (bool): 是否使用 COPY 批量导入，仅对 PostgreSQL 生效，其他数据库仍使用批量 upsert。
+
+        Raises:
+            DataSaveError: 如果保存失败，则抛出此异常，整批数据回滚。
+        """
+        symbols = [symbol for symbol, _ in frames]
+        try:
+            db: Session = self._get_session()
+            upserted_count = self._write_daily_frames(db, model, frames, bulk_load)
+            db.commit()
+            logger.info(f"Upserted {upserted_count} records for {len(symbols)} symbols in {model.__tablename__}.")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to save daily data batch {symbols} to database: {e}")
+            raise DataSaveError(f"Failed to save daily data batch {symbols} to database: {e}")
+
+    def save_daily_frames_isolated(self, model, frames, bulk_load=False, factors=None):
+        """
+        在一个事务中保存多个代码的规范化日线数据，单个代码的错误不影响其他代码。
+        先整批写入；失败时回滚，再为每个代码建立保存点逐个重试，只丢弃出错代码的数据。
+
+        Args:
+            model: 日线数据模型类，StockDailyData 或 IndexDailyData。
+            frames (list): (代码, 规范化DataFrame) 元组列表。
+            bulk_load (bool): 是否使用 COPY 批量导入，仅对 PostgreSQL 生效。
+            factors (dict, optional): 代码 -> 规范化后的复权因子DataFrame，与对应代码的日线数据一起写入。
+
+        Returns:
+            tuple: (写入的记录数, 失败代码 -> 失败原因)。
+
+        Raises:
+            DataSaveError: 如果提交事务失败，则抛出此异常。
+        """
+        db: Session = self._get_session()
+        try:
+            upserted_count = self._write_daily_frames(db, model, frames, bulk_load, factors)
+            db.commit()
+            return upserted_count, {}
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Batch of {len(frames)} symbols failed in {model.__tablename__}, "
+                           f"retrying symbol by symbol: {e}")
+
+        upserted_count = 0
+        failed = {}
+        try:
+            for symbol, frame in frames:
+                try:
+                    with db.begin_nested():
+                        symbol_factors = {symbol: factors[symbol]} if factors and symbol in factors else None
+                        upserted_count += self._write_daily_frames(db, model, [(symbol, frame)], bulk_load,
+                                                                   symbol_factors)
+                except Exception as e:
+                    logger.error(f"Failed to save daily data for {symbol} to database: {e}")
+                    failed[symbol] = str(e)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to commit daily data batch to database: {e}")
+            raise DataSaveError(f"Failed to commit daily data batch to database: {e}")
+        return upserted_count, failed
+
+    def save_adjust_factors(self, factors):
+        """
+        在一个事务中替换这些代码的全部复权因子。
+
+        Args:
+            factors (dict): 代码 -> 规范化后的复权因子DataFrame，空DataFrame表示保留原有因子。
+
+        Returns:
+            int: 写入的因子记录数。
+
+        Raises:
+            DataSaveError: 如果保存失败，则抛出此异常，原有因子保持不变。
+        """
+        db: Session = self._get_session()
+        try:
+            written = self._replace_adjust_factors(db, factors)
+            db.commit()
+            return written
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to save adjust factors: {e}")
+            raise DataSaveError(f"Failed to save adjust factors: {e}")
+
+    def replace_daily_history(self, model, symbol, frame, factors=None):
+        """
+        在一个事务中用完整历史替换某个代码的全部日线数据，用于复权价格发生变化后的重写。
+
+        Args:
+            model: 日线数据模型类，StockDailyData 或 IndexDailyData。
+            symbol (str): 代码。
+            frame (pandas.DataFrame): 该代码规范化后的完整历史。
+            factors (pandas.DataFrame, optional): 该代码规范化后的复权因子，为空时保留原有因子。
+
+        Returns:
+            int: 写入的记录数。
+
+        Raises:
+            DataSaveError: 如果替换失败，则抛出此异常，原有数据保持不变。
+        """
+        db: Session = self._get_session()
+        try:
+            deleted = db.execute(delete(model).where(model.symbol == symbol)).rowcount
+            written = self._write_daily_frames(db, model, [(symbol, frame)], factors={symbol: factors})
+            db.commit()
+            logger.info(f"Replaced {deleted} records with {written} records for {symbol} in {model.__tablename__}.")
+            return written
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to replace daily history for {symbol}: {e}")
+            raise DataSaveError(f"Failed to replace daily history for {symbol}: {e}")
+
     def save_stock_daily_data_to_db(self, stock_data, symbol):
         """
-        保存股票日数据到数据库，仅更新日期较新的数据。
+        保存股票日数据到数据库，已存在的日期用新数据覆盖。
 
         Args:
             stock_data (pandas.DataFrame): 包含股票日线数据的DataFrame。
@@ -73,50 +325,71 @@ class DataSaver:
         """
         try:
             logger.info(f"Saving daily data for stock {symbol} to database...")
-            db: Session = next(get_db())
-            updated_count = 0
-            inserted_count = 0
-            for _, row in stock_data.iterrows():
-                row_date_str = row["date"]
-                row_date = pd.to_datetime(row_date_str, errors='coerce').date()
-                if pd.isna(row_date):
-                    logger.warning(f"Invalid date format: {row_date_str}")
-                    continue
-
-                existing_record = db.query(StockDailyData).filter_by(symbol=symbol, date=row_date).first()
-                if existing_record:
-                    if row_date > existing_record.date:
-                        existing_record.open = row["open"]
-                        existing_record.close = row["close"]
-                        existing_record.high = row["high"]
-                        existing_record.low = row["low"]
-                        existing_record.volume = row["volume"]
-                        existing_record.amount = row["amount"]
-                        existing_record.outstanding_share = row["outstanding_share"]
-                        existing_record.turnover = row["turnover"]
-                        updated_count += 1
-                else:
-                    db.add(StockDailyData(
-                        symbol=symbol,
-                        date=row_date,
-                        open=row["open"],
-                        close=row["close"],
-                        high=row["high"],
-                        low=row["low"],
-                        volume=row["volume"],
-                        amount=row["amount"],
-                        outstanding_share=row["outstanding_share"],
-                        turnover=row["turnover"]
-                    ))
-                    inserted_count += 1
+            db: Session = self._get_session()
+            frame = normalize_stock_daily(stock_data, symbol)
+            upserted_count = self._write_daily_frames(db, StockDailyData, [(symbol, frame)])
             db.commit()
-            logger.info(
-                f"Updated {updated_count} records and inserted {inserted_count} new records for stock {symbol}.")
+            logger.info(f"Upserted {upserted_count} records for stock {symbol}.")
         except Exception as e:
             db.rollback()
             logger.error(f"Failed to save daily data for stock {symbol} to database: {e}")
             raise DataSaveError(f"Failed to save daily data for stock {symbol} to database: {e}")
 
+    def _sync_info(self, model, listing, mark_delisted):
+        """
+        把代码列表与基本信息表做差异同步：一次读取整表，批量插入新代码、批量更新改名的代码，
+        并为从列表中消失的代码记录退市日期。
+
+        Args:
+            model: 基本信息模型类，StockInfo 或 IndexInfo。
+            listing (pandas.DataFrame): 列为 symbol、name 的代码列表。
+            mark_delisted (bool): 是否为列表中不存在的代码记录退市日期。
+
+        Returns:
+            dict: 新增、改名、退市和重新上市的代码数量。
+        """
+        db: Session = self._get_session()
+        listing = listing.dropna(subset=['symbol', 'name']).drop_duplicates(subset='symbol', keep='last')
+        names = dict(zip(listing['symbol'], listing['name']))
+        existing = {symbol: (name, delist_date) for symbol, name, delist_date in
+                    db.execute(select(model.symbol, model.name, model.delist_date))}
+
+        inserted = [{'symbol': symbol, 'name': name} for symbol, name in names.items() if symbol not in existing]
+        updated = []
+        renamed = relisted = 0
+        for symbol, (name, delist_date) in existing.items():
+            if symbol in names:
+                changes = {}
+                if names[symbol] != name:
+                    changes['name'] = names[symbol]
+                    renamed += 1
+                if delist_date is not None:
+                    changes['delist_date'] = None
+                    relisted += 1
+                if changes:
+                    updated.append({'symbol': symbol, **changes})
+
+        missing = [symbol for symbol, (_, delist_date) in existing.items()
+                   if symbol not in names and delist_date is None]
+        delisted = 0
+        if mark_delisted and missing:
+            # 列表接口返回不完整时不应把大量代码标记为退市
+            if len(missing) > len(existing) * config.INFO_SYNC_MAX_DELIST_RATIO:
+                logger.warning(f"{len(missing)} of {len(existing)} {model.__tablename__} symbols are missing from "
+                               f"the listing, not marking them as delisted")
+            else:
+                today = date.today()
+                updated.extend({'symbol': symbol, 'delist_date': today} for symbol in missing)
+                delisted = len(missing)
+
+        if inserted:
+            db.execute(insert(model), inserted)
+        # 按主键批量更新，各行可以更新不同的列
+        for columns in {tuple(sorted(row)) for row in updated}:
+            db.execute(update(model), [row for row in updated if tuple(sorted(row)) == columns])
+        db.commit()
+        return {'inserted': len(inserted), 'renamed': renamed, 'delisted': delisted, 'relisted': relisted}
+
     def save_stock_info_to_db(self, stock_list):
         """
         保存股票基本信息到数据库。
@@ -124,90 +397,52 @@ class DataSaver:
         Args:
             stock_list (pandas.DataFrame): 包含股票列表的DataFrame，必须包含'代码'和'名称'列。
 
+        Returns:
+            dict: 新增、改名、退市和重新上市的股票数量。
+
         Raises:
             DataSaveError: 如果保存股票基本信息到数据库失败，则抛出此异常。
         """
         try:
             logger.info("Saving stock info to database...")
-            db: Session = next(get_db())
-            inserted_count = 0
-            updated_count = 0
-            
-            for _, row in stock_list.iterrows():
-                symbol = row["代码"]
-                name = row["名称"]
-                
-                # 检查记录是否已存在
-                existing_record = db.query(StockInfo).filter_by(symbol=symbol).first()
-                if existing_record:
-                    # 如果名称有变化，则更新
-                    if existing_record.name != name:
-                        existing_record.name = name
-                        updated_count += 1
-                else:
-                    # 添加新记录
-                    try:
-                        db.add(StockInfo(symbol=symbol, name=name))
-                        inserted_count += 1
-                    except IntegrityError:
-                        # 处理可能的并发插入导致的完整性错误
-                        db.rollback()
-                        existing_record = db.query(StockInfo).filter_by(symbol=symbol).first()
-                        if existing_record and existing_record.name != name:
-                            existing_record.name = name
-                            updated_count += 1
-            
-            db.commit()
-            logger.info(f"Inserted {inserted_count} and updated {updated_count} stock info records.")
+            listing = pd.DataFrame({
+                'symbol': stock_list["代码"].astype(str).str.strip(),
+                'name': stock_list["名称"],
+            })
+            result = self._sync_info(StockInfo, listing, mark_delisted=True)
+            logger.info(f"Stock info synced: inserted {result['inserted']}, renamed {result['renamed']}, "
+                        f"delisted {result['delisted']}, relisted {result['relisted']}.")
+            return result
         except Exception as e:
-            db.rollback()
+            self._get_session().rollback()
             logger.error(f"Failed to save stock info to database: {e}")
             raise DataSaveError(f"Failed to save stock info to database: {e}")
 
     def save_index_info_to_db(self, index_list):
         """
         保存指数基本信息到数据库。
+        指数列表只包含 config.INDICES_NAMES 分类下的指数，不在列表中的指数不会被标记为终止。
 
         Args:
             index_list (pandas.DataFrame): 包含指数列表的DataFrame，必须包含'代码'和'名称'列。
 
+        Returns:
+            dict: 新增和改名的指数数量。
+
         Raises:
             DataSaveError: 如果保存指数基本信息到数据库失败，则抛出此异常。
         """
         try:
             logger.info("Saving index info to database...")
-            db: Session = next(get_db())
-            inserted_count = 0
-            updated_count = 0
-            
-            for _, row in index_list.iterrows():
-                symbol = str(row["代码"]).zfill(6)  # 确保指数代码为6位
-                name = row["名称"]
-                
-                # 检查记录是否已存在
-                existing_record = db.query(IndexInfo).filter_by(symbol=symbol).first()
-                if existing_record:
-                    # 如果名称有变化，则更新
-                    if existing_record.name != name:
-                        existing_record.name = name
-                        updated_count += 1
-                else:
-                    # 添加新记录
-                    try:
-                        db.add(IndexInfo(symbol=symbol, name=name))
-                        inserted_count += 1
-                    except IntegrityError:
-                        # 处理可能的并发插入导致的完整性错误
-                        db.rollback()
-                        existing_record = db.query(IndexInfo).filter_by(symbol=symbol).first()
-                        if existing_record and existing_record.name != name:
-                            existing_record.name = name
-                            updated_count += 1
-            
-            db.commit()
-            logger.info(f"Inserted {inserted_count} and updated {updated_count} index info records.")
+            listing = pd.DataFrame({
+                'symbol': index_list["代码"].astype(str).str.strip().str.zfill(6),  # 确保指数代码为6位
+                'name': index_list["名称"],
+            })
+            result = self._sync_info(IndexInfo, listing, mark_delisted=False)
+            logger.info(f"Index info synced: inserted {result['inserted']}, renamed {result['renamed']}.")
+            return result
         except Exception as e:
-            db.rollback()
+            self._get_session().rollback()
             logger.error(f"Failed to save index info to database: {e}")
             raise DataSaveError(f"Failed to save index info to database: {e}")
 
@@ -215,49 +450,11 @@ class DataSaver:
         """保存指数日数据到数据库"""
         try:
             logger.info(f"Saving daily data for index {symbol}({index_name}) to database...")
-            db: Session = next(get_db())
-            updated_count = 0
-            inserted_count = 0
-            for _, row in index_data.iterrows():
-                row_date_str = row["日期"]
-                row_date = pd.to_datetime(row_date_str, errors='coerce').date()
-                if pd.isna(row_date):
-                    logger.warning(f"Invalid date format: {row_date_str}")
-                    continue
-
-                existing_record = db.query(IndexDailyData).filter_by(symbol=symbol, date=row_date).first()
-                if existing_record:
-                    if row_date > existing_record.date:
-                        existing_record.open = row["开盘"]
-                        existing_record.close = row["收盘"]
-                        existing_record.high = row["最高"]
-                        existing_record.low = row["最低"]
-                        existing_record.volume = row["成交量"]
-                        existing_record.amount = row["成交额"]
-                        existing_record.amplitude = row["振幅"]
-                        existing_record.change_rate = row["涨跌幅"]
-                        existing_record.change_amount = row["涨跌额"]
-                        existing_record.turnover_rate = row["换手率"]
-                        updated_count += 1
-                else:
-                    db.add(IndexDailyData(
-                        symbol=symbol,
-                        date=row_date,
-                        open=row["开盘"],
-                        close=row["收盘"],
-                        high=row["最高"],
-                        low=row["最低"],
-                        volume=row["成交量"],
-                        amount=row["成交额"],
-                        amplitude=row["振幅"],
-                        change_rate=row["涨跌幅"],
-                        change_amount=row["涨跌额"],
-                        turnover_rate=row["换手率"]
-                    ))
-                    inserted_count += 1
+            db: Session = self._get_session()
+            frame = normalize_index_daily(index_data, symbol)
+            upserted_count = self._write_daily_frames(db, IndexDailyData, [(symbol, frame)])
             db.commit()
-            logger.info(
-                f"Updated {updated_count} records and inserted {inserted_count} new records for index {symbol}.")
+            logger.info(f"Upserted {upserted_count} records for index {symbol}.")
         except Exception as e:
             db.rollback()
             logger.error(f"Failed to save daily data for index {symbol} to database: {e}")
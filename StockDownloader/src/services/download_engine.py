@@ -0,0 +1,158 @@
+# src/services/download_engine.py
+"""
+此模块实现了有界并发的下载引擎。
+将股票/指数代码分发到线程池中并行处理，每个工作线程持有独立的数据获取器、数据保存器和数据库会话，
+并汇总每个代码的成功/失败结果。
+Authors: hovi.hyw & AI
+Date: 2026-10-18
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from ..core.config import config
+from ..core.logger import logger
+from ..database.session import SessionLocal
+from .data_fetcher import DataFetcher
+from .data_saver import DataSaver
+
+
+@dataclass
+class DownloadReport:
+    """
+    下载结果汇总。
+
+    Attributes:
+        total (int): 提交的代码总数。
+        succeeded (list): 处理成功的代码列表。
+        failed (dict): 处理失败的代码及其失败原因。
+        empty (list): 未获取到新数据的代码列表（例如停牌或已是最新）。
+        elapsed (float): 总耗时（秒）。
+    """
+    total: int = 0
+    succeeded: list = field(default_factory=list)
+    failed: dict = field(default_factory=dict)
+    empty: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def summary(self):
+        """
+        生成一行可读的汇总信息。
+
+        Returns:
+            str: 汇总信息。
+        """
+        return (f"共 {self.total} 个，成功 {len(self.succeeded)} 个，无新数据 {len(self.empty)} 个，"
+                f"失败 {len(self.failed)} 个，耗时 {self.elapsed:.1f} 秒")
+
+
+class _WorkerContext:
+    """
+    工作线程上下文，持有该线程独占的数据获取器、数据保存器和数据库会话。
+    """
+
+    def __init__(self):
+        self.db = SessionLocal()
+        self.fetcher = DataFetcher()
+        self.saver = DataSaver(db=self.db)
+
+    def close(self):
+        self.db.close()
+
+
+class DownloadEngine:
+    """
+    有界并发下载引擎。
+    使用固定大小的线程池处理代码列表，并发数由 config.MAX_THREADS 控制。
+
+    Attributes:
+        max_workers (int): 工作线程数。
+        label (str): 日志中使用的任务名称。
+    """
+
+    def __init__(self, max_workers=None, label="下载"):
+        """
+        初始化DownloadEngine实例。
+
+        Args:
+            max_workers (int, optional): 工作线程数，默认为 config.MAX_THREADS。
+            label (str, optional): 日志中使用的任务名称。
+        """
+        self.max_workers = max(1, max_workers or config.MAX_THREADS)
+        self.label = label
+        self._local = threading.local()
+        self._contexts = []
+        self._contexts_lock = threading.Lock()
+
+    def _get_context(self):
+        """
+        获取当前工作线程的上下文，首次调用时创建。
+
+        Returns:
+            _WorkerContext: 当前线程的上下文。
+        """
+        context = getattr(self._local, "context", None)
+        if context is None:
+            context = _WorkerContext()
+            self._local.context = context
+            with self._contexts_lock:
+                self._contexts.append(context)
+        return context
+
+    def _run_one(self, task, item):
+        context = self._get_context()
+        return task(item, fetcher=context.fetcher, saver=context.saver)
+
+    def _close_contexts(self):
+        with self._contexts_lock:
+            for context in self._contexts:
+                try:
+                    context.close()
+                except Exception as e:
+                    logger.warning(f"关闭工作线程数据库会话失败: {e}")
+            self._contexts.clear()
+
+    def run(self, items, task, key=str):
+        """
+        并行处理所有条目。
+
+        Args:
+            items (iterable): 待处理的条目，例如股票代码或 (代码, 名称) 元组。
+            task (callable): 处理单个条目的函数，签名为 task(item, fetcher=..., saver=...)，
+                成功返回 True，失败返回 False 或抛出异常。
+            key (callable, optional): 从条目中提取代码的函数，用于结果汇总。
+
+        Returns:
+            DownloadReport: 下载结果汇总。
+        """
+        items = list(items)
+        report = DownloadReport(total=len(items))
+        start_time = time.monotonic()
+        logger.info(f"开始并行{self.label}，共 {report.total} 个，线程数 {self.max_workers}")
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="download") as executor:
+                futures = {executor.submit(self._run_one, task, item): key(item) for item in items}
+                for done_count, future in enumerate(as_completed(futures), start=1):
+                    symbol = futures[future]
+                    try:
+                        if future.result():
+                            report.succeeded.append(symbol)
+                        else:
+                            report.failed[symbol] = "未获取到数据或保存失败"
+                    except Exception as e:
+                        report.failed[symbol] = str(e)
+                        logger.error(f"{self.label} {symbol} 时出错: {e}")
+
+                    if done_count % 100 == 0 or done_count == report.total:
+                        logger.info(f"{self.label}进度: {done_count}/{report.total}，失败 {len(report.failed)} 个")
+        finally:
+            self._close_contexts()
+
+        report.elapsed = time.monotonic() - start_time
+        logger.info(f"{self.label}完成: {report.summary()}")
+        if report.failed:
+            logger.warning(f"{self.label}失败的代码: {sorted(report.failed)}")
+        return report
@@ -0,0 +1,170 @@
+# src/services/fetch_executor.py
+"""
+此模块提供长期存活的、带超时的数据获取执行器。
+所有API调用共用同一个线程池，不再为每次请求新建线程池；同时为 requests 设置默认的连接/读取超时，
+使超时真正下沉到HTTP层，超时的调用线程能够自行结束。执行器记录仍未结束的超时调用数量并设置上限，
+同时统计完成、失败与超时的调用次数。
+Authors: hovi.hyw & AI
+Date: 2026-10-18
+"""
+
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from requests.adapters import HTTPAdapter
+
+from ..core.config import config
+from ..core.exceptions import DataFetchError, FetchTimeoutError
+from ..core.logger import logger
+
+_http_timeout_installed = False
+_http_timeout_lock = threading.Lock()
+
+
+def install_default_http_timeout(timeout=None):
+    """
+    为所有未显式指定超时的 requests 请求设置默认的连接/读取超时。
+    AKShare 内部调用 requests 时大多没有传入 timeout，这里在 HTTPAdapter 层统一补上。
+
+    Args:
+        timeout (float, optional): 超时时间（秒），默认为 config.GET_TIMEOUT。
+    """
+    global _http_timeout_installed
+    timeout = timeout or config.GET_TIMEOUT
+    with _http_timeout_lock:
+        if _http_timeout_installed:
+            return
+        original_send = HTTPAdapter.send
+        default_timeout = (timeout, timeout)
+
+        @functools.wraps(original_send)
+        def send(self, request, timeout=None, **kwargs):
+            if timeout is None:
+                timeout = default_timeout
+            return original_send(self, request, timeout=timeout, **kwargs)
+
+        HTTPAdapter.send = send
+        _http_timeout_installed = True
+        logger.info(f"Installed default HTTP timeout of {timeout} seconds")
+
+
+class FetchExecutor:
+    """
+    共享的数据获取执行器。
+
+    Attributes:
+        timeout (float): 单次调用的等待超时（秒）。
+        max_hung (int): 允许同时存在的已超时但仍未结束的调用数上限。
+    """
+
+    def __init__(self, max_workers=None, max_hung=None, timeout=None):
+        """
+        初始化FetchExecutor实例。
+
+        Args:
+            max_workers (int, optional): 正常调用的并发线程数，默认为 config.MAX_THREADS。
+            max_hung (int, optional): 超时调用数上限，默认为 config.MAX_HUNG_FETCHES。
+            timeout (float, optional): 调用超时时间（秒），默认为 config.GET_TIMEOUT。
+        """
+        self.timeout = timeout or config.GET_TIMEOUT
+        self.max_hung = max_hung if max_hung is not None else config.MAX_HUNG_FETCHES
+        # 额外预留给超时线程的容量，避免卡住的调用占满线程池
+        workers = (max_workers or config.MAX_THREADS) + self.max_hung
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fetch")
+        self._lock = threading.Lock()
+        self._hung = set()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._timed_out = 0
+        self._late_completed = 0
+
+    def _on_done(self, future):
+        with self._lock:
+            self._in_flight -= 1
+            if future in self._hung:
+                self._hung.discard(future)
+                self._late_completed += 1
+
+    def call(self, func, *args, **kwargs):
+        """
+        在共享线程池中执行调用并等待结果。
+
+        Args:
+            func (callable): 数据获取函数。
+            *args: 参数。
+            **kwargs: 关键字参数。
+
+        Returns:
+            Any: 数据获取函数的结果。
+
+        Raises:
+            FetchTimeoutError: 如果调用超时，则抛出此异常，仍在运行的调用通过其 future 属性返回。
+            DataFetchError: 如果仍未结束的超时调用已达上限，则抛出此异常。
+        """
+        with self._lock:
+            if len(self._hung) >= self.max_hung:
+                raise DataFetchError(
+                    f"Too many hung fetch calls ({len(self._hung)}), refusing new request")
+            self._in_flight += 1
+
+        future = self._executor.submit(func, *args, **kwargs)
+        future.add_done_callback(self._on_done)
+        try:
+            result = future.result(timeout=self.timeout)
+        except TimeoutError:
+            with self._lock:
+                self._timed_out += 1
+                hung = not future.cancel() and not future.done()
+                if hung:
+                    self._hung.add(future)
+            raise FetchTimeoutError(f"Operation timed out after {self.timeout} seconds", future if hung else None)
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        with self._lock:
+            self._completed += 1
+        return result
+
+    def stats(self):
+        """
+        获取执行器的调用统计。
+
+        Returns:
+            dict: 包含进行中、已超时未结束、完成、失败、超时和超时后完成的调用次数。
+        """
+        with self._lock:
+            return {
+                'in_flight': self._in_flight,
+                'hung': len(self._hung),
+                'max_hung': self.max_hung,
+                'completed': self._completed,
+                'failed': self._failed,
+                'timed_out': self._timed_out,
+                'late_completed': self._late_completed,
+            }
+
+    def shutdown(self):
+        """关闭线程池，不等待超时的调用结束。"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_fetch_executor():
+    """
+    获取进程内共享的数据获取执行器，首次调用时创建并设置HTTP默认超时。
+
+    Returns:
+        FetchExecutor: 共享的执行器。
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            install_default_http_timeout()
+            _executor = FetchExecutor()
+        return _executor
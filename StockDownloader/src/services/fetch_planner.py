@@ -0,0 +1,223 @@
+# src/services/fetch_planner.py
+"""
+此模块实现了按缺口规划的数据获取。
+对每个代码，把入库水位目录中记录的已有日线覆盖范围与交易日历、上市/退市日期比较，只为真正缺失的日期区间生成获取任务，
+并估算请求数、缺失交易日数和耗时。下载、更新和补全模式都执行同一份计划，避免重复请求已入库的数据。
+Authors: hovi.hyw & AI
+Date: 2026-10-18
+"""
+
+from dataclasses import dataclass, field
+
+from sqlalchemy import func, select, update
+
+from ..core.config import config
+from ..core.logger import logger
+from ..database.models.index import IndexDailyData
+from ..database.models.info import IndexInfo, StockInfo
+from ..database.models.stock import StockDailyData
+from ..database.session import session_scope
+from ..utils.trading_calendar import get_trading_calendar, to_date
+from .pipeline import FetchJob
+from .rate_limiter import ENDPOINT_RATE_LIMITS
+from .watermarks import load_watermarks
+
+# 数据类型 -> (日线模型, 基本信息模型, 上游接口)
+PLANNER_KINDS = {
+    'stock': (StockDailyData, StockInfo, 'stock_zh_a_daily'),
+    'index': (IndexDailyData, IndexInfo, 'index_zh_a_hist'),
+}
+
+
+@dataclass
+class FetchPlan:
+    """
+    获取计划。
+
+    Attributes:
+        kind (str): 数据类型，'stock' 或 'index'。
+        jobs (list): 需要执行的获取任务。
+        up_to_date (list): 无需获取的代码列表。
+        missing_days (int): 计划获取的交易日总数。
+        estimated_seconds (float): 预计耗时（秒）。
+    """
+    kind: str
+    jobs: list = field(default_factory=list)
+    up_to_date: list = field(default_factory=list)
+    missing_days: int = 0
+    estimated_seconds: float = 0.0
+
+    @property
+    def estimated_requests(self):
+        return len(self.jobs)
+
+    def summary(self):
+        """
+        生成一行可读的计划信息。
+
+        Returns:
+            str: 计划信息。
+        """
+        symbols = len({job.symbol for job in self.jobs})
+        return (f"{self.kind} 计划请求 {self.estimated_requests} 次（{symbols} 个代码，缺失 {self.missing_days} 个交易日），"
+                f"已是最新 {len(self.up_to_date)} 个，预计耗时 {self.estimated_seconds:.0f} 秒")
+
+
+class FetchPlanner:
+    """
+    缺口感知的获取计划器。
+
+    Attributes:
+        kind (str): 数据类型，'stock' 或 'index'。
+        start_date (date): 需要覆盖的最早日期。
+        end_date (date): 需要覆盖的最晚交易日。
+    """
+
+    def __init__(self, kind, start_date=None, end_date=None, calendar=None):
+        """
+        初始化FetchPlanner实例。
+
+        Args:
+            kind (str): 数据类型，'stock' 或 'index'。
+            start_date (date|str, optional): 最早日期，默认为 config.START_DATE。
+            end_date (date|str, optional): 最晚日期，默认为今天。
+            calendar (TradingCalendar, optional): 交易日历，默认为共享的交易日历。
+        """
+        if kind not in PLANNER_KINDS:
+            raise ValueError(f"Unknown planner kind: {kind}")
+        self.kind = kind
+        self.model, self.info_model, self.endpoint = PLANNER_KINDS[kind]
+        self.calendar = calendar or get_trading_calendar()
+        self.start_date = to_date(start_date or config.START_DATE)
+        self.end_date = self.calendar.prev_trading_day(end_date, inclusive=True) or to_date(end_date)
+
+    def _load_coverage(self, db, symbols):
+        """从入库水位目录查询每个代码已入库数据的最早日期、最晚日期和条数。"""
+        return load_watermarks(db, self.kind, symbols)
+
+    def _load_listing(self, db, symbols):
+        """查询每个代码的上市和退市日期。"""
+        query = (
+            select(self.info_model.symbol, self.info_model.list_date, self.info_model.delist_date)
+            .where(self.info_model.symbol.in_(symbols))
+        )
+        return {symbol: (list_date, delist_date) for symbol, list_date, delist_date in db.execute(query)}
+
+    def _hole_windows(self, db, symbol, first, last):
+        """找出已入库范围内缺失的交易日，把相距不超过 config.PLAN_MERGE_GAP_DAYS 个交易日的缺口合并为一个区间。"""
+        stored = set(db.execute(
+            select(self.model.date).where(self.model.symbol == symbol, self.model.date.between(first, last))
+        ).scalars())
+        missing = [self.calendar.ordinal(day) for day in self.calendar.trading_days_between(first, last)
+                   if day not in stored]
+        windows = []
+        for ordinal in missing:
+            if windows and ordinal - windows[-1][1] <= config.PLAN_MERGE_GAP_DAYS + 1:
+                windows[-1][1] = ordinal
+            else:
+                windows.append([ordinal, ordinal])
+        return [(self.calendar.date_at(lo), self.calendar.date_at(hi)) for lo, hi in windows]
+
+    def _symbol_windows(self, db, symbol, coverage, listing, fill_holes):
+        list_date, delist_date = listing
+        lo = max(self.start_date, list_date) if list_date else self.start_date
+        hi = min(self.end_date, delist_date) if delist_date else self.end_date
+        if lo > hi:
+            return []
+        if coverage is None:
+            return [(lo, hi)] if self.calendar.count_trading_days(lo, hi) else []
+
+        first, last, count = coverage
+        windows = []
+        # 上市日期未知时，以已入库的最早日期作为历史起点；补全模式总是检查起点之前的数据
+        if (list_date or fill_holes) and first > lo:
+            head_end = self.calendar.prev_trading_day(first)
+            if head_end and head_end >= lo:
+                windows.append((lo, head_end))
+        if fill_holes and count < self.calendar.count_trading_days(first, last):
+            windows.extend(self._hole_windows(db, symbol, first, last))
+        tail_start = self.calendar.next_trading_day(last)
+        if tail_start and tail_start <= hi:
+            windows.append((tail_start, hi))
+        # 缺口过于分散（例如多次停牌）时合并为一个区间，一次请求取回
+        if len(windows) > config.PLAN_MAX_WINDOWS:
+            windows = [(windows[0][0], windows[-1][1])]
+        return windows
+
+    def _estimate_seconds(self, requests):
+        rate, _ = ENDPOINT_RATE_LIMITS.get(self.endpoint, (config.RATE_LIMIT_DEFAULT, 0))
+        by_latency = requests * config.PLAN_AVG_REQUEST_SECONDS / max(1, config.MAX_THREADS)
+        return max(requests / rate if rate > 0 else 0.0, by_latency)
+
+    def _with_overlap(self, windows, last, overlap_days):
+        """把紧接已入库数据的尾部区间向前扩展 overlap_days 个已入库交易日，返回 (区间列表, 重叠区间结束日期)。"""
+        if not overlap_days or not windows or windows[-1][0] != self.calendar.next_trading_day(last):
+            return windows, None
+        ordinal = self.calendar.ordinal(last)
+        if ordinal is None:
+            return windows, None
+        overlap_start = self.calendar.date_at(max(0, ordinal - overlap_days + 1))
+        return windows[:-1] + [(overlap_start, windows[-1][1])], last
+
+    def plan(self, symbols, names=None, fill_holes=False, overlap_days=0):
+        """
+        为代码列表生成获取计划。
+
+        Args:
+            symbols (list): 代码列表。
+            names (dict, optional): 代码 -> 名称，仅用于日志。
+            fill_holes (bool): 是否检查已入库范围内部的缺口，用于补全模式。
+            overlap_days (int): 尾部区间向前重叠的已入库交易日数，用于检测历史复权价格是否变化，0 表示不重叠。
+
+        Returns:
+            FetchPlan: 获取计划。
+        """
+        names = names or {}
+        plan = FetchPlan(kind=self.kind)
+        symbols = list(dict.fromkeys(symbols))
+        with session_scope() as db:
+            coverage = self._load_coverage(db, symbols) if symbols else {}
+            listing = self._load_listing(db, symbols) if symbols else {}
+            for symbol in symbols:
+                windows = self._symbol_windows(db, symbol, coverage.get(symbol), listing.get(symbol, (None, None)),
+                                               fill_holes)
+                if not windows:
+                    plan.up_to_date.append(symbol)
+                    continue
+                for start, end in windows:
+                    plan.missing_days += self.calendar.count_trading_days(start, end)
+                overlap_until = None
+                if symbol in coverage:
+                    windows, overlap_until = self._with_overlap(windows, coverage[symbol][1], overlap_days)
+                for index, (start, end) in enumerate(windows):
+                    is_tail = overlap_until and index == len(windows) - 1
+                    plan.jobs.append(FetchJob(symbol, start.strftime("%Y%m%d"), end.strftime("%Y%m%d"),
+                                              str(names.get(symbol, "")),
+                                              overlap_until.strftime("%Y%m%d") if is_tail else ""))
+
+        plan.estimated_seconds = self._estimate_seconds(plan.estimated_requests)
+        logger.info(plan.summary())
+        return plan
+
+    def record_listing_dates(self):
+        """
+        为上市日期未知的代码补充上市日期，取已入库的最早日期。
+        仅在从 config.START_DATE 起的全量下载之后调用，此时最早日期即为上市日期（或数据源最早日期）。
+
+        Returns:
+            int: 更新的代码数量。
+        """
+        first_date = (
+            select(func.min(self.model.date))
+            .where(self.model.symbol == self.info_model.symbol)
+            .scalar_subquery()
+        )
+        # 最早日期就是区间内第一个交易日时，无法区分上市日期与下载起点，保持未知
+        window_start = self.calendar.next_trading_day(self.start_date, inclusive=True)
+        statement = (
+            update(self.info_model)
+            .where(self.info_model.list_date.is_(None), first_date > window_start)
+            .values(list_date=first_date)
+        )
+        with session_scope() as db:
+            return db.execute(statement).rowcount
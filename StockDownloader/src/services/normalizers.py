@@ -0,0 +1,122 @@
+# src/services/normalizers.py
+"""
+此模块负责把AKShare返回的原始DataFrame规范化为与数据库模型一致的类型化数据。
+日期统一转换为 date 对象，数值列统一转换为数值类型，无效日期的行会被丢弃。
+Authors: hovi.hyw & AI
+Date: 2026-10-18
+"""
+
+import pandas as pd
+
+from ..core.logger import logger
+from ..database.models.index import IndexDailyData
+from ..database.models.stock import StockDailyData
+
+# 数据库中为 BigInteger 的列，需要转换为整数
+INTEGER_COLUMNS = {'volume', 'amount'}
+
+
+def _normalize_daily(frame, symbol, column_mappings):
+    """
+    按字段映射把原始日线数据规范化。
+
+    Args:
+        frame (pandas.DataFrame): 原始日线数据。
+        symbol (str): 股票或指数代码。
+        column_mappings (dict): 原始列名到模型字段名的映射。
+
+    Returns:
+        pandas.DataFrame: 列为 symbol、date 及模型字段的DataFrame，按日期升序排列。
+    """
+    columns = ['symbol'] + list(column_mappings.values())
+    if frame is None or frame.empty:
+        return pd.DataFrame(columns=columns)
+
+    data = frame.rename(columns=column_mappings)
+    dates = pd.to_datetime(data['date'], errors='coerce')
+    invalid = dates.isna()
+    if invalid.any():
+        logger.warning(f"Dropped {int(invalid.sum())} rows with invalid date for {symbol}")
+
+    result = pd.DataFrame({'symbol': symbol, 'date': dates}, index=data.index)
+    for column in column_mappings.values():
+        if column == 'date':
+            continue
+        if column not in data:
+            result[column] = None
+            continue
+        values = pd.to_numeric(data[column], errors='coerce')
+        if column in INTEGER_COLUMNS:
+            values = values.round().astype('Int64')
+        result[column] = values
+
+    result = result[~invalid]
+    result['date'] = result['date'].dt.date
+    result = result.drop_duplicates(subset='date', keep='last').sort_values('date')
+    return result[columns].reset_index(drop=True)
+
+
+def normalize_stock_daily(frame, symbol):
+    """
+    规范化 stock_zh_a_daily 返回的股票日线数据。
+
+    Args:
+        frame (pandas.DataFrame): 原始股票日线数据。
+        symbol (str): 股票代码。
+
+    Returns:
+        pandas.DataFrame: 与 StockDailyData 字段一致的DataFrame。
+    """
+    return _normalize_daily(frame, symbol, StockDailyData.column_mappings)
+
+
+def normalize_index_daily(frame, symbol):
+    """
+    规范化 index_zh_a_hist 返回的指数日线数据（中文列名）。
+
+    Args:
+        frame (pandas.DataFrame): 原始指数日线数据。
+        symbol (str): 指数代码。
+
+    Returns:
+        pandas.DataFrame: 与 IndexDailyData 字段一致的DataFrame。
+    """
+    return _normalize_daily(frame, symbol, IndexDailyData.column_mappings)
+
+
+def normalize_adjust_factors(frame, symbol):
+    """
+    规范化 stock_zh_a_daily(adjust='hfq-factor') 返回的后复权因子，只保留因子发生变化的日期。
+
+    Args:
+        frame (pandas.DataFrame): 原始复权因子数据，列为 date、hfq_factor。
+        symbol (str): 股票代码。
+
+    Returns:
+        pandas.DataFrame: 与 AdjustFactor 字段一致的DataFrame，按日期升序排列。
+    """
+    columns = ['symbol', 'date', 'hfq_factor']
+    if frame is None or frame.empty:
+        return pd.DataFrame(columns=columns)
+    result = pd.DataFrame({
+        'symbol': symbol,
+        'date': pd.to_datetime(frame['date'], errors='coerce'),
+        'hfq_factor': pd.to_numeric(frame['hfq_factor'], errors='coerce'),
+    })
+    result = result.dropna().sort_values('date').drop_duplicates(subset='date', keep='last')
+    result = result[(result['hfq_factor'] > 0) & (result['hfq_factor'].diff() != 0)]
+    result['date'] = result['date'].dt.date
+    return result[columns].reset_index(drop=True)
+
+
+def frame_to_records(frame):
+    """
+    把规范化后的DataFrame转换为字典列表，缺失值转换为 None。
+
+    Args:
+        frame (pandas.DataFrame): 规范化后的DataFrame。
+
+    Returns:
+        list[dict]: 可直接用于构造模型对象的字典列表。
+    """
+    return frame.astype(object).where(frame.notna(), None).to_dict('records')
@@ -0,0 +1,257 @@
+# src/services/pipeline.py
+"""
+此模块实现了 获取 → 规范化 → 入库 三段式流水线。
+获取阶段由多个工作线程并行请求AKShare，规范化阶段把原始DataFrame转换为类型化数据，
+入库阶段经写回缓冲区合并为大事务提交。各阶段之间使用有界队列连接，下游变慢时上游自动阻塞，内存占用保持平稳，
+网络等待与数据库写入可以相互重叠。
+Authors: hovi.hyw & AI
+Date: 2026-10-18
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass
+
+from ..core.config import config
+from ..core.logger import logger
+from ..database.models.index import IndexDailyData
+from ..database.models.stock import StockDailyData
+from .adjust_check import AdjustmentCheck, FactorCheck, refresh_factors, rewrite_histories
+from .download_engine import DownloadEngine, DownloadReport
+from .normalizers import normalize_adjust_factors, normalize_index_daily, normalize_stock_daily
+from .watermarks import record_fetch_status
+from .write_buffer import WriteBehindBuffer
+
+# 队列结束标记
+_STOP = object()
+
+
+@dataclass(frozen=True)
+class FetchJob:
+    """
+    单个代码的获取任务。
+
+    Attributes:
+        symbol (str): 股票或指数代码。
+        start_date (str): 开始日期，格式为 YYYYMMDD。
+        end_date (str): 结束日期，格式为 YYYYMMDD。
+        name (str): 股票或指数名称，仅用于日志。
+        overlap_until (str): 区间开头到该日期（含）为已入库数据，用于检测历史复权价格是否变化，为空表示不检测。
+    """
+    symbol: str
+    start_date: str
+    end_date: str
+    name: str = ""
+    overlap_until: str = ""
+
+
+def _fetch_stock(fetcher, job):
+    return fetcher.fetch_stock_daily_data(job.symbol, job.start_date, job.end_date, 'hfq')
+
+
+def _fetch_index(fetcher, job):
+    return fetcher.fetch_index_daily_data(job.symbol, job.start_date, job.end_date)
+
+
+def _fetch_stock_factors(fetcher, job):
+    return fetcher.fetch_stock_adjust_factors(job.symbol)
+
+
+# 数据类型 -> (模型, 获取函数, 规范化函数)
+PIPELINE_KINDS = {
+    'stock': (StockDailyData, _fetch_stock, normalize_stock_daily),
+    'index': (IndexDailyData, _fetch_index, normalize_index_daily),
+}
+
+# 数据类型 -> (复权因子获取函数, 规范化函数)，指数没有复权因子
+FACTOR_KINDS = {
+    'stock': (_fetch_stock_factors, normalize_adjust_factors),
+}
+
+
+def fetch_factors(kind, fetcher, job):
+    """
+    获取并规范化一个代码的复权因子（完整的因子序列，需要单独请求一次上游接口）。获取失败不影响日线数据入库，只保留原有因子。
+
+    Args:
+        kind (str): 数据类型。
+        fetcher (DataFetcher): 数据获取器。
+        job (FetchJob): 获取任务。
+
+    Returns:
+        pandas.DataFrame: 规范化后的复权因子，该类型没有因子、未启用或获取失败时返回 None。
+    """
+    if kind not in FACTOR_KINDS or not config.ADJUST_FACTOR_FETCH:
+        return None
+    fetch, normalize = FACTOR_KINDS[kind]
+    try:
+        return normalize(fetch(fetcher, job), job.symbol)
+    except Exception as e:
+        logger.warning(f"获取 {job.symbol} 的复权因子失败，保留原有因子: {e}")
+        return None
+
+
+class IngestPipeline:
+    """
+    日线数据入库流水线。
+
+    Attributes:
+        kind (str): 数据类型，'stock' 或 'index'。
+        fetch_workers (int): 获取阶段的线程数。
+        queue_size (int): 阶段间队列的最大长度。
+        batch_size (int): 入库阶段每个事务包含的最大代码数，记录数和时间间隔阈值见 WriteBehindBuffer。
+        bulk_load (bool): 是否为首次全量下载：使用 COPY 批量导入，并随日线获取复权因子。
+            增量更新不逐只获取因子，只为没有因子或疑似除权除息的股票在流水线结束后获取。
+    """
+
+    def __init__(self, kind, fetch_workers=None, queue_size=None, batch_size=None, bulk_load=False):
+        """
+        初始化IngestPipeline实例。
+
+        Args:
+            kind (str): 数据类型，'stock' 或 'index'。
+            fetch_workers (int, optional): 获取阶段线程数，默认为 config.MAX_THREADS。
+            queue_size (int, optional): 阶段间队列长度，默认为 config.PIPELINE_QUEUE_SIZE。
+            batch_size (int, optional): 每个事务包含的最大代码数，默认为 config.BATCH_SIZE。
+            bulk_load (bool, optional): 是否使用 COPY 批量导入，仅对 PostgreSQL 生效。
+        """
+        if kind not in PIPELINE_KINDS:
+            raise ValueError(f"Unknown pipeline kind: {kind}")
+        self.kind = kind
+        self.model, self._fetch, self._normalize = PIPELINE_KINDS[kind]
+        self.fetch_workers = fetch_workers or config.MAX_THREADS
+        self.queue_size = queue_size or config.PIPELINE_QUEUE_SIZE
+        self.batch_size = batch_size or config.BATCH_SIZE
+        self.bulk_load = bulk_load
+        self._report_lock = threading.Lock()
+
+    def _fail(self, report, symbols, reason):
+        with self._report_lock:
+            for symbol in symbols:
+                report.failed[symbol] = reason
+
+    def _fetch_task(self, raw_queue, report, job, fetcher, saver):
+        """获取阶段：请求数据（全量下载时同时请求复权因子）并放入原始队列，队列满时阻塞。"""
+        data = self._fetch(fetcher, job)
+        if data is None or data.empty:
+            logger.warning(f"获取 {job.symbol}{f'({job.name})' if job.name else ''} 的数据为空，跳过保存")
+            with self._report_lock:
+                report.empty.append(job.symbol)
+            return True
+        raw_queue.put((job, data, fetch_factors(self.kind, fetcher, job) if self.bulk_load else None))
+        return True
+
+    def _normalize_stage(self, raw_queue, record_queue, report, adjustment_check, factor_check):
+        """规范化阶段：把原始DataFrame转换为类型化数据，检查近似复权因子，并比较重叠区间，历史已变化的代码留待整体重写。"""
+        while True:
+            item = raw_queue.get()
+            if item is _STOP:
+                record_queue.put(_STOP)
+                return
+            job, data, factors = item
+            try:
+                frame = self._normalize(data, job.symbol)
+                if factor_check is not None:
+                    factor_check.check(job.symbol, frame)
+                if adjustment_check is not None:
+                    frame = adjustment_check.split(job.symbol, frame)
+                    if frame is None:
+                        continue
+            except Exception as e:
+                logger.error(f"规范化 {job.symbol} 数据出错: {e}")
+                self._fail(report, [job.symbol], f"规范化失败: {e}")
+                continue
+            if frame.empty:
+                with self._report_lock:
+                    report.empty.append(job.symbol)
+                continue
+            record_queue.put((job.symbol, frame, factors))
+
+    def _write_stage(self, record_queue, report):
+        """入库阶段：通过写回缓冲区按行数、代码数或时间间隔合并为大事务写入。"""
+        def record(result):
+            with self._report_lock:
+                report.succeeded.extend(result.succeeded)
+                report.failed.update({symbol: f"入库失败: {reason}" for symbol, reason in result.failed.items()})
+
+        with WriteBehindBuffer(self.model, max_symbols=self.batch_size, bulk_load=self.bulk_load,
+                               on_flush=record) as buffer:
+            while True:
+                try:
+                    item = record_queue.get(timeout=1)
+                except queue.Empty:
+                    buffer.flush_if_due()
+                    continue
+                if item is _STOP:
+                    return
+                buffer.add(*item)
+
+    def run(self, jobs):
+        """
+        运行流水线处理所有获取任务。
+
+        Args:
+            jobs (iterable[FetchJob]): 获取任务列表。
+
+        Returns:
+            DownloadReport: 每个代码的处理结果汇总。
+        """
+        jobs = list(jobs)
+        report = DownloadReport(total=len(jobs))
+        start_time = time.monotonic()
+        raw_queue = queue.Queue(maxsize=self.queue_size)
+        record_queue = queue.Queue(maxsize=self.queue_size)
+
+        # 设置了重叠区间的任务在入库前检测历史复权价格是否变化
+        adjustment_check = AdjustmentCheck(self.model, jobs) if any(job.overlap_until for job in jobs) else None
+        # 增量更新只为没有因子或疑似除权除息的股票获取复权因子
+        factor_check = FactorCheck(jobs) if (self.kind in FACTOR_KINDS and config.ADJUST_FACTOR_FETCH
+                                             and not self.bulk_load and jobs) else None
+
+        normalizer = threading.Thread(target=self._normalize_stage,
+                                      args=(raw_queue, record_queue, report, adjustment_check, factor_check),
+                                      name=f"{self.kind}-normalize", daemon=True)
+        writer = threading.Thread(target=self._write_stage, args=(record_queue, report),
+                                  name=f"{self.kind}-write", daemon=True)
+        normalizer.start()
+        writer.start()
+
+        try:
+            engine = DownloadEngine(max_workers=self.fetch_workers, label=f"获取{self.kind}数据")
+            fetch_report = engine.run(
+                jobs,
+                lambda job, **kwargs: self._fetch_task(raw_queue, report, job, **kwargs),
+                key=lambda job: job.symbol
+            )
+            with self._report_lock:
+                for symbol, reason in fetch_report.failed.items():
+                    report.failed[symbol] = f"获取失败: {reason}"
+        finally:
+            raw_queue.put(_STOP)
+            normalizer.join()
+            writer.join()
+
+        if adjustment_check is not None and adjustment_check.changed:
+            rewrite_report = rewrite_histories(self.kind, adjustment_check.changed)
+            report.succeeded.extend(rewrite_report.succeeded)
+            report.empty.extend(rewrite_report.empty)
+            report.failed.update({symbol: f"重写历史失败: {reason}" for symbol, reason in rewrite_report.failed.items()})
+
+        if factor_check is not None:
+            changed = set(adjustment_check.changed) if adjustment_check is not None else set()
+            # 重写历史时已获取完整因子；只为本轮成功写入的代码更新因子
+            written = set(report.succeeded)
+            symbols = [symbol for symbol in factor_check.refresh if symbol in written and symbol not in changed]
+            if symbols:
+                refresh_report = refresh_factors(self.kind, symbols)
+                if refresh_report.failed:
+                    logger.warning(f"{len(refresh_report.failed)} 个代码的复权因子获取失败，保留原有因子")
+
+        # 写入成功的代码已在入库事务中更新水位，这里只记录没有写入数据的获取结果
+        record_fetch_status(self.kind, report.empty, 'empty')
+        record_fetch_status(self.kind, report.failed, 'failed')
+
+        report.elapsed = time.monotonic() - start_time
+        logger.info(f"{self.kind} 流水线完成: {report.summary()}")
+        return report
@@ -0,0 +1,117 @@
+# src/services/price_views.py
+"""
+此模块在读取时由后复权日线和复权因子计算三种复权价格。
+daily_stock 保存后复权价格，adjust_factor 保存每只股票的后复权因子变化点，
+不复权价格 = 后复权价格 / 当日因子，前复权价格 = 后复权价格 / 最新因子。
+一次入库即可提供 hfq、qfq、none 三种视图，分红送转只需要写入新的因子记录。
+Authors: hovi.hyw & AI
+Date: 2026-10-18
+"""
+
+import pandas as pd
+from sqlalchemy import select
+
+from ..database.models.factor import AdjustFactor
+from ..database.models.stock import StockDailyData
+
+# 支持的复权方式
+ADJUST_MODES = ('hfq', 'qfq', 'none')
+
+# 随复权方式变化的价格列
+PRICE_COLUMNS = ['open', 'close', 'high', 'low']
+
+# 单条 IN 查询包含的最大代码数
+_CHUNK_SIZE = 1000
+
+
+def load_adjust_factors(db, symbols):
+    """
+    查询代码的复权因子。
+
+    Args:
+        db (Session): 数据库会话。
+        symbols (list): 股票代码列表。
+
+    Returns:
+        pandas.DataFrame: 列为 symbol、date、hfq_factor，按代码和日期升序排列。
+    """
+    symbols = list(symbols)
+    rows = []
+    for offset in range(0, len(symbols), _CHUNK_SIZE):
+        query = (
+            select(AdjustFactor.symbol, AdjustFactor.date, AdjustFactor.hfq_factor)
+            .where(AdjustFactor.symbol.in_(symbols[offset:offset + _CHUNK_SIZE]))
+            .order_by(AdjustFactor.symbol, AdjustFactor.date)
+        )
+        rows.extend(db.execute(query).all())
+    return pd.DataFrame(rows, columns=['symbol', 'date', 'hfq_factor'])
+
+
+def apply_adjustment(prices, factors, adjust):
+    """
+    把后复权价格转换为指定的复权方式，按代码和日期向后匹配生效的因子，整列相乘。
+
+    Args:
+        prices (pandas.DataFrame): 后复权日线数据，包含 symbol、date 和价格列，可以包含多个代码。
+        factors (pandas.DataFrame): 复权因子，列为 symbol、date、hfq_factor。
+        adjust (str): 复权方式，'hfq'、'qfq' 或 'none'。
+
+    Returns:
+        pandas.DataFrame: 转换后的日线数据，行顺序与输入一致。
+
+    Raises:
+        ValueError: 如果复权方式不受支持，则抛出此异常。
+    """
+    if adjust not in ADJUST_MODES:
+        raise ValueError(f"Unsupported adjust mode: {adjust}")
+    if adjust == 'hfq' or prices.empty:
+        return prices
+    factors = factors.assign(date=pd.to_datetime(factors['date'])).sort_values('date')
+    result = prices.assign(_date=pd.to_datetime(prices['date']), _order=range(len(prices)))
+    if adjust == 'none':
+        result = pd.merge_asof(result.sort_values('_date'), factors[['symbol', 'date', 'hfq_factor']],
+                               left_on='_date', right_on='date', by='symbol', direction='backward',
+                               suffixes=('', '_factor'))
+        # 早于第一条因子记录的日期使用最早的因子
+        earliest = factors.groupby('symbol')['hfq_factor'].first()
+        divisor = result['hfq_factor'].fillna(result['symbol'].map(earliest))
+    else:
+        latest = factors.groupby('symbol')['hfq_factor'].last()
+        divisor = result['symbol'].map(latest)
+    scale = 1 / divisor.to_numpy()
+    result[PRICE_COLUMNS] = result[PRICE_COLUMNS].mul(scale, axis=0).round(4)
+    return result.sort_values('_order')[prices.columns].reset_index(drop=True)
+
+
+def load_stock_prices(db, symbol, start_date=None, end_date=None, adjust='hfq'):
+    """
+    读取一只股票的日线数据并转换为指定的复权方式。
+
+    Args:
+        db (Session): 数据库会话。
+        symbol (str): 股票代码。
+        start_date (date, optional): 开始日期（含）。
+        end_date (date, optional): 结束日期（含）。
+        adjust (str): 复权方式，'hfq'、'qfq' 或 'none'。
+
+    Returns:
+        pandas.DataFrame: 按日期升序排列的日线数据；需要复权因子但库中没有该股票的因子时返回 None。
+
+    Raises:
+        ValueError: 如果复权方式不受支持，则抛出此异常。
+    """
+    if adjust not in ADJUST_MODES:
+        raise ValueError(f"Unsupported adjust mode: {adjust}")
+    columns = [column.name for column in StockDailyData.__table__.columns]
+    query = select(*StockDailyData.__table__.columns).where(StockDailyData.symbol == symbol)
+    if start_date is not None:
+        query = query.where(StockDailyData.date >= start_date)
+    if end_date is not None:
+        query = query.where(StockDailyData.date <= end_date)
+    prices = pd.DataFrame(db.execute(query.order_by(StockDailyData.date)).all(), columns=columns)
+    if adjust == 'hfq' or prices.empty:
+        return prices
+    factors = load_adjust_factors(db, [symbol])
+    if factors.empty:
+        return None
+    return apply_adjustment(prices, factors, adjust)
@@ -0,0 +1,52 @@
+# src/services/providers/__init__.py
+"""
+行情数据源。
+DataFetcher 通过 get_provider() 获取当前配置的数据源（config.DATA_PROVIDER），
+akshare 为真实数据源，synthetic 为离线使用的确定性合成数据源。
+Authors: hovi.hyw & AI
+Date: 2026-10-18
+"""
+
+import threading
+
+from ...core.config import config
+from ...core.exceptions import ConfigError
+from .base import DataProvider
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def _create_provider(name):
+    if name == "akshare":
+        from .akshare_provider import AkshareProvider
+        return AkshareProvider()
+    if name == "synthetic":
+        from .synthetic_provider import SyntheticProvider
+        return SyntheticProvider()
+    raise ConfigError(f"Unknown data provider: {name}")
+
+
+def get_provider(name=None):
+    """
+    获取进程内共享的数据源实例。
+
+    Args:
+        name (str, optional): 数据源名称，默认为 config.DATA_PROVIDER。
+
+    Returns:
+        DataProvider: 数据源实例。
+
+    Raises:
+        ConfigError: 如果数据源名称未知，则抛出此异常。
+    """
+    name = (name or config.DATA_PROVIDER).lower()
+    with _providers_lock:
+        provider = _providers.get(name)
+        if provider is None:
+            provider = _create_provider(name)
+            _providers[name] = provider
+        return provider
+
+
+__all__ = ["DataProvider", "get_provider"]
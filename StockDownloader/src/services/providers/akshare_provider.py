@@ -0,0 +1,36 @@
+# src/services/providers/akshare_provider.py
+"""
+此模块实现了基于AKShare的行情数据源，直接转发到对应的AKShare函数。
+Authors: hovi.hyw & AI
+Date: 2026-10-18
+"""
+
+from .base import DataProvider
+
+
+class AkshareProvider(DataProvider):
+    """
+    AKShare数据源。
+    """
+
+    name = "akshare"
+
+    def __init__(self):
+        # 延迟导入，使离线环境在使用合成数据源时无需加载AKShare
+        import akshare as ak
+        self._ak = ak
+
+    def stock_zh_a_daily(self, symbol, start_date, end_date, adjust=""):
+        return self._ak.stock_zh_a_daily(symbol=symbol, start_date=start_date, end_date=end_date, adjust=adjust)
+
+    def index_zh_a_hist(self, symbol, period="daily", start_date="19700101", end_date="20500101"):
+        return self._ak.index_zh_a_hist(symbol=symbol, period=period, start_date=start_date, end_date=end_date)
+
+    def stock_zh_a_spot(self):
+        return self._ak.stock_zh_a_spot()
+
+    def stock_zh_index_spot_em(self, symbol="沪深重要指数"):
+        return self._ak.stock_zh_index_spot_em(symbol=symbol)
+
+    def tool_trade_date_hist_sina(self):
+        return self._ak.tool_trade_date_hist_sina()
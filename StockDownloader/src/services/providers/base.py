@@ -0,0 +1,82 @@
+# src/services/providers/base.py
+"""
+此模块定义了行情数据源的抽象接口。
+接口方法与AKShare函数同名、同参数、返回同样结构的DataFrame，因此限流、熔断和响应缓存
+可以继续以方法名作为上游接口名称。
+Authors: hovi.hyw & AI
+Date: 2026-10-18
+"""
+
+from abc import ABC, abstractmethod
+
+
+class DataProvider(ABC):
+    """
+    行情数据源抽象类。
+
+    Attributes:
+        name (str): 数据源名称，同时用作响应缓存的命名空间。
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def stock_zh_a_daily(self, symbol, start_date, end_date, adjust=""):
+        """
+        获取股票日线数据（新浪）。
+
+        Args:
+            symbol (str): 带市场前缀的股票代码，例如 sh600000。
+            start_date (str): 开始日期，格式为 YYYYMMDD。
+            end_date (str): 结束日期，格式为 YYYYMMDD。
+            adjust (str): 复权类型，'' 为不复权，'qfq' 为前复权，'hfq' 为后复权，'hfq-factor' 为后复权因子。
+
+        Returns:
+            pandas.DataFrame: 列为 date、open、high、low、close、volume、amount、outstanding_share、turnover；
+                'hfq-factor' 时忽略日期范围，返回全部因子变化点，列为 date、hfq_factor。
+        """
+
+    @abstractmethod
+    def index_zh_a_hist(self, symbol, period="daily", start_date="19700101", end_date="20500101"):
+        """
+        获取指数历史行情（东方财富）。
+
+        Args:
+            symbol (str): 6位指数代码。
+            period (str): 周期，目前只使用 daily。
+            start_date (str): 开始日期，格式为 YYYYMMDD。
+            end_date (str): 结束日期，格式为 YYYYMMDD。
+
+        Returns:
+            pandas.DataFrame: 中文列名的指数日线数据。
+        """
+
+    @abstractmethod
+    def stock_zh_a_spot(self):
+        """
+        获取全部A股实时行情快照（新浪）。
+
+        Returns:
+            pandas.DataFrame: 包含代码、名称、最新价、昨收、今开、最高、最低、成交量、成交额等列。
+        """
+
+    @abstractmethod
+    def stock_zh_index_spot_em(self, symbol="沪深重要指数"):
+        """
+        获取指数实时行情快照（东方财富）。
+
+        Args:
+            symbol (str): 指数分类名称。
+
+        Returns:
+            pandas.DataFrame: 包含代码、名称、最新价等列。
+        """
+
+    @abstractmethod
+    def tool_trade_date_hist_sina(self):
+        """
+        获取A股历史交易日历（新浪），包含当年剩余的已公布交易日。
+
+        Returns:
+            pandas.DataFrame: 只有一列 trade_date。
+        """
@@ -0,0 +1,260 @@
+# src/services/providers/synthetic_provider.py
+"""
+此模块实现了确定性的合成行情数据源，用于在离线环境中对入库链路做性能分析和压力测试。
+同一个种子下，每只股票/指数的上市日期、退市日期、价格走势、停牌日和复权因子都是固定的，
+返回的DataFrame结构与AKShare一致。可以配置模拟的请求延迟、临时错误率、限流错误率和空响应率。
+需要重放真实数据时，使用 FETCH_CACHE_MODE=replay 从响应缓存中读取已录制的AKShare响应。
+Authors: hovi.hyw & AI
+Date: 2026-10-18
+"""
+
+import functools
+import random
+import threading
+import time
+import zlib
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from ...core.config import config
+from .base import DataProvider
+
+_STOCK_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume', 'amount', 'outstanding_share', 'turnover']
+_INDEX_COLUMNS = ['日期', '开盘', '收盘', '最高', '最低', '成交量', '成交额', '振幅', '涨跌幅', '涨跌额', '换手率']
+
+# 市场前缀 -> (代码起始值, 所占比例)
+_MARKETS = (('sh', 600000, 0.5), ('sz', 1, 0.4), ('bj', 830000, 0.1))
+
+
+class SyntheticProvider(DataProvider):
+    """
+    合成数据源。
+
+    Attributes:
+        stock_count (int): 股票数量。
+        index_count (int): 指数数量。
+        latency (float): 平均请求延迟（秒）。
+        error_rate (float): 临时错误概率。
+        throttle_rate (float): 限流错误概率。
+        empty_rate (float): 空响应概率。
+        seed (int): 随机种子。
+    """
+
+    name = "synthetic"
+
+    def __init__(self, stock_count=None, index_count=None, start_date=None, latency_ms=None,
+                 error_rate=None, throttle_rate=None, empty_rate=None, seed=None):
+        self.stock_count = stock_count or config.SYNTHETIC_STOCK_COUNT
+        self.index_count = index_count or config.SYNTHETIC_INDEX_COUNT
+        self.latency = (config.SYNTHETIC_LATENCY_MS if latency_ms is None else latency_ms) / 1000
+        self.error_rate = config.SYNTHETIC_ERROR_RATE if error_rate is None else error_rate
+        self.throttle_rate = config.SYNTHETIC_THROTTLE_RATE if throttle_rate is None else throttle_rate
+        self.empty_rate = config.SYNTHETIC_EMPTY_RATE if empty_rate is None else empty_rate
+        self.seed = config.SYNTHETIC_SEED if seed is None else seed
+        self.calendar = pd.bdate_range(start_date or config.SYNTHETIC_START_DATE, date.today())
+        self._rng = random.Random(self.seed)
+        self._rng_lock = threading.Lock()
+        self._stock_symbols = self._build_stock_symbols()
+        self._index_symbols = [f"{i:06d}" for i in range(1, self.index_count + 1)]
+        self._stock_set = set(self._stock_symbols)
+        self._index_set = set(self._index_symbols)
+
+    def _build_stock_symbols(self):
+        symbols = []
+        for prefix, base, share in _MARKETS:
+            count = int(round(self.stock_count * share))
+            symbols.extend(f"{prefix}{base + i:06d}" for i in range(count))
+        return symbols[:self.stock_count]
+
+    def _simulate_call(self):
+        """模拟网络延迟和错误，返回是否应返回空结果。"""
+        with self._rng_lock:
+            delay = self.latency * self._rng.uniform(0.5, 1.5)
+            roll = self._rng.random()
+        if delay > 0:
+            time.sleep(delay)
+        if roll < self.error_rate:
+            raise ConnectionError("Synthetic connection reset by peer")
+        roll -= self.error_rate
+        if roll < self.throttle_rate:
+            raise RuntimeError("HTTP 429 Too Many Requests (synthetic)")
+        roll -= self.throttle_rate
+        return roll < self.empty_rate
+
+    def _symbol_rng(self, symbol):
+        return np.random.default_rng([self.seed, zlib.crc32(symbol.encode("utf-8"))])
+
+    @functools.lru_cache(maxsize=64)
+    def _history(self, symbol, is_index=False):
+        """
+        生成一个代码的完整不复权历史和后复权因子，结果只由种子和代码决定。
+
+        Returns:
+            pandas.DataFrame: 列为 date、open、high、low、close、volume、amount、outstanding_share、factor。
+        """
+        rng = self._symbol_rng(symbol)
+        total = len(self.calendar)
+        if is_index or rng.random() < 0.2 or total < 500:
+            listed = 0
+        else:
+            listed = int(rng.integers(0, int(total * 0.85)))
+        delisted = total
+        if not is_index and rng.random() < 0.03 and listed + 250 < total:
+            delisted = int(rng.integers(listed + 250, total))
+
+        days = self.calendar[listed:delisted]
+        count = len(days)
+        walk = rng.uniform(1000, 5000) if is_index else rng.uniform(5, 50)
+        walk = walk * np.exp(np.cumsum(rng.normal(0.0001 if is_index else 0.0003, 0.015 if is_index else 0.02, count)))
+        if is_index:
+            factor = np.ones(count)
+        else:
+            # 平均每年一次分红送转，除权日不复权价格下跳，后复权价格连续
+            events = rng.random(count) < 1 / 250
+            factor = np.cumprod(np.where(events, 1 + rng.uniform(0.01, 0.05, count), 1.0))
+        close = walk / factor
+        open_ = close * (1 + rng.normal(0, 0.005, count))
+        high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, count)))
+        low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, count)))
+        volume = np.round(rng.lognormal(19 if is_index else 15, 1, count))
+        outstanding_share = float(np.round(rng.uniform(1e8, 5e9), -4))
+
+        frame = pd.DataFrame({
+            'date': days.date,
+            'open': open_.round(2),
+            'high': high.round(2),
+            'low': low.round(2),
+            'close': close.round(2),
+            'volume': volume,
+            'amount': np.round(volume * (open_ + close) / 2),
+            'outstanding_share': outstanding_share,
+            'factor': factor,
+        })
+        # 约 0.5% 的交易日停牌，不产生数据
+        suspended = rng.random(count) < 0.005
+        if count:
+            suspended[0] = False
+        return frame[~suspended].reset_index(drop=True)
+
+    @staticmethod
+    def _slice(frame, start_date, end_date):
+        start = pd.Timestamp(start_date).date()
+        end = pd.Timestamp(end_date).date()
+        return frame[(frame['date'] >= start) & (frame['date'] <= end)]
+
+    def stock_zh_a_daily(self, symbol, start_date, end_date, adjust=""):
+        if symbol not in self._stock_set:
+            raise KeyError('date')
+        if adjust == 'hfq-factor':
+            return self._hfq_factors(symbol)
+        if self._simulate_call():
+            return pd.DataFrame(columns=_STOCK_COLUMNS)
+        history = self._history(symbol)
+        frame = self._slice(history, start_date, end_date).copy()
+        if adjust in ('hfq', 'qfq'):
+            scale = frame['factor'] if adjust == 'hfq' else frame['factor'] / history['factor'].iloc[-1]
+            for column in ('open', 'high', 'low', 'close'):
+                frame[column] = (frame[column] * scale).round(4)
+        frame['turnover'] = frame['volume'] / frame['outstanding_share']
+        return frame[_STOCK_COLUMNS].reset_index(drop=True)
+
+    def _hfq_factors(self, symbol):
+        """与新浪一致：只返回因子变化点，日期降序，最后一行为 1900-01-01 的初始因子。"""
+        if self._simulate_call():
+            return pd.DataFrame(columns=['date', 'hfq_factor'])
+        history = self._history(symbol)
+        changes = history[history['factor'].diff().fillna(0) != 0]
+        frame = pd.DataFrame({
+            'date': [date(1900, 1, 1)] + changes['date'].tolist(),
+            'hfq_factor': [f"{history['factor'].iloc[0] if len(history) else 1.0:.6f}"] +
+                          [f"{value:.6f}" for value in changes['factor']],
+        })
+        return frame.iloc[::-1].reset_index(drop=True)
+
+    def index_zh_a_hist(self, symbol, period="daily", start_date="19700101", end_date="20500101"):
+        if symbol not in self._index_set:
+            raise KeyError('日期')
+        if self._simulate_call():
+            return pd.DataFrame(columns=_INDEX_COLUMNS)
+        history = self._history(symbol, is_index=True)
+        prev_close = history['close'].shift(1).fillna(history['open'])
+        frame = pd.DataFrame({
+            '日期': pd.to_datetime(history['date']).dt.strftime('%Y-%m-%d'),
+            '开盘': history['open'],
+            '收盘': history['close'],
+            '最高': history['high'],
+            '最低': history['low'],
+            '成交量': history['volume'],
+            '成交额': history['amount'],
+            '振幅': ((history['high'] - history['low']) / prev_close * 100).round(2),
+            '涨跌幅': ((history['close'] / prev_close - 1) * 100).round(2),
+            '涨跌额': (history['close'] - prev_close).round(2),
+            '换手率': (history['volume'] / history['outstanding_share'] * 100).round(2),
+        })
+        mask = (history['date'] >= pd.Timestamp(start_date).date()) & (history['date'] <= pd.Timestamp(end_date).date())
+        return frame[mask].reset_index(drop=True)
+
+    def _latest_bars(self, symbols, is_index):
+        rows = []
+        last_day = self.calendar[-1].date() if len(self.calendar) else None
+        for symbol in symbols:
+            history = self._history.__wrapped__(self, symbol, is_index)
+            if len(history) < 2 or history['date'].iloc[-1] != last_day:
+                continue
+            latest, previous = history.iloc[-1], history.iloc[-2]
+            # 昨收为除权后的参考价
+            rows.append((symbol, latest, previous['close'] * previous['factor'] / latest['factor']))
+        return rows
+
+    def stock_zh_a_spot(self):
+        self._simulate_call()
+        records = []
+        for symbol, latest, prev_close in self._latest_bars(self._stock_symbols, False):
+            records.append({
+                '代码': symbol,
+                '名称': f"合成股票{symbol[2:]}",
+                '最新价': latest['close'],
+                '涨跌额': round(latest['close'] - prev_close, 2),
+                '涨跌幅': round((latest['close'] / prev_close - 1) * 100, 2),
+                '买入': latest['close'],
+                '卖出': latest['close'],
+                '昨收': round(prev_close, 2),
+                '今开': latest['open'],
+                '最高': latest['high'],
+                '最低': latest['low'],
+                '成交量': latest['volume'],
+                '成交额': latest['amount'],
+                '时间戳': '15:00:00',
+            })
+        return pd.DataFrame(records)
+
+    def stock_zh_index_spot_em(self, symbol="沪深重要指数"):
+        self._simulate_call()
+        records = []
+        for number, (code, latest, prev_close) in enumerate(
+                self._latest_bars(self._index_symbols, True), start=1):
+            records.append({
+                '序号': number,
+                '代码': code,
+                '名称': f"合成指数{code}",
+                '最新价': latest['close'],
+                '涨跌幅': round((latest['close'] / prev_close - 1) * 100, 2),
+                '涨跌额': round(latest['close'] - prev_close, 2),
+                '成交量': latest['volume'],
+                '成交额': latest['amount'],
+                '振幅': round((latest['high'] - latest['low']) / prev_close * 100, 2),
+                '最高': latest['high'],
+                '最低': latest['low'],
+                '今开': latest['open'],
+                '昨收': round(prev_close, 2),
+                '量比': 1.0,
+            })
+        return pd.DataFrame(records)
+
+    def tool_trade_date_hist_sina(self):
+        self._simulate_call()
+        # 与新浪一致，包含当年剩余的交易日
+        days = pd.bdate_range(self.calendar[0], date(date.today().year, 12, 31))
+        return pd.DataFrame({'trade_date': days.date})
@@ -0,0 +1,111 @@
+# src/services/rate_limiter.py
+"""
+此模块实现了进程内共享的令牌桶限流器。
+每个上游接口（新浪 stock_zh_a_daily、东财 index_zh_a_hist、实时行情/列表接口）各有一个令牌桶，
+所有获取线程共用，速率和突发量可通过环境变量配置。
+Authors: hovi.hyw & AI
+Date: 2026-10-18
+"""
+
+import threading
+import time
+
+from ..core.config import config
+
+
+class TokenBucket:
+    """
+    令牌桶限流器。
+    令牌按固定速率补充，桶容量即允许的突发请求数。令牌不足时调用方预约令牌并在锁外等待，
+    因此并发线程按到达顺序依次放行。
+
+    Attributes:
+        rate (float): 每秒补充的令牌数，小于等于 0 表示不限流。
+        burst (int): 桶容量。
+    """
+
+    def __init__(self, rate, burst=1):
+        """
+        初始化TokenBucket实例。
+
+        Args:
+            rate (float): 每秒请求数。
+            burst (int, optional): 允许的突发请求数，默认为 1。
+        """
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """
+        获取令牌，令牌不足时阻塞等待。
+
+        Args:
+            tokens (int, optional): 需要的令牌数，默认为 1。
+
+        Returns:
+            float: 实际等待的秒数。
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            # 允许令牌数为负，表示已被预约，后来者需要等待更久
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+# 上游接口 -> (每秒请求数, 突发量)
+ENDPOINT_RATE_LIMITS = {
+    'stock_zh_a_daily': (config.RATE_LIMIT_STOCK_DAILY, config.RATE_LIMIT_STOCK_DAILY_BURST),
+    'index_zh_a_hist': (config.RATE_LIMIT_INDEX_DAILY, config.RATE_LIMIT_INDEX_DAILY_BURST),
+    'stock_zh_a_spot': (config.RATE_LIMIT_SPOT, config.RATE_LIMIT_SPOT_BURST),
+    'stock_zh_index_spot_em': (config.RATE_LIMIT_SPOT, config.RATE_LIMIT_SPOT_BURST),
+}
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+# 同一副本内分担限流额度的进程数
+_process_share = 1
+
+
+def set_process_share(processes):
+    """
+    设置同一副本内分担限流额度的进程数。多进程入库时每个工作进程只使用 1/processes 的速率和突发量，
+    整个副本的请求速率与单进程时相同。
+
+    Args:
+        processes (int): 工作进程数。
+    """
+    global _process_share
+    with _limiters_lock:
+        _process_share = max(1, int(processes))
+        _limiters.clear()
+
+
+def get_rate_limiter(endpoint):
+    """
+    获取指定上游接口的共享限流器，首次调用时创建。
+
+    Args:
+        endpoint (str): 上游接口名称，通常为AKShare函数名。
+
+    Returns:
+        TokenBucket: 该接口的令牌桶。
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(endpoint)
+        if limiter is None:
+            rate, burst = ENDPOINT_RATE_LIMITS.get(
+                endpoint, (config.RATE_LIMIT_DEFAULT, config.RATE_LIMIT_DEFAULT_BURST))
+            limiter = TokenBucket(rate / _process_share, max(1, burst // _process_share))
+            _limiters[endpoint] = limiter
+        return limiter
@@ -0,0 +1,259 @@
+# src/services/response_cache.py
+"""
+此模块实现了AKShare原始响应的磁盘缓存。
+缓存键由（接口名称, 规范化后的参数, 交易日期）计算得到，DataFrame 以 gzip 压缩的 pickle 文件保存在
+config.CACHE_PATH/responses/<数据源>/<接口> 下。每类接口有独立的有效期，总大小超过上限时按最近访问时间淘汰。
+在 replay 模式下只从缓存读取，缓存未命中直接报错，便于重跑失败的任务和离线重新处理数据。
+Authors: hovi.hyw & AI
+Date: 2026-10-18
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import date
+
+import pandas as pd
+
+from ..core.config import config
+from ..core.exceptions import DataFetchError
+from ..core.logger import logger
+from ..utils.trading_calendar import get_trading_calendar
+
+# 缓存模式
+CACHE_MODE_OFF = "off"
+CACHE_MODE_READWRITE = "readwrite"
+CACHE_MODE_REPLAY = "replay"
+
+# 上游接口 -> 接口类型，用于确定缓存有效期
+ENDPOINT_TYPES = {
+    'stock_zh_a_daily': 'history',
+    'index_zh_a_hist': 'history',
+    'stock_zh_a_spot': 'spot',
+    'stock_zh_index_spot_em': 'spot',
+}
+
+_FILE_SUFFIX = ".pkl.gz"
+
+
+def _as_of_date():
+    """
+    缓存键中使用的交易日期，即今天或之前最近的一个交易日，非交易日的请求与上一交易日共用缓存。
+
+    Returns:
+        str: 日期，格式为 YYYYMMDD。
+    """
+    day = date.today()
+    try:
+        day = get_trading_calendar().prev_trading_day(day, inclusive=True) or day
+    except Exception as e:
+        logger.debug(f"Trading calendar unavailable for cache key, using today: {e}")
+    return day.strftime("%Y%m%d")
+
+
+class ResponseCache:
+    """
+    AKShare响应的磁盘缓存。
+
+    Attributes:
+        directory (str): 缓存目录。
+        mode (str): 缓存模式，off、readwrite 或 replay。
+        max_bytes (int): 缓存总大小上限（字节）。
+    """
+
+    def __init__(self, directory=None, mode=None, max_bytes=None):
+        """
+        初始化ResponseCache实例。
+
+        Args:
+            directory (str, optional): 缓存目录，默认为 config.CACHE_PATH/responses。
+            mode (str, optional): 缓存模式，默认为 config.FETCH_CACHE_MODE。
+            max_bytes (int, optional): 缓存总大小上限，默认为 config.FETCH_CACHE_MAX_MB 兆字节。
+        """
+        self.directory = directory or os.path.join(config.CACHE_PATH, "responses")
+        self.mode = (mode or config.FETCH_CACHE_MODE).lower()
+        if self.mode not in (CACHE_MODE_OFF, CACHE_MODE_READWRITE, CACHE_MODE_REPLAY):
+            raise ValueError(f"Unknown fetch cache mode: {self.mode}")
+        self.max_bytes = max_bytes or config.FETCH_CACHE_MAX_MB * 1024 * 1024
+        self._lock = threading.Lock()
+        self._total_bytes = None
+
+    @property
+    def enabled(self):
+        return self.mode != CACHE_MODE_OFF
+
+    @property
+    def replay_only(self):
+        return self.mode == CACHE_MODE_REPLAY
+
+    @staticmethod
+    def ttl_for(endpoint):
+        """
+        获取接口对应的缓存有效期。
+
+        Args:
+            endpoint (str): 上游接口名称。
+
+        Returns:
+            int: 有效期（秒）。
+        """
+        endpoint_type = ENDPOINT_TYPES.get(endpoint)
+        if endpoint_type == 'history':
+            return config.FETCH_CACHE_TTL_HISTORY
+        if endpoint_type == 'spot':
+            return config.FETCH_CACHE_TTL_SPOT
+        return config.FETCH_CACHE_TTL_DEFAULT
+
+    @staticmethod
+    def make_key(endpoint, args, kwargs):
+        """
+        计算缓存键。
+
+        Args:
+            endpoint (str): 上游接口名称。
+            args (tuple): 位置参数。
+            kwargs (dict): 关键字参数。
+
+        Returns:
+            str: 缓存键（sha256 十六进制字符串）。
+        """
+        normalized = {
+            'endpoint': endpoint,
+            'args': [str(arg).strip() for arg in args],
+            'kwargs': {name: str(value).strip() for name, value in sorted(kwargs.items())},
+            'as_of': _as_of_date(),
+        }
+        payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, namespace, endpoint, key):
+        return os.path.join(self.directory, namespace, endpoint, key[:2], key + _FILE_SUFFIX)
+
+    def get(self, endpoint, args, kwargs, namespace="akshare"):
+        """
+        从缓存读取响应。
+
+        Args:
+            endpoint (str): 上游接口名称。
+            args (tuple): 位置参数。
+            kwargs (dict): 关键字参数。
+            namespace (str, optional): 数据源名称，不同数据源的缓存互不干扰。
+
+        Returns:
+            pandas.DataFrame: 命中时返回缓存的DataFrame，未命中或缓存关闭时返回 None。
+
+        Raises:
+            DataFetchError: 如果处于 replay 模式且缓存未命中，则抛出此异常。
+        """
+        if not self.enabled:
+            return None
+        path = self._path(namespace, endpoint, self.make_key(endpoint, args, kwargs))
+        try:
+            mtime = os.path.getmtime(path)
+            # replay 模式忽略有效期，严格按已有缓存重放
+            if not self.replay_only and time.time() - mtime > self.ttl_for(endpoint):
+                self._remove(path)
+            else:
+                frame = pd.read_pickle(path, compression="gzip")
+                # 显式更新访问时间供LRU淘汰使用，保留写入时间用于判断有效期
+                os.utime(path, (time.time(), mtime))
+                return frame
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache entry {path}: {e}")
+            self._remove(path)
+
+        if self.replay_only:
+            raise DataFetchError(f"Cache miss for {endpoint}{args or ''} {kwargs} in replay mode")
+        return None
+
+    def put(self, endpoint, args, kwargs, frame, namespace="akshare"):
+        """
+        把响应写入缓存。空结果和非DataFrame结果不缓存。
+
+        Args:
+            endpoint (str): 上游接口名称。
+            args (tuple): 位置参数。
+            kwargs (dict): 关键字参数。
+            frame (pandas.DataFrame): 接口返回的数据。
+            namespace (str, optional): 数据源名称。
+        """
+        if self.mode != CACHE_MODE_READWRITE or not isinstance(frame, pd.DataFrame) or frame.empty:
+            return
+        path = self._path(namespace, endpoint, self.make_key(endpoint, args, kwargs))
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            frame.to_pickle(tmp_path, compression="gzip")
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except Exception as e:
+            logger.warning(f"Failed to write cache entry {path}: {e}")
+            self._remove(tmp_path)
+            return
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(_FILE_SUFFIX):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield path, stat
+
+    def _scan_size(self):
+        return sum(stat.st_size for _, stat in self._entries())
+
+    def _evict(self):
+        """按最近访问时间淘汰缓存，直到总大小降到上限的 90% 以下。需持有锁调用。"""
+        entries = sorted(self._entries(), key=lambda entry: entry[1].st_atime)
+        total = sum(stat.st_size for _, stat in entries)
+        target = self.max_bytes * 0.9
+        removed = 0
+        for path, stat in entries:
+            if total <= target:
+                break
+            if self._remove(path):
+                total -= stat.st_size
+                removed += 1
+        self._total_bytes = total
+        logger.info(f"Evicted {removed} response cache entries, cache size now {total / 1024 / 1024:.1f} MB")
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """
+    获取进程内共享的响应缓存，首次调用时创建。
+
+    Returns:
+        ResponseCache: 共享的响应缓存。
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
@@ -0,0 +1,243 @@
+# src/services/retry_policy.py
+"""
+此模块实现了按错误类型区分的重试策略和按上游接口划分的熔断器。
+错误分为永久错误（不重试）、限流错误（长退避）、临时错误（短退避）和解析错误（有限次短退避），
+退避时间按指数增长并加入随机抖动。HTTP 错误按响应状态码分类，其余按异常类型分类，不从异常信息中匹配状态码。
+熔断器在连续失败后打开，暂停所有工作线程对该接口的请求，冷却后只放行一个探测请求。
+Authors: hovi.hyw & AI
+Date: 2026-10-18
+"""
+
+import random
+import threading
+import time
+from enum import Enum
+
+import requests
+
+from ..core.config import config
+from ..core.exceptions import CircuitOpenError, PermanentFetchError
+from ..core.logger import logger
+
+
+class ErrorClass(Enum):
+    """数据获取错误的分类"""
+    PERMANENT = "permanent"
+    THROTTLED = "throttled"
+    TRANSIENT = "transient"
+    PARSE = "parse"
+
+
+# 被限流时的 HTTP 状态码
+_THROTTLE_STATUS = (403, 429)
+
+# 请求本身无效的 HTTP 状态码，重试无意义
+_PERMANENT_STATUS = (400, 404)
+
+# 没有 HTTP 响应的限流提示（例如数据源返回的页面文字），只匹配文字，不匹配数字
+_THROTTLE_MARKERS = ("too many requests", "频繁", "拒绝访问", "access denied")
+
+# AKShare 解析响应时抛出的异常类型：可能是被截断或临时出错的响应，也可能是代码本身没有数据，只有限次重试
+_PARSE_EXCEPTIONS = (KeyError, IndexError, TypeError)
+
+# 空结果拼接、无可解析表格时 pandas 抛出的 ValueError
+_PARSE_MESSAGES = ("no objects to concatenate", "no tables found")
+
+
+def classify_error(error):
+    """
+    对数据获取异常进行分类。
+
+    Args:
+        error (Exception): 数据获取过程中抛出的异常。
+
+    Returns:
+        ErrorClass: 异常所属的分类。
+    """
+    if isinstance(error, PermanentFetchError):
+        return ErrorClass.PERMANENT
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        if status in _THROTTLE_STATUS:
+            return ErrorClass.THROTTLED
+        if status in _PERMANENT_STATUS:
+            return ErrorClass.PERMANENT
+        return ErrorClass.TRANSIENT
+    if isinstance(error, _PARSE_EXCEPTIONS):
+        return ErrorClass.PARSE
+
+    message = str(error).lower()
+    if isinstance(error, ValueError) and any(marker in message for marker in _PARSE_MESSAGES):
+        return ErrorClass.PARSE
+    if any(marker in message for marker in _THROTTLE_MARKERS):
+        return ErrorClass.THROTTLED
+    return ErrorClass.TRANSIENT
+
+
+def backoff_delay(error_class, attempt, base_delay=None):
+    """
+    计算带随机抖动的指数退避时间，实际退避时间在 [上限/2, 上限] 之间随机取值。
+
+    Args:
+        error_class (ErrorClass): 错误分类。
+        attempt (int): 已失败的次数，从 0 开始。
+        base_delay (float, optional): 临时错误的基础退避时间，默认为 config.RETRY_DELAY。
+
+    Returns:
+        float: 退避秒数，永久错误返回 0；解析错误与临时错误相同。
+    """
+    if error_class is ErrorClass.PERMANENT:
+        return 0.0
+    if error_class is ErrorClass.THROTTLED:
+        base = config.THROTTLE_RETRY_DELAY
+    else:
+        base = config.RETRY_DELAY if base_delay is None else base_delay
+    ceiling = min(config.MAX_RETRY_DELAY, base * (2 ** attempt))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+class CircuitBreaker:
+    """
+    单个上游接口的熔断器。
+
+    状态：
+        closed: 正常放行。
+        open: 连续失败达到阈值后打开，冷却期间所有请求暂停等待；
+              连续打开次数达到上限后不再等待，直接抛出 CircuitOpenError 快速失败。
+        half_open: 冷却结束后只放行一个探测请求，成功则关闭，失败则再次打开。
+
+    Attributes:
+        name (str): 上游接口名称。
+        failure_threshold (int): 触发熔断的连续失败次数。
+        reset_timeout (float): 熔断冷却时间（秒）。
+        max_trips (int): 连续熔断次数上限，超过后冷却期间直接快速失败。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=None, reset_timeout=None, max_trips=None):
+        self.name = name
+        self.failure_threshold = failure_threshold or config.CIRCUIT_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or config.CIRCUIT_RESET_TIMEOUT
+        self.max_trips = max_trips or config.CIRCUIT_MAX_TRIPS
+        self._cond = threading.Condition()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._trips = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def before_call(self):
+        """
+        请求前调用。熔断打开时阻塞到冷却结束，半开状态时只放行一个探测请求。
+
+        Raises:
+            CircuitOpenError: 连续熔断次数达到上限且仍在冷却期时抛出。
+        """
+        with self._cond:
+            while True:
+                if self._state == self.CLOSED:
+                    return
+                if self._state == self.OPEN:
+                    remaining = self._opened_at + self.reset_timeout - time.monotonic()
+                    if remaining > 0:
+                        if self._trips >= self.max_trips:
+                            raise CircuitOpenError(
+                                f"Circuit for {self.name} is open after {self._trips} trips, failing fast")
+                        self._cond.wait(remaining)
+                        continue
+                    self._state = self.HALF_OPEN
+                    self._probing = False
+                if not self._probing:
+                    self._probing = True
+                    return
+                self._cond.wait(self.reset_timeout)
+
+    def record_success(self):
+        """请求成功后调用，关闭熔断器。"""
+        with self._cond:
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit for {self.name} closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trips = 0
+            self._probing = False
+            self._cond.notify_all()
+
+    def record_failure(self, error_class):
+        """
+        请求失败后调用。永久错误和解析错误说明上游已返回响应，只与具体代码有关，不计入熔断。
+
+        Args:
+            error_class (ErrorClass): 错误分类。
+        """
+        with self._cond:
+            if error_class in (ErrorClass.PERMANENT, ErrorClass.PARSE):
+                if self._state == self.HALF_OPEN:
+                    # 探测请求得到了上游的有效响应，说明接口已恢复
+                    self._state = self.CLOSED
+                    self._failures = 0
+                    self._trips = 0
+                self._probing = False
+                self._cond.notify_all()
+                return
+            if self._state == self.OPEN:
+                # 熔断前已发出的请求陆续失败，不重复计入
+                return
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trips += 1
+                self._failures = 0
+                self._probing = False
+                logger.warning(
+                    f"Circuit for {self.name} opened (trip {self._trips}), pausing requests for "
+                    f"{self.reset_timeout} seconds")
+                self._cond.notify_all()
+
+    def state(self):
+        """
+        获取熔断器当前状态。
+
+        Returns:
+            dict: 状态、连续失败次数与连续熔断次数。
+        """
+        with self._cond:
+            return {'state': self._state, 'failures': self._failures, 'trips': self._trips}
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(endpoint):
+    """
+    获取指定上游接口的共享熔断器，首次调用时创建。
+
+    Args:
+        endpoint (str): 上游接口名称，通常为AKShare函数名。
+
+    Returns:
+        CircuitBreaker: 该接口的熔断器。
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(endpoint)
+        if breaker is None:
+            breaker = CircuitBreaker(endpoint)
+            _breakers[endpoint] = breaker
+        return breaker
+
+
+def get_circuit_breaker_states():
+    """
+    获取所有熔断器的状态。
+
+    Returns:
+        dict: 上游接口名称 -> 熔断器状态。
+    """
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {name: breaker.state() for name, breaker in breakers.items()}
@@ -0,0 +1,273 @@
+# src/services/scheduler.py
+"""
+此模块实现了按交易日历触发的定时任务调度器。
+每个定时任务在每个交易日的固定时间触发一次（例如 09:26 下载股票列表、收盘后增量更新日线），调度器按下一次触发时间
+休眠，不依赖固定间隔的轮询，也不会随执行耗时漂移；交易日历在进程内缓存，判断触发时间不访问网络。
+
+每次触发在 schedule_run 表中有一行执行记录。服务重启后，调度器补执行补跑窗口（catch_up）内错过且没有成功记录的触发，
+超过窗口的触发记录为 skipped，不再执行。执行前获取以任务名命名的 advisory lock，多个副本中只有一个执行同一任务，
+没有取得锁的副本可以通过 assist 回调协助处理（例如加入共享的入库任务）。执行时间超过 timeout 时记录为 overdue 并告警。
+Authors: hovi.hyw & AI
+Date: 2026-10-18
+"""
+
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import select, update
+
+from ..core.config import config
+from ..core.logger import logger
+from ..database.locks import advisory_lock
+from ..database.models.schedule import ScheduleRun
+from ..database.session import session_scope
+from ..database.upsert import upsert_statement
+from ..utils.trading_calendar import get_trading_calendar
+
+# 两次检查之间的最长休眠时间（秒），用于发现系统时钟调整和其他副本释放的锁
+_MAX_SLEEP_SECONDS = 60
+
+# 已结束的执行状态，不再重复执行
+_SETTLED = ('succeeded', 'failed', 'skipped')
+
+
+def parse_time_of_day(value):
+    """
+    解析 HH:MM 格式的时间。
+
+    Args:
+        value (str): 时间字符串。
+
+    Returns:
+        datetime.time: 时间。
+    """
+    return datetime.strptime(value, "%H:%M").time()
+
+
+@dataclass(frozen=True)
+class ScheduledJob:
+    """
+    一个按交易日触发的定时任务。
+
+    Attributes:
+        name (str): 任务名称，同时作为执行记录和跨副本锁的键。
+        at (datetime.time): 每个交易日的触发时间。
+        func (Callable): 任务函数，接收触发时间；返回 False 或抛出异常视为失败。
+        catch_up (timedelta): 补跑窗口，触发时间之后超过该时长仍未执行的触发不再执行。
+        timeout (timedelta): 执行时间上限，超过后记录为 overdue 并告警。
+        assist (Callable, optional): 没有取得任务锁时调用的协助函数，接收触发时间。
+    """
+    name: str
+    at: time
+    func: Callable
+    catch_up: timedelta
+    timeout: timedelta
+    assist: Optional[Callable] = None
+
+
+class Scheduler:
+    """
+    交易日历驱动的定时任务调度器。
+
+    Attributes:
+        jobs (dict): 任务名称 -> ScheduledJob。
+        max_concurrent (int): 同时执行的最大任务数，同一任务在进程内不会并发执行。
+        owner (str): 当前工作进程的标识。
+    """
+
+    def __init__(self, jobs, max_concurrent=None, calendar=None):
+        """
+        初始化Scheduler实例。
+
+        Args:
+            jobs (list[ScheduledJob]): 定时任务。
+            max_concurrent (int, optional): 同时执行的最大任务数，默认为 config.SCHEDULER_MAX_CONCURRENT。
+            calendar (TradingCalendar, optional): 交易日历，默认为进程内共享的日历。
+        """
+        self.jobs = {job.name: job for job in jobs}
+        self.max_concurrent = max_concurrent or config.SCHEDULER_MAX_CONCURRENT
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._calendar = calendar
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="scheduler")
+        self._lock = threading.Lock()
+        self._running = set()
+        self._settled = set()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def calendar(self):
+        return self._calendar or get_trading_calendar()
+
+    def due_runs(self, job, now):
+        """
+        获取补跑窗口内已到触发时间的触发。
+
+        Args:
+            job (ScheduledJob): 定时任务。
+            now (datetime): 当前时间。
+
+        Returns:
+            list[datetime]: 升序排列的触发时间。
+        """
+        earliest = now - job.catch_up
+        days = self.calendar.trading_days_between(earliest.date(), now.date())
+        return [run_at for run_at in (datetime.combine(day, job.at) for day in days) if earliest <= run_at <= now]
+
+    def next_run(self, job, now):
+        """
+        获取任务在当前时间之后的下一次触发时间。
+
+        Args:
+            job (ScheduledJob): 定时任务。
+            now (datetime): 当前时间。
+
+        Returns:
+            datetime: 下一次触发时间，超出交易日历范围时返回 None。
+        """
+        day = self.calendar.next_trading_day(now.date(), inclusive=True)
+        if day is not None and datetime.combine(day, job.at) <= now:
+            day = self.calendar.next_trading_day(day)
+        return datetime.combine(day, job.at) if day is not None else None
+
+    def tick(self, now=None):
+        """
+        提交所有已到触发时间且尚未结束的触发。
+
+        Args:
+            now (datetime, optional): 当前时间，默认为现在。
+        """
+        now = now or datetime.now()
+        for job in self.jobs.values():
+            for run_at in self.due_runs(job, now):
+                with self._lock:
+                    if (job.name, run_at) in self._settled or job.name in self._running:
+                        continue
+                    self._running.add(job.name)
+                self._executor.submit(self._execute, job, run_at)
+
+    def _execute(self, job, run_at):
+        try:
+            if self._run_once(job, run_at):
+                with self._lock:
+                    self._settled.add((job.name, run_at))
+        except Exception as e:
+            logger.error(f"定时任务 {job.name}（{run_at:%Y-%m-%d %H:%M}）调度失败: {e}")
+        finally:
+            with self._lock:
+                self._running.discard(job.name)
+
+    def _run_once(self, job, run_at):
+        """
+        在跨副本锁内执行一次触发。
+
+        Returns:
+            bool: 该次触发已结束（成功、失败或跳过）时返回 True；由其他副本执行中时返回 False，稍后重新检查。
+        """
+        with advisory_lock(f"schedule:{job.name}") as acquired:
+            if acquired:
+                return self._run_locked(job, run_at)
+        # 其他副本正在执行，协助处理后等待其结束
+        if job.assist is not None:
+            job.assist(run_at)
+        return self._load_status(job, run_at) in _SETTLED
+
+    def _run_locked(self, job, run_at):
+        status = self._load_status(job, run_at)
+        if status in _SETTLED:
+            return True
+        if status is not None:
+            # 持有锁的副本在执行中退出，锁已释放，由当前副本重新执行
+            logger.warning(f"定时任务 {job.name}（{run_at:%Y-%m-%d %H:%M}）上次执行未结束，重新执行")
+        started_at = datetime.now()
+        if started_at > run_at + job.catch_up:
+            logger.warning(f"定时任务 {job.name}（{run_at:%Y-%m-%d %H:%M}）已超过补跑窗口，跳过")
+            self._record(job, run_at, 'skipped', finished_at=started_at)
+            return True
+
+        logger.info(f"开始执行定时任务 {job.name}（{run_at:%Y-%m-%d %H:%M}）")
+        self._record(job, run_at, 'running', started_at=started_at)
+        watchdog = threading.Timer(job.timeout.total_seconds(), self._mark_overdue, args=(job, run_at))
+        watchdog.daemon = True
+        watchdog.start()
+        status, error = 'succeeded', None
+        try:
+            if job.func(run_at) is False:
+                status, error = 'failed', "任务返回失败"
+        except Exception as e:
+            status, error = 'failed', str(e)
+        finally:
+            watchdog.cancel()
+        finished_at = datetime.now()
+        self._record(job, run_at, status, finished_at=finished_at, error=error)
+        message = f"定时任务 {job.name}（{run_at:%Y-%m-%d %H:%M}）{'执行完成' if status == 'succeeded' else f'执行失败: {error}'}，" \
+                  f"耗时 {finished_at - started_at}"
+        (logger.info if status == 'succeeded' else logger.error)(message)
+        return True
+
+    def _mark_overdue(self, job, run_at):
+        logger.error(f"定时任务 {job.name}（{run_at:%Y-%m-%d %H:%M}）执行时间超过 {job.timeout}，仍在运行")
+        try:
+            with session_scope() as db:
+                db.execute(
+                    update(ScheduleRun)
+                    .where(ScheduleRun.job_name == job.name, ScheduleRun.scheduled_for == run_at,
+                           ScheduleRun.status == 'running')
+                    .values(status='overdue')
+                )
+        except Exception as e:
+            logger.warning(f"记录定时任务 {job.name} 超时失败: {e}")
+
+    @staticmethod
+    def _load_status(job, run_at):
+        with session_scope() as db:
+            return db.execute(
+                select(ScheduleRun.status)
+                .where(ScheduleRun.job_name == job.name, ScheduleRun.scheduled_for == run_at)
+            ).scalar()
+
+    def _record(self, job, run_at, status, **values):
+        row = {'job_name': job.name, 'scheduled_for': run_at, 'status': status, 'owner': self.owner,
+               'started_at': None, 'finished_at': None, 'error': None}
+        row.update(values)
+        columns = ['status', 'owner', 'error'] + [key for key in ('started_at', 'finished_at') if key in values]
+        with session_scope() as db:
+            db.execute(upsert_statement(db, ScheduleRun, columns=columns), [row])
+
+    def _sleep_seconds(self, now):
+        upcoming = [run_at for run_at in (self.next_run(job, now) for job in self.jobs.values()) if run_at]
+        if not upcoming:
+            return _MAX_SLEEP_SECONDS
+        return max(0.0, min(_MAX_SLEEP_SECONDS, (min(upcoming) - now).total_seconds()))
+
+    def run_forever(self):
+        """循环检查触发，直到调用 stop()。"""
+        names = ", ".join(f"{job.name}@{job.at:%H:%M}" for job in self.jobs.values())
+        logger.info(f"定时任务调度器已启动: {names}")
+        while not self._stop.is_set():
+            now = datetime.now()
+            try:
+                self.tick(now)
+                delay = self._sleep_seconds(now)
+            except Exception as e:
+                logger.error(f"定时任务调度检查失败: {e}")
+                delay = _MAX_SLEEP_SECONDS
+            self._stop.wait(delay)
+
+    def start(self):
+        """在后台守护线程中运行调度器。"""
+        self._thread = threading.Thread(target=self.run_forever, name="scheduler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止调度器，等待正在执行的任务结束。"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,266 @@
+# src/services/snapshot_update.py
+"""
+此模块实现了基于全市场快照的收盘后增量更新。
+stock_zh_a_spot 一次请求即可返回全部A股当日的开高低收、成交量和成交额，用它直接生成当日日线，
+替代逐只请求 stock_zh_a_daily。数据库中保存的是后复权价格，当日复权因子由
+库中上一交易日的后复权收盘价 / 快照中的昨收 得到：除权除息日的昨收是除权参考价，
+因此公司行为发生当天的因子也能正确延续；昨收与库中上一交易日的不复权收盘价不一致时，
+同时在复权因子表中记录新的因子。库中数据有缺口、从未入库或快照数据异常的代码，
+仍然按代码请求历史数据补齐。
+Authors: hovi.hyw & AI
+Date: 2026-10-18
+"""
+
+import time
+from datetime import date, datetime
+
+import pandas as pd
+from sqlalchemy import func, select
+
+from ..core.config import config
+from ..core.logger import logger
+from ..database.models.stock import StockDailyData
+from ..database.session import SessionLocal
+from ..utils.trading_calendar import get_trading_calendar, is_trading_day
+from .data_fetcher import DataFetcher
+from .download_engine import DownloadReport
+from .fetch_planner import FetchPlanner
+from .pipeline import IngestPipeline
+from .price_views import load_adjust_factors
+from .watermarks import record_fetch_status
+from .write_buffer import WriteBehindBuffer
+
+# 快照列名 -> 含义
+_SPOT_COLUMNS = {
+    '代码': 'symbol',
+    '最新价': 'close',
+    '昨收': 'pre_close',
+    '今开': 'open',
+    '最高': 'high',
+    '最低': 'low',
+    '成交量': 'volume',
+    '成交额': 'amount',
+}
+
+# 昨收与库中上一交易日的不复权收盘价相差超过该值时，认为发生了除权除息（不足一个价位的除息无法识别）
+_EX_RIGHTS_PRICE_DIFF = 0.011
+
+# 成交量与库中上一交易日完全相同的代码超过该比例时，认为快照仍是上一交易日的数据（例如节假日）
+_STALE_SNAPSHOT_RATIO = 0.5
+
+
+def load_latest_bars(db, symbols):
+    """
+    查询每个代码在库中最新一条日线。
+
+    Args:
+        db (Session): 数据库会话。
+        symbols (list): 股票代码列表。
+
+    Returns:
+        pandas.DataFrame: 列为 symbol、date、close、volume、outstanding_share。
+    """
+    columns = ['symbol', 'date', 'close', 'volume', 'outstanding_share']
+    if not symbols:
+        return pd.DataFrame(columns=columns)
+    latest = (
+        select(StockDailyData.symbol, func.max(StockDailyData.date).label('date'))
+        .where(StockDailyData.symbol.in_(symbols))
+        .group_by(StockDailyData.symbol)
+        .subquery()
+    )
+    query = (
+        select(StockDailyData.symbol, StockDailyData.date, StockDailyData.close,
+               StockDailyData.volume, StockDailyData.outstanding_share)
+        .join(latest, (StockDailyData.symbol == latest.c.symbol) & (StockDailyData.date == latest.c.date))
+    )
+    return pd.DataFrame(db.execute(query).all(), columns=columns)
+
+
+def build_snapshot_bars(spot, latest, trade_date, prev_trade_date):
+    """
+    由全市场快照生成当日后复权日线。
+
+    Args:
+        spot (pandas.DataFrame): stock_zh_a_spot 返回的快照。
+        latest (pandas.DataFrame): load_latest_bars 返回的各代码最新日线。
+        trade_date (date): 快照对应的交易日。
+        prev_trade_date (date): 上一交易日。
+
+    Returns:
+        tuple: (当日日线DataFrame, 需要按代码补齐历史的代码列表, 当日停牌的代码列表, 已是最新的代码列表)。
+    """
+    data = spot[list(_SPOT_COLUMNS)].rename(columns=_SPOT_COLUMNS)
+    data['symbol'] = data['symbol'].astype(str).str.strip()
+    for column in _SPOT_COLUMNS.values():
+        if column != 'symbol':
+            data[column] = pd.to_numeric(data[column], errors='coerce')
+    data = data.drop_duplicates(subset='symbol', keep='last')
+
+    last = latest.rename(columns={'date': 'last_date', 'close': 'last_close', 'volume': 'last_volume'})
+    data = data.merge(last, on='symbol', how='left')
+    last_date = pd.to_datetime(data['last_date'])
+
+    current = last_date >= pd.Timestamp(trade_date)
+    suspended = ~current & ((data['volume'].fillna(0) <= 0) | (data['close'].fillna(0) <= 0))
+    contiguous = last_date == pd.Timestamp(prev_trade_date)
+    valid = (data['last_close'] > 0) & (data['pre_close'] > 0)
+    usable = ~current & ~suspended & contiguous & valid
+    fallback = ~current & ~suspended & ~usable
+
+    bars = data[usable].copy()
+    factor = bars['last_close'] / bars['pre_close']
+    frame = pd.DataFrame({
+        'symbol': bars['symbol'],
+        'date': trade_date,
+        'open': bars['open'] * factor,
+        'close': bars['close'] * factor,
+        'high': bars['high'] * factor,
+        'low': bars['low'] * factor,
+        'volume': bars['volume'].round().astype('Int64'),
+        'amount': bars['amount'].round().astype('Int64'),
+        'outstanding_share': bars['outstanding_share'],
+        'turnover': bars['volume'] / bars['outstanding_share'],
+    })
+    return (frame.reset_index(drop=True), data.loc[fallback, 'symbol'].tolist(),
+            data.loc[suspended, 'symbol'].tolist(), data.loc[current, 'symbol'].tolist())
+
+
+def detect_factor_changes(spot, latest, factors, trade_date):
+    """
+    由快照中的昨收识别当日除权除息的代码，生成包含新因子的完整因子序列。
+    库中上一交易日的不复权收盘价 = 后复权收盘价 / 当时的因子，除权除息日的昨收是除权参考价，两者不一致时
+    当日因子 = 后复权收盘价 / 昨收。库中没有因子的代码无法换算不复权价格，跳过。
+
+    Args:
+        spot (pandas.DataFrame): stock_zh_a_spot 返回的快照。
+        latest (pandas.DataFrame): 要写入当日日线的代码在库中的最新日线。
+        factors (pandas.DataFrame): 这些代码已入库的复权因子，列为 symbol、date、hfq_factor。
+        trade_date (date): 快照对应的交易日。
+
+    Returns:
+        dict: 代码 -> 追加了当日因子的完整复权因子DataFrame，只包含发生除权除息的代码。
+    """
+    if latest.empty or factors.empty:
+        return {}
+    pre_close = pd.to_numeric(spot['昨收'], errors='coerce')
+    pre_close.index = spot['代码'].astype(str).str.strip()
+    pre_close = pre_close[~pre_close.index.duplicated(keep='last')].rename('pre_close')
+    current = factors.groupby('symbol')['hfq_factor'].last()
+    data = latest.set_index('symbol')[['date', 'close']].join(current, how='inner').join(pre_close, how='inner')
+    data = data[(data['date'] < trade_date) & (data['close'] > 0) & (data['pre_close'] > 0)]
+    raw_close = data['close'] / data['hfq_factor']
+    changed = data[(raw_close - data['pre_close']).abs() > _EX_RIGHTS_PRICE_DIFF]
+
+    result = {}
+    for symbol, group in factors[factors['symbol'].isin(changed.index)].groupby('symbol'):
+        row = pd.DataFrame({'symbol': [symbol], 'date': [trade_date],
+                            'hfq_factor': [changed.at[symbol, 'close'] / changed.at[symbol, 'pre_close']]})
+        result[symbol] = pd.concat([group[group['date'] < trade_date], row], ignore_index=True)
+    return result
+
+
+def _is_stale_snapshot(spot, latest, prev_trade_date):
+    """快照中的成交量与库中上一交易日大面积相同，说明今天没有开市。"""
+    previous = latest[latest['date'] == prev_trade_date]
+    if previous.empty:
+        return False
+    # 与 build_snapshot_bars 一致：去掉代码两端的空白，重复的代码保留最后一行
+    volumes = pd.to_numeric(spot['成交量'], errors='coerce')
+    volumes.index = spot['代码'].astype(str).str.strip()
+    volumes = volumes[~volumes.index.duplicated(keep='last')]
+    matched = previous['volume'].astype(float).values == volumes.reindex(previous['symbol']).values
+    return matched.mean() > _STALE_SNAPSHOT_RATIO
+
+
+class SnapshotUpdater:
+    """
+    基于全市场快照的股票日线增量更新。
+
+    Attributes:
+        fetcher (DataFetcher): 数据获取器。
+        batch_size (int): 每个事务写入的代码数。
+    """
+
+    def __init__(self, fetcher=None, batch_size=None):
+        """
+        初始化SnapshotUpdater实例。
+
+        Args:
+            fetcher (DataFetcher, optional): 数据获取器。
+            batch_size (int, optional): 每个事务写入的代码数，默认为 config.BATCH_SIZE。
+        """
+        self.fetcher = fetcher or DataFetcher()
+        self.batch_size = batch_size or config.BATCH_SIZE
+
+    @staticmethod
+    def snapshot_ready(now=None):
+        """
+        判断当前是否已收盘，可以使用快照生成当日日线。
+
+        Args:
+            now (datetime, optional): 当前时间。
+
+        Returns:
+            bool: 交易日收盘后返回 True。
+        """
+        now = now or datetime.now()
+        ready_time = datetime.strptime(config.SNAPSHOT_READY_TIME, "%H:%M").time()
+        return now.time() >= ready_time and is_trading_day(now.date())
+
+    def run(self, spot=None):
+        """
+        使用快照更新当日日线，并为有缺口的代码补齐历史。
+
+        Args:
+            spot (pandas.DataFrame, optional): 已获取的快照，默认重新请求 stock_zh_a_spot。
+
+        Returns:
+            DownloadReport: 每个代码的处理结果汇总。
+        """
+        start_time = time.monotonic()
+        trade_date = date.today()
+        prev_trade_date = get_trading_calendar().prev_trading_day(trade_date)
+        if spot is None:
+            spot = self.fetcher.fetch_stock_list()
+        symbols = spot['代码'].astype(str).str.strip().tolist()
+
+        db = SessionLocal()
+        try:
+            latest = load_latest_bars(db, symbols)
+            if _is_stale_snapshot(spot, latest, prev_trade_date):
+                logger.info(f"快照与 {prev_trade_date} 的数据一致，今天不是交易日，跳过快照更新")
+                return DownloadReport(total=len(symbols), empty=symbols, elapsed=time.monotonic() - start_time)
+
+            bars, fallback, suspended, current = build_snapshot_bars(spot, latest, trade_date, prev_trade_date)
+            report = DownloadReport(total=len(symbols), empty=suspended + current)
+            written = latest[latest['symbol'].isin(bars['symbol'])]
+            factor_changes = detect_factor_changes(spot, written, load_adjust_factors(db, written['symbol']),
+                                                   trade_date)
+            if factor_changes:
+                logger.info(f"快照识别到 {len(factor_changes)} 个代码除权除息，更新复权因子")
+
+            def record(result):
+                report.succeeded.extend(result.succeeded)
+                report.failed.update({symbol: f"入库失败: {reason}" for symbol, reason in result.failed.items()})
+
+            with WriteBehindBuffer(StockDailyData, max_symbols=self.batch_size, on_flush=record, db=db) as buffer:
+                for symbol, frame in bars.groupby('symbol', sort=False):
+                    buffer.add(symbol, frame, factor_changes.get(symbol))
+            record_fetch_status('stock', suspended, 'empty')
+            record_fetch_status('stock', report.failed, 'failed')
+            logger.info(f"快照生成 {trade_date} 日线 {len(bars)} 条，停牌 {len(suspended)} 个，"
+                        f"已是最新 {len(current)} 个，需补齐历史 {len(fallback)} 个")
+        finally:
+            db.close()
+
+        if fallback:
+            plan = FetchPlanner('stock', end_date=trade_date).plan(fallback, overlap_days=config.ADJUST_CHECK_DAYS)
+            history_report = IngestPipeline('stock').run(plan.jobs)
+            report.succeeded.extend(history_report.succeeded)
+            report.empty.extend(history_report.empty + plan.up_to_date)
+            report.failed.update(history_report.failed)
+
+        report.elapsed = time.monotonic() - start_time
+        logger.info(f"快照增量更新完成: {report.summary()}")
+        return report
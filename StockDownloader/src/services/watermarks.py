@@ -0,0 +1,233 @@
+# src/services/watermarks.py
+"""
+此模块维护每个代码的入库水位目录（ingest_watermark 表）。
+目录记录每个代码已入库的最早日期、最晚日期、记录数以及最近一次获取的时间和结果，
+由保存日线数据的同一个事务更新，因此增量更新、补全检查和数据新鲜度统计都只需按代码查询目录，
+不再对数千万行的日线表做聚合扫描。
+Authors: hovi.hyw & AI
+Date: 2026-10-18
+"""
+
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from ..core.logger import logger
+from ..database.models.index import IndexDailyData
+from ..database.models.stock import StockDailyData
+from ..database.models.watermark import IngestWatermark
+from ..database.session import session_scope
+from ..database.upsert import upsert_statement
+from ..utils.trading_calendar import get_trading_calendar
+from .bulk_loader import is_key_deferred
+
+# 数据类型 -> 日线模型
+_DAILY_MODELS = {
+    'stock': StockDailyData,
+    'index': IndexDailyData,
+}
+
+# 日线表名 -> 数据类型
+WATERMARK_KINDS = {model.__tablename__: kind for kind, model in _DAILY_MODELS.items()}
+
+# 单条 IN 查询包含的最大代码数
+_CHUNK_SIZE = 1000
+
+
+def _chunks(items):
+    for offset in range(0, len(items), _CHUNK_SIZE):
+        yield items[offset:offset + _CHUNK_SIZE]
+
+
+def load_watermarks(db, kind, symbols=None):
+    """
+    查询代码的入库水位。
+
+    Args:
+        db (Session): 数据库会话。
+        kind (str): 数据类型，'stock' 或 'index'。
+        symbols (list, optional): 代码列表，默认为全部代码。
+
+    Returns:
+        dict: 代码 -> (最早日期, 最晚日期, 记录数)，只包含已有数据的代码。
+    """
+    query = (
+        select(IngestWatermark.symbol, IngestWatermark.first_date, IngestWatermark.last_date, IngestWatermark.row_count)
+        .where(IngestWatermark.kind == kind, IngestWatermark.last_date.is_not(None))
+    )
+    if symbols is None:
+        return {symbol: (first, last, count) for symbol, first, last, count in db.execute(query)}
+    result = {}
+    for chunk in _chunks(list(symbols)):
+        rows = db.execute(query.where(IngestWatermark.symbol.in_(chunk)))
+        result.update({symbol: (first, last, count) for symbol, first, last, count in rows})
+    return result
+
+
+def _aggregate(db, model, symbols):
+    """从日线表统计代码的最早日期、最晚日期和记录数，按主键索引只扫描这些代码的数据。"""
+    result = {}
+    for chunk in _chunks(list(symbols)):
+        query = (
+            select(model.symbol, func.min(model.date), func.max(model.date), func.count())
+            .where(model.symbol.in_(chunk))
+            .group_by(model.symbol)
+        )
+        result.update({symbol: (first, last, count) for symbol, first, last, count in db.execute(query)})
+    return result
+
+
+def update_watermarks(db, model, frame, fetched_at=None):
+    """
+    在写入日线数据的同一事务中更新水位。不提交事务。
+    新数据全部在已有范围之后（或之前）时直接累加记录数；与已有范围重叠或目录中还没有该代码时，
+    按代码重新统计日线表，保证记录数准确。
+
+    Args:
+        db (Session): 已写入日线数据的数据库会话。
+        model: 日线数据模型类，StockDailyData 或 IndexDailyData。
+        frame (pandas.DataFrame): 刚写入的规范化日线数据，可以包含多个代码。
+        fetched_at (datetime, optional): 获取时间，默认为当前时间。
+
+    Returns:
+        int: 更新的代码数。
+    """
+    if frame is None or frame.empty:
+        return 0
+    kind = WATERMARK_KINDS[model.__tablename__]
+    fetched_at = fetched_at or datetime.now()
+    written = frame.groupby('symbol')['date'].agg(['min', 'max', 'count'])
+    existing = load_watermarks(db, kind, written.index.tolist())
+    # 批量导入推迟主键时表在导入前为空，直接按写入的数据累计，避免在没有索引的表上统计
+    deferred = is_key_deferred(model.__tablename__)
+
+    records = []
+    recount = []
+    for symbol, first, last, count in written.itertuples():
+        current = existing.get(symbol)
+        if current is None and not deferred:
+            recount.append(symbol)
+            continue
+        if current is not None:
+            current_first, current_last, current_count = current
+            if not deferred and first <= current_last and last >= current_first:
+                recount.append(symbol)
+                continue
+            first, last, count = min(first, current_first), max(last, current_last), current_count + count
+        records.append({'kind': kind, 'symbol': symbol, 'first_date': first, 'last_date': last,
+                        'row_count': int(count), 'last_fetch_at': fetched_at, 'last_status': 'ok'})
+
+    for symbol, (first, last, count) in _aggregate(db, model, recount).items():
+        records.append({'kind': kind, 'symbol': symbol, 'first_date': first, 'last_date': last,
+                        'row_count': count, 'last_fetch_at': fetched_at, 'last_status': 'ok'})
+    _upsert(db, records)
+    return len(records)
+
+
+def recount_watermarks(table_name, symbols):
+    """
+    从日线表重新统计这些代码的已入库范围和记录数，用于批量导入中断后删除重复行之后。
+
+    Args:
+        table_name (str): 日线表名。
+        symbols (list): 代码列表。
+
+    Returns:
+        int: 更新的代码数。
+    """
+    kind = WATERMARK_KINDS[table_name]
+    with session_scope() as db:
+        records = [{'kind': kind, 'symbol': symbol, 'first_date': first, 'last_date': last, 'row_count': count}
+                   for symbol, (first, last, count) in _aggregate(db, _DAILY_MODELS[kind], symbols).items()]
+        _upsert(db, records, columns=['first_date', 'last_date', 'row_count'])
+    logger.info(f"Recounted {len(records)} {kind} watermarks after removing duplicate rows")
+    return len(records)
+
+
+def _upsert(db, records, columns=None):
+    if not records:
+        return
+    statement = upsert_statement(db, IngestWatermark, columns)
+    if statement is None:
+        for record in records:
+            db.merge(IngestWatermark(**record))
+    else:
+        db.execute(statement, records)
+
+
+def record_fetch_status(kind, symbols, status, fetched_at=None):
+    """
+    记录没有写入数据的获取结果（无新数据或失败），不改变已入库范围。
+
+    Args:
+        kind (str): 数据类型，'stock' 或 'index'。
+        symbols (iterable): 代码列表。
+        status (str): 获取结果，'empty' 或 'failed'。
+        fetched_at (datetime, optional): 获取时间，默认为当前时间。
+    """
+    fetched_at = fetched_at or datetime.now()
+    records = [{'kind': kind, 'symbol': symbol, 'last_fetch_at': fetched_at, 'last_status': status}
+               for symbol in dict.fromkeys(symbols)]
+    if not records:
+        return
+    try:
+        with session_scope() as db:
+            _upsert(db, records, columns=['last_fetch_at', 'last_status'])
+    except Exception as e:
+        logger.warning(f"Failed to record {status} fetch status for {len(records)} {kind} symbols: {e}")
+
+
+def rebuild_watermarks(kind=None):
+    """
+    从日线表重新统计全部水位，用于首次创建目录或目录与日线表不一致时。会完整扫描日线表。
+
+    Args:
+        kind (str, optional): 数据类型，默认为全部类型。
+
+    Returns:
+        int: 写入的代码数。
+    """
+    total = 0
+    for item, model in _DAILY_MODELS.items():
+        if kind and item != kind:
+            continue
+        with session_scope() as db:
+            query = (
+                select(model.symbol, func.min(model.date), func.max(model.date), func.count())
+                .group_by(model.symbol)
+            )
+            records = [{'kind': item, 'symbol': symbol, 'first_date': first, 'last_date': last, 'row_count': count}
+                       for symbol, first, last, count in db.execute(query)]
+            _upsert(db, records, columns=['first_date', 'last_date', 'row_count'])
+        logger.info(f"Rebuilt {len(records)} {item} watermarks from {model.__tablename__}")
+        total += len(records)
+    return total
+
+
+def freshness_report(kind):
+    """
+    按水位目录统计数据新鲜度。
+
+    Args:
+        kind (str): 数据类型，'stock' 或 'index'。
+
+    Returns:
+        dict: 最近交易日、代码总数、已是最新和落后的代码数、最近一次获取失败的代码数以及最早的最晚日期。
+    """
+    latest_trading_day = get_trading_calendar().prev_trading_day(datetime.now().date(), inclusive=True)
+    with session_scope() as db:
+        base = select(func.count()).select_from(IngestWatermark).where(IngestWatermark.kind == kind)
+        total = db.execute(base).scalar()
+        current = db.execute(base.where(IngestWatermark.last_date >= latest_trading_day)).scalar() \
+            if latest_trading_day else 0
+        failed = db.execute(base.where(IngestWatermark.last_status == 'failed')).scalar()
+        oldest = db.execute(
+            select(func.min(IngestWatermark.last_date)).where(IngestWatermark.kind == kind)).scalar()
+    return {
+        'latest_trading_day': latest_trading_day,
+        'symbols': total,
+        'up_to_date': current,
+        'stale': total - current,
+        'last_fetch_failed': failed,
+        'oldest_last_date': oldest,
+    }
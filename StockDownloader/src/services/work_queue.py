@@ -0,0 +1,532 @@
+# src/services/work_queue.py
+"""
+此模块实现了基于数据库的入库任务队列和进度日志。
+每次全量下载或增量更新记录为一个任务（ingest_job 表），任务中每个代码的每个获取区间（头部、中间缺口、尾部）
+在 ingest_work 表中有一行进度记录：待处理、已领取、已完成或失败，以及领取次数和最近一次失败原因。
+入库流水线按批领取区间，每批完成后立即记录结果，进程中断后可以用 --resume <任务标识> 从中断处继续，
+只处理未完成的区间并重试失败的区间，最多重复处理中断时正在处理的一批。
+
+启用 config.WORK_QUEUE_ENABLED 时多个副本共享同一个任务：同一任务在所有副本上的标识相同，各副本幂等地提交
+自己规划出的获取任务，然后按批领取代码。PostgreSQL 上使用 SELECT ... FOR UPDATE SKIP LOCKED，多个副本同时领取时
+互不阻塞也不会重复。领取的代码带有租约，处理期间由后台线程定期续约；副本崩溃或被驱逐后租约到期，剩余代码由其他副本
+重新领取。增加副本数会缩短一轮任务的耗时，而不是成倍增加请求量和写入量。
+Authors: hovi.hyw & AI
+Date: 2026-10-18
+"""
+
+import math
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, delete, func, or_, select, tuple_, update
+
+from ..core.config import config
+from ..core.logger import logger
+from ..database.models.work import IngestJob, WorkItem
+from ..database.session import session_scope
+from ..database.upsert import upsert_statement
+from .bulk_loader import bulk_load, deferred_keys, mark_keys_deferred
+from .download_engine import DownloadReport
+from .pipeline import PIPELINE_KINDS, FetchJob, IngestPipeline
+from .concurrency_limiter import set_process_share as set_concurrency_share
+from .rate_limiter import set_process_share
+
+# 已结束的任务保留的天数
+_RETENTION_DAYS = 7
+
+# 等待其他副本完成时检查队列的最长间隔（秒）
+_POLL_SECONDS = 5
+
+# 多进程模式下协调进程输出进度的间隔（秒）
+_PROGRESS_SECONDS = 30
+
+
+def make_job_id(kind, mode, day):
+    """
+    生成任务标识。同一交易日的同类任务在所有副本上得到相同的标识。
+
+    Args:
+        kind (str): 数据类型，'stock' 或 'index'。
+        mode (str): 'download' 或 'update'。
+        day (date): 任务覆盖的最晚交易日。
+
+    Returns:
+        str: 任务标识，例如 stock-update-20261016。
+    """
+    return f"{kind}-{mode}-{day:%Y%m%d}"
+
+
+class WorkQueue:
+    """
+    一个入库任务的租约队列和进度日志。
+
+    Attributes:
+        job_id (str): 任务标识。
+        kind (str): 数据类型，'stock' 或 'index'。
+        shared (bool): 是否与其他副本共享任务。无论是否共享，其他进程持有的租约只在过期后才能重新领取，
+            中断的进程留下的已领取区间由 resume() 立即放回队列。
+        owner (str): 当前工作进程的标识。
+        batch_size (int): 每次领取的代码数。
+        lease_seconds (int): 租约时长（秒）。
+        max_attempts (int): 每个代码最多被领取的次数。
+    """
+
+    def __init__(self, job_id, kind, shared=None, batch_size=None, lease_seconds=None, max_attempts=None):
+        """
+        初始化WorkQueue实例。
+
+        Args:
+            job_id (str): 任务标识。
+            kind (str): 数据类型。
+            shared (bool, optional): 是否与其他副本共享任务，默认为 config.WORK_QUEUE_ENABLED。
+            batch_size (int, optional): 每次领取的代码数，默认为 config.WORK_QUEUE_BATCH_SIZE。
+            lease_seconds (int, optional): 租约时长（秒），默认为 config.WORK_QUEUE_LEASE_SECONDS。
+            max_attempts (int, optional): 每个代码最多被领取的次数，默认为 config.WORK_QUEUE_MAX_ATTEMPTS。
+        """
+        self.job_id = job_id
+        self.kind = kind
+        self.shared = config.WORK_QUEUE_ENABLED if shared is None else shared
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.batch_size = batch_size or config.WORK_QUEUE_BATCH_SIZE
+        self.lease_seconds = lease_seconds or config.WORK_QUEUE_LEASE_SECONDS
+        self.max_attempts = max_attempts or config.WORK_QUEUE_MAX_ATTEMPTS
+
+    def _stale_lease(self, now):
+        """租约已过期的代码。任务标识按日期生成，同一台机器上的两个进程可能处理同一任务，仍在续约的租约不能接手。"""
+        return (WorkItem.status == 'leased') & (WorkItem.lease_until < now)
+
+    def _set_job_status(self, db, status, **values):
+        db.execute(update(IngestJob).where(IngestJob.job_id == self.job_id)
+                   .values(status=status, updated_at=datetime.now(), **values))
+
+    def start(self, mode, jobs):
+        """
+        登记任务并把获取任务写入队列，每个获取区间一行：同一代码的头部、中间缺口和尾部区间分别记录进度。
+        计划是按库中缺口生成的，已结束（完成或失败）的区间再次出现在计划中说明仍有缺口，重新变为待领取；正在处理的区间保持不变。
+
+        Args:
+            mode (str): 'download' 或 'update'。
+            jobs (iterable[FetchJob]): 获取任务，同一代码可以有多个区间。
+
+        Returns:
+            int: 提交的任务数。
+        """
+        now = datetime.now()
+        records = [{
+            'job_id': self.job_id, 'symbol': job.symbol, 'kind': self.kind, 'name': job.name,
+            'start_date': job.start_date, 'end_date': job.end_date, 'overlap_until': job.overlap_until,
+            'status': 'pending', 'attempts': 0, 'updated_at': now,
+        } for job in {(job.symbol, job.start_date): job for job in jobs}.values()]
+        with session_scope() as db:
+            # 清理早已结束的任务
+            expired = (IngestJob.kind == self.kind) & (IngestJob.updated_at < now - timedelta(days=_RETENTION_DAYS))
+            db.execute(delete(WorkItem).where(WorkItem.job_id.in_(select(IngestJob.job_id).where(expired))))
+            db.execute(delete(IngestJob).where(expired))
+            db.execute(upsert_statement(db, IngestJob, ['status', 'updated_at', 'finished_at']), [{
+                'job_id': self.job_id, 'kind': self.kind, 'mode': mode, 'status': 'running',
+                'created_at': now, 'updated_at': now, 'finished_at': None,
+            }])
+            if records:
+                statement = upsert_statement(db, WorkItem, ['start_date', 'end_date', 'overlap_until', 'status',
+                                                            'attempts', 'updated_at'],
+                                             where=or_(WorkItem.status == 'done', WorkItem.status == 'failed'))
+                db.execute(statement, records)
+        logger.info(f"任务 {self.job_id} 提交 {len(records)} 个获取区间，中断后可使用 --resume {self.job_id} 继续")
+        return len(records)
+
+    def resume(self):
+        """
+        准备继续一个中断的任务：失败的区间重新变为待领取并清零领取次数；不共享任务时，
+        中断的进程留下的已领取区间也立即变为待领取。进度按区间记录，同一代码已完成的区间不会重复获取。
+
+        Returns:
+            int: 重新变为待领取的区间数。
+        """
+        requeue = WorkItem.status == 'failed'
+        if not self.shared:
+            requeue = requeue | (WorkItem.status == 'leased')
+        with session_scope() as db:
+            count = db.execute(
+                update(WorkItem).where(WorkItem.job_id == self.job_id, requeue)
+                .values(status='pending', owner=None, lease_until=None, attempts=0, updated_at=datetime.now())
+            ).rowcount
+            self._set_job_status(db, 'running', finished_at=None)
+        logger.info(f"继续任务 {self.job_id}，重新排队 {count} 个失败或中断的获取区间，进度 {self.counts()}")
+        return count
+
+    def claim(self, limit=None):
+        """
+        领取一批待处理的获取区间，包括租约已过期的区间。领取次数达到上限仍未完成的区间（包括多次被放回队列的区间）标记为失败。
+        同一批中每个代码最多领取一个区间（开始日期最早的），流水线按代码汇报的结果因此可以对应到唯一的区间，
+        同一代码的其他区间留在队列中由之后的批次领取。
+
+        Args:
+            limit (int, optional): 最多领取的区间数，默认为 batch_size。
+
+        Returns:
+            list[FetchJob]: 领取到的获取任务，队列中没有可领取的代码时返回空列表。
+        """
+        now = datetime.now()
+        with session_scope() as db:
+            db.execute(
+                update(WorkItem)
+                .where(WorkItem.job_id == self.job_id, or_(WorkItem.status == 'pending', self._stale_lease(now)),
+                       WorkItem.attempts >= self.max_attempts)
+                .values(status='failed', last_error='多次领取后仍未完成', owner=None, updated_at=now)
+            )
+            claimable = (WorkItem.job_id == self.job_id) & or_(WorkItem.status == 'pending', self._stale_lease(now))
+            # PostgreSQL 上跳过其他副本正在领取的行；SQLite 不支持行锁，由下面带条件的 UPDATE 保证不重复领取
+            candidates = db.execute(
+                select(WorkItem.symbol, WorkItem.start_date).where(claimable)
+                .order_by(WorkItem.symbol, WorkItem.start_date)
+                .limit(limit or self.batch_size).with_for_update(skip_locked=True)
+            ).all()
+            if not candidates:
+                return []
+            windows = list({symbol: (symbol, start_date) for symbol, start_date in reversed(candidates)}.values())
+            symbols = [symbol for symbol, _ in windows]
+            db.execute(
+                update(WorkItem)
+                .where(tuple_(WorkItem.symbol, WorkItem.start_date).in_(windows), claimable)
+                .values(status='leased', owner=self.owner, lease_until=now + timedelta(seconds=self.lease_seconds),
+                        attempts=WorkItem.attempts + 1, updated_at=now)
+            )
+            rows = db.execute(
+                select(WorkItem.symbol, WorkItem.start_date, WorkItem.end_date, WorkItem.name, WorkItem.overlap_until)
+                .where(WorkItem.job_id == self.job_id, WorkItem.symbol.in_(symbols),
+                       WorkItem.owner == self.owner, WorkItem.status == 'leased')
+            ).all()
+        return [FetchJob(symbol, start_date, end_date, name or "", overlap_until or "")
+                for symbol, start_date, end_date, name, overlap_until in rows]
+
+    def heartbeat(self):
+        """
+        为当前工作进程持有的全部租约续约。
+
+        Returns:
+            int: 续约的代码数。
+        """
+        now = datetime.now()
+        with session_scope() as db:
+            return db.execute(
+                update(WorkItem)
+                .where(WorkItem.job_id == self.job_id, WorkItem.owner == self.owner, WorkItem.status == 'leased')
+                .values(lease_until=now + timedelta(seconds=self.lease_seconds))
+            ).rowcount
+
+    def complete(self, report):
+        """
+        按处理结果结束一批区间的租约：成功和无新数据的区间标记为完成，失败的区间记录失败原因，其余区间放回队列。
+        每批中一个代码只有一个已领取的区间，按代码汇报的结果只更新该区间，不影响同一代码其他已完成的区间。
+
+        Args:
+            report (DownloadReport): 这批代码的处理结果。
+        """
+        now = datetime.now()
+        owned = (WorkItem.job_id == self.job_id) & (WorkItem.owner == self.owner) & (WorkItem.status == 'leased')
+        done = [symbol for symbol in dict.fromkeys(report.succeeded + report.empty) if symbol not in report.failed]
+        with session_scope() as db:
+            if done:
+                db.execute(update(WorkItem).where(owned, WorkItem.symbol.in_(done))
+                           .values(status='done', lease_until=None, last_error=None, updated_at=now))
+            if report.failed:
+                table = WorkItem.__table__
+                db.connection().execute(
+                    update(table)
+                    .where(table.c.job_id == self.job_id, table.c.owner == self.owner, table.c.status == 'leased',
+                           table.c.symbol == bindparam('failed_symbol'))
+                    .values(status='failed', lease_until=None, last_error=bindparam('error'), updated_at=now),
+                    [{'failed_symbol': symbol, 'error': str(reason)[:1000]} for symbol, reason in report.failed.items()]
+                )
+        # 没有处理结果的代码放回队列，之后重新领取
+        self.release()
+
+    def release(self):
+        """
+        放弃当前工作进程持有的全部租约，使这些代码可以立即被重新领取。
+
+        Returns:
+            int: 释放的代码数。
+        """
+        with session_scope() as db:
+            return db.execute(
+                update(WorkItem)
+                .where(WorkItem.job_id == self.job_id, WorkItem.owner == self.owner, WorkItem.status == 'leased')
+                .values(status='pending', owner=None, lease_until=None, updated_at=datetime.now())
+            ).rowcount
+
+    def active_leases(self):
+        """
+        统计其他副本持有且尚未过期的租约数。不共享任务时始终为 0。
+
+        Returns:
+            int: 代码数。
+        """
+        if not self.shared:
+            return 0
+        with session_scope() as db:
+            return db.execute(
+                select(func.count()).select_from(WorkItem)
+                .where(WorkItem.job_id == self.job_id, WorkItem.status == 'leased',
+                       WorkItem.lease_until >= datetime.now())
+            ).scalar()
+
+    def counts(self):
+        """
+        统计任务中各状态的获取区间数。
+
+        Returns:
+            dict: 状态 -> 获取区间数。
+        """
+        with session_scope() as db:
+            rows = db.execute(
+                select(WorkItem.status, func.count()).where(WorkItem.job_id == self.job_id).group_by(WorkItem.status)
+            )
+            return dict(rows.all())
+
+    def finish(self, interrupted=False):
+        """
+        按进度日志更新任务状态：全部区间完成为 done，有失败区间为 failed，本进程异常退出且不共享任务时为 interrupted。
+
+        Args:
+            interrupted (bool): 本进程是否因异常退出。
+
+        Returns:
+            dict: 状态 -> 获取区间数。
+        """
+        counts = self.counts()
+        with session_scope() as db:
+            if interrupted:
+                if not self.shared:
+                    self._set_job_status(db, 'interrupted')
+            elif not counts.get('pending') and not counts.get('leased'):
+                self._set_job_status(db, 'failed' if counts.get('failed') else 'done',
+                                     total=sum(counts.values()), finished_at=datetime.now())
+        return counts
+
+    def _keep_alive(self, stop):
+        interval = max(1.0, self.lease_seconds / 3)
+        while not stop.wait(interval):
+            try:
+                self.heartbeat()
+            except Exception as e:
+                logger.warning(f"任务 {self.job_id} 续约失败: {e}")
+
+
+def run_queue(work_queue, pipeline):
+    """
+    循环领取一批代码交给流水线处理，每批完成后记录进度。队列中没有可领取的代码时，
+    等待其他副本持有的租约完成或过期后再结束。
+
+    Args:
+        work_queue (WorkQueue): 任务队列。
+        pipeline (IngestPipeline): 入库流水线。
+
+    Returns:
+        DownloadReport: 本进程处理的代码的结果汇总。
+    """
+    start_time = time.monotonic()
+    report = DownloadReport()
+    stop = threading.Event()
+    keeper = threading.Thread(target=work_queue._keep_alive, args=(stop,), name=f"{work_queue.job_id}-lease",
+                              daemon=True)
+    keeper.start()
+    try:
+        while True:
+            batch = work_queue.claim()
+            if not batch:
+                if not work_queue.active_leases():
+                    break
+                # 其他副本仍在处理，等待其完成或租约过期后接手
+                time.sleep(min(_POLL_SECONDS, max(1.0, work_queue.lease_seconds / 3)))
+                continue
+            batch_report = pipeline.run(batch)
+            work_queue.complete(batch_report)
+            report.total += len(batch)
+            report.succeeded.extend(batch_report.succeeded)
+            report.empty.extend(batch_report.empty)
+            report.failed.update(batch_report.failed)
+    except BaseException:
+        work_queue.release()
+        work_queue.finish(interrupted=True)
+        raise
+    finally:
+        stop.set()
+        keeper.join()
+    counts = work_queue.finish()
+    report.elapsed = time.monotonic() - start_time
+    logger.info(f"任务 {work_queue.job_id} 本进程处理完成: {report.summary()}，进度 {counts}")
+    return report
+
+
+def _merge(report, other):
+    report.total += other.total
+    report.succeeded.extend(other.succeeded)
+    report.empty.extend(other.empty)
+    report.failed.update(other.failed)
+
+
+def ingest_processes():
+    """
+    获取入库工作进程数。
+
+    Returns:
+        int: config.INGEST_PROCESSES，为 0 时使用全部 CPU 核数。
+    """
+    return max(1, config.INGEST_PROCESSES or os.cpu_count() or 1)
+
+
+def _init_worker(processes, deferred):
+    """工作进程初始化：分担本副本的限流额度和并发上限，并继承协调进程推迟主键的状态。"""
+    set_process_share(processes)
+    set_concurrency_share(processes)
+    mark_keys_deferred(deferred)
+
+
+def _run_worker(job_id, kind, pipeline_options):
+    """工作进程入口：使用本进程的数据源和数据库引擎，与同一副本的其他工作进程按租约领取代码。"""
+    return run_queue(WorkQueue(job_id, kind, shared=True), IngestPipeline(kind, **pipeline_options))
+
+
+def run_queue_in_processes(work_queue, processes, **pipeline_options):
+    """
+    由多个工作进程处理任务队列。工作进程以 spawn 方式启动，各自创建数据源和数据库引擎，
+    在同一个任务中按批领取代码；当前进程作为协调进程定期输出进度并汇总各进程的结果。
+    获取线程数和限流额度在工作进程之间平分，整个副本的并发请求数和请求速率与单进程时相同，
+    响应解析和数据规范化则分布到多个 CPU 核上。
+
+    Args:
+        work_queue (WorkQueue): 已提交获取任务的任务队列。
+        processes (int): 工作进程数。
+        **pipeline_options: 传给 IngestPipeline 的参数。
+
+    Returns:
+        DownloadReport: 所有工作进程处理结果的汇总。
+    """
+    start_time = time.monotonic()
+    report = DownloadReport()
+    options = dict(pipeline_options)
+    options.setdefault('fetch_workers', max(1, math.ceil(config.MAX_THREADS / processes)))
+    logger.info(f"任务 {work_queue.job_id} 使用 {processes} 个工作进程，每个进程 {options['fetch_workers']} 个获取线程")
+    try:
+        with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(processes, deferred_keys())) as pool:
+            futures = [pool.submit(_run_worker, work_queue.job_id, work_queue.kind, options)
+                       for _ in range(processes)]
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=_PROGRESS_SECONDS, return_when=FIRST_EXCEPTION)
+                if pending:
+                    logger.info(f"任务 {work_queue.job_id} 进度: {work_queue.counts()}")
+            for future in futures:
+                try:
+                    _merge(report, future.result())
+                except Exception as e:
+                    logger.error(f"任务 {work_queue.job_id} 的工作进程异常退出: {e}")
+    except BaseException:
+        work_queue.finish(interrupted=True)
+        raise
+    # 工作进程异常退出时留下的代码由协调进程在租约过期后处理
+    remaining = work_queue.counts()
+    if remaining.get('pending') or remaining.get('leased'):
+        _merge(report, run_queue(WorkQueue(work_queue.job_id, work_queue.kind, shared=True),
+                                 IngestPipeline(work_queue.kind, **pipeline_options)))
+    counts = work_queue.finish()
+    report.elapsed = time.monotonic() - start_time
+    logger.info(f"任务 {work_queue.job_id} 多进程处理完成: {report.summary()}，进度 {counts}")
+    return report
+
+
+def drain(work_queue, **pipeline_options):
+    """
+    处理任务队列直到没有可领取的代码。config.INGEST_PROCESSES 大于 1 时使用多个工作进程，否则在当前进程内处理。
+
+    Args:
+        work_queue (WorkQueue): 任务队列。
+        **pipeline_options: 传给 IngestPipeline 的参数。
+
+    Returns:
+        DownloadReport: 处理结果汇总。
+    """
+    processes = ingest_processes()
+    if processes > 1:
+        return run_queue_in_processes(work_queue, processes, **pipeline_options)
+    return run_queue(work_queue, IngestPipeline(work_queue.kind, **pipeline_options))
+
+
+def run_jobs(kind, mode, jobs, day, **pipeline_options):
+    """
+    以任务的形式执行一轮获取任务，逐批记录进度。启用 config.WORK_QUEUE_ENABLED 时与其他副本分担。
+
+    Args:
+        kind (str): 数据类型，'stock' 或 'index'。
+        mode (str): 'download' 或 'update'。
+        jobs (list[FetchJob]): 获取任务。
+        day (date): 任务覆盖的最晚交易日，用于生成任务标识。
+        **pipeline_options: 传给 IngestPipeline 的参数。
+
+    Returns:
+        DownloadReport: 处理结果汇总。
+    """
+    work_queue = WorkQueue(make_job_id(kind, mode, day), kind)
+    work_queue.start(mode, jobs)
+    return drain(work_queue, **pipeline_options)
+
+
+def resume_job(job_id):
+    """
+    从进度日志继续一个中断的任务，不重新规划：只处理尚未完成的获取区间，并重试失败的区间。
+
+    Args:
+        job_id (str): 任务标识。
+
+    Returns:
+        DownloadReport: 处理结果汇总。
+
+    Raises:
+        ValueError: 如果任务不存在，则抛出此异常。
+    """
+    with session_scope() as db:
+        job = db.execute(select(IngestJob.kind, IngestJob.mode).where(IngestJob.job_id == job_id)).first()
+    if job is None:
+        raise ValueError(f"Unknown ingest job: {job_id}")
+    kind, mode = job
+    work_queue = WorkQueue(job_id, kind)
+    work_queue.resume()
+    download = mode == 'download'
+    # 与全量下载任务一致：独占写入时推迟索引维护
+    with bulk_load(PIPELINE_KINDS[kind][0]) if download and not work_queue.shared else nullcontext():
+        return drain(work_queue, bulk_load=download)
+
+
+def join_running_jobs(mode, day):
+    """
+    加入其他副本正在执行的共享任务，帮助处理剩余代码。只在启用 config.WORK_QUEUE_ENABLED 时生效，
+    由定时任务调度器在没有取得任务锁的副本上调用：获取锁的副本负责规划和提交任务，其他副本只领取代码。
+
+    Args:
+        mode (str): 'download' 或 'update'。
+        day (date): 任务覆盖的最晚交易日。
+
+    Returns:
+        DownloadReport: 本进程处理的代码的结果汇总，没有正在执行的任务时为空。
+    """
+    report = DownloadReport()
+    if not config.WORK_QUEUE_ENABLED:
+        return report
+    for kind in PIPELINE_KINDS:
+        job_id = make_job_id(kind, mode, day)
+        with session_scope() as db:
+            status = db.execute(select(IngestJob.status).where(IngestJob.job_id == job_id)).scalar()
+        if status != 'running':
+            continue
+        logger.info(f"加入其他副本正在执行的任务 {job_id}")
+        _merge(report, drain(WorkQueue(job_id, kind), bulk_load=mode == 'download'))
+    return report
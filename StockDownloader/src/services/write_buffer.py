@@ -0,0 +1,182 @@
+# src/services/write_buffer.py
+"""
+此模块实现了日线数据的写回缓冲区。
+规范化后的日线数据先在内存中按代码累积，行数、代码数或等待时间达到阈值时在一个事务中写入，
+把逐只提交的成千上万个小事务合并为少量大事务。写入失败时按代码用保存点隔离，
+出错的代码单独记为失败，不影响同批其他代码。缓冲区关闭或进程退出时保证写出剩余数据。
+Authors: hovi.hyw & AI
+Date: 2026-10-18
+"""
+
+import atexit
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+
+from ..core.config import config
+from ..core.logger import logger
+from ..database.session import SessionLocal
+from .data_saver import DataSaver
+
+# 尚未关闭的缓冲区，进程退出时写出剩余数据
+_open_buffers = weakref.WeakSet()
+
+
+@dataclass
+class FlushResult:
+    """
+    一次写出的结果。
+
+    Attributes:
+        succeeded (list): 写入成功的代码列表。
+        failed (dict): 写入失败的代码及其失败原因。
+        rows (int): 写入的记录数。
+    """
+    succeeded: list = field(default_factory=list)
+    failed: dict = field(default_factory=dict)
+    rows: int = 0
+
+
+class WriteBehindBuffer:
+    """
+    日线数据写回缓冲区。可以在多个线程间共享，所有操作都在内部锁中执行。
+
+    Attributes:
+        model: 日线数据模型类，StockDailyData 或 IndexDailyData。
+        max_rows (int): 缓冲的记录数达到该值时写出。
+        max_symbols (int): 缓冲的代码数达到该值时写出。
+        flush_interval (float): 距上次写出超过该秒数时写出。
+        bulk_load (bool): 是否使用 COPY 批量导入。
+    """
+
+    def __init__(self, model, max_rows=None, max_symbols=None, flush_interval=None, bulk_load=False,
+                 on_flush=None, db=None):
+        """
+        初始化WriteBehindBuffer实例。
+
+        Args:
+            model: 日线数据模型类。
+            max_rows (int, optional): 写出的记录数阈值，默认为 config.WRITE_BUFFER_MAX_ROWS。
+            max_symbols (int, optional): 写出的代码数阈值，默认为 config.BATCH_SIZE。
+            flush_interval (float, optional): 写出的时间间隔（秒），默认为 config.WRITE_BUFFER_FLUSH_SECONDS。
+            bulk_load (bool, optional): 是否使用 COPY 批量导入，仅对 PostgreSQL 生效。
+            on_flush (callable, optional): 每次写出后以 FlushResult 调用，用于汇总结果。
+            db (Session, optional): 数据库会话，默认新建一个会话并在关闭时释放。
+        """
+        self.model = model
+        self.max_rows = max_rows or config.WRITE_BUFFER_MAX_ROWS
+        self.max_symbols = max_symbols or config.BATCH_SIZE
+        self.flush_interval = config.WRITE_BUFFER_FLUSH_SECONDS if flush_interval is None else flush_interval
+        self.bulk_load = bulk_load
+        self._on_flush = on_flush
+        self._owns_session = db is None
+        self._db = db or SessionLocal()
+        self._saver = DataSaver(db=self._db)
+        self._frames = []
+        self._factors = {}
+        self._rows = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.RLock()
+        self._closed = False
+        _open_buffers.add(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def pending_rows(self):
+        return self._rows
+
+    def add(self, symbol, frame, factors=None):
+        """
+        缓冲一个代码的规范化日线数据，达到阈值时写出。
+
+        Args:
+            symbol (str): 代码。
+            frame (pandas.DataFrame): 规范化后的日线数据。
+            factors (pandas.DataFrame, optional): 该代码规范化后的完整复权因子序列，与日线数据一起写入并替换原有因子。
+
+        Returns:
+            FlushResult: 触发写出时返回写出结果，否则返回 None。
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Write buffer is closed")
+            self._frames.append((symbol, frame))
+            if factors is not None:
+                self._factors[symbol] = factors
+            self._rows += len(frame)
+            if self._rows >= self.max_rows or len(self._frames) >= self.max_symbols:
+                return self.flush()
+            return self.flush_if_due()
+
+    def flush_if_due(self):
+        """
+        距上次写出超过 flush_interval 秒时写出。上游空闲时由调用方定期调用。
+
+        Returns:
+            FlushResult: 触发写出时返回写出结果，否则返回 None。
+        """
+        with self._lock:
+            if self._frames and time.monotonic() - self._last_flush >= self.flush_interval:
+                return self.flush()
+            return None
+
+    def flush(self):
+        """
+        在一个事务中写出所有缓冲的数据。
+
+        Returns:
+            FlushResult: 写出结果。
+        """
+        with self._lock:
+            frames, self._frames, self._rows = self._frames, [], 0
+            factors, self._factors = self._factors, {}
+            self._last_flush = time.monotonic()
+            result = FlushResult()
+            if not frames:
+                return result
+            symbols = list(dict.fromkeys(symbol for symbol, _ in frames))
+            try:
+                result.rows, result.failed = self._saver.save_daily_frames_isolated(
+                    self.model, frames, bulk_load=self.bulk_load, factors=factors)
+            except Exception as e:
+                result.failed = {symbol: str(e) for symbol in symbols}
+            result.succeeded = [symbol for symbol in symbols if symbol not in result.failed]
+            logger.info(f"Flushed {result.rows} records for {len(result.succeeded)} symbols into "
+                        f"{self.model.__tablename__}" + (f", {len(result.failed)} failed" if result.failed else ""))
+            if self._on_flush:
+                self._on_flush(result)
+            return result
+
+    def close(self):
+        """
+        写出剩余数据并释放数据库会话。可以重复调用。
+
+        Returns:
+            FlushResult: 最后一次写出的结果。
+        """
+        with self._lock:
+            if self._closed:
+                return FlushResult()
+            try:
+                return self.flush()
+            finally:
+                self._closed = True
+                _open_buffers.discard(self)
+                if self._owns_session:
+                    self._db.close()
+
+
+@atexit.register
+def _flush_open_buffers():
+    """进程退出前写出所有未关闭缓冲区中的数据。"""
+    for buffer in list(_open_buffers):
+        try:
+            buffer.close()
+        except Exception as e:
+            logger.error(f"Failed to flush write buffer for {buffer.model.__tablename__} on shutdown: {e}")
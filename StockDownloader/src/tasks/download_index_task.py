@@ -6,14 +6,18 @@ Authors: hovi.hyw & AI
 Date: 2024-07-03
 """
 
-from datetime import datetime
+from contextlib import nullcontext
 
 import pandas as pd
 
 from ..core.config import config
 from ..core.logger import logger
+from ..database.models.index import IndexDailyData
 from ..services.data_fetcher import DataFetcher
 from ..services.data_saver import DataSaver
+from ..services.bulk_loader import bulk_load
+from ..services.fetch_planner import FetchPlanner
+from ..services.work_queue import run_jobs
 
 
 def format_index_code(symbol):
@@ -21,38 +25,15 @@ def format_index_code(symbol):
     return str(symbol).zfill(6)
 
 
-def download_index_data(symbol: str, name: str):
-    """
-    下载指定指数的日线数据，并保存到数据库。
-
-    Args:
-        symbol (str): 指数代码。
-        name (str): 指数名称
-    """
-    fetcher = DataFetcher()
-    saver = DataSaver()
-    formatted_symbol = format_index_code(symbol)
-    try:
-        index_data = fetcher.fetch_index_daily_data(
-            formatted_symbol,
-            config.START_DATE,
-            datetime.today().strftime("%Y%m%d")
-        )
-        if index_data is None:
-            logger.warning(f"未能获取到指数 {formatted_symbol}({name}) 的数据")
-            return
-        saver.save_index_daily_data_to_db(index_data, formatted_symbol, name)
-        logger.info(f"指数 {formatted_symbol}({name}) 日数据下载并保存完成")
-    except Exception as e:
-        logger.error(f"处理指数 {formatted_symbol}({name}) 时出错: {e}")
-
-
 def download_all_index_data(update_only=False):
     """
     下载所有指数的日线数据，并保存到数据库。
     
     Args:
         update_only (bool, optional): 是否只更新最新数据。默认为False，表示下载全部历史数据。
+
+    Returns:
+        DownloadReport: 每个代码的下载或更新结果汇总，调用方据此判断是否有代码失败。
     """
     fetcher = DataFetcher()
     saver = DataSaver()
@@ -79,13 +60,18 @@ def download_all_index_data(update_only=False):
     if update_only:
         # 如果只更新最新数据，则调用update_index_data函数
         from .update_data_task import update_index_data
-        update_index_data()
-        logger.info("指数数据增量更新任务完成")
+        report = update_index_data()
+        logger.info(f"指数数据增量更新任务完成: {report.summary()}")
+        return report
     else:
-        # 否则下载全部历史数据
-        for _, row in index_list.iterrows():
-            symbol = row["代码"]
-            name = row["名称"]
-            download_index_data(symbol, name)
-
-        logger.info("所有指数数据下载任务完成")
\ No newline at end of file
+        # 否则按缺口规划，通过入库流水线并行下载库中缺失的历史数据
+        names = {format_index_code(symbol): name for symbol, name in zip(index_list["代码"], index_list["名称"])}
+        planner = FetchPlanner('index')
+        plan = planner.plan(list(names), names)
+        # 批量导入期间推迟索引维护，导入后统一重建并刷新统计信息。
+        # 启用任务队列时其他副本同时写入该表，不能推迟索引
+        with bulk_load(IndexDailyData) if not config.WORK_QUEUE_ENABLED else nullcontext():
+            report = run_jobs('index', 'download', plan.jobs, planner.end_date, bulk_load=True)
+        planner.record_listing_dates()
+        logger.info(f"所有指数数据下载任务完成: {report.summary()}")
+        return report
\ No newline at end of file
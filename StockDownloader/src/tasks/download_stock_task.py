@@ -6,35 +6,18 @@ Authors: hovi.hyw & AI
 Date: 2024-07-03
 """
 
-from datetime import datetime
+from contextlib import nullcontext
 
 import pandas as pd
 
 from ..core.config import config
 from ..core.logger import logger
+from ..database.models.stock import StockDailyData
 from ..services.data_fetcher import DataFetcher
 from ..services.data_saver import DataSaver
-
-
-def download_stock_task(symbol: str):
-    """
-    下载指定股票的日线数据，并保存到数据库。
-
-    Args:
-        symbol (str): 股票代码。
-    """
-    fetcher = DataFetcher()
-    saver = DataSaver()
-
-    try:
-        stock_data = fetcher.fetch_stock_daily_data(symbol, config.START_DATE, datetime.today().strftime("%Y%m%d"), 'hfq')
-        if stock_data is not None and not stock_data.empty:
-            saver.save_stock_daily_data_to_db(stock_data, symbol)
-            logger.info(f"股票 {symbol} 日数据下载并保存完成")
-        else:
-            logger.warning(f"未能获取到股票 {symbol} 的数据")
-    except Exception as e:
-        logger.error(f"下载股票 {symbol} 数据时出错: {e}")
+from ..services.bulk_loader import bulk_load
+from ..services.fetch_planner import FetchPlanner
+from ..services.work_queue import run_jobs
 
 
 def download_all_stock_data(update_only=False):
@@ -43,6 +26,9 @@ def download_all_stock_data(update_only=False):
     
     Args:
         update_only (bool, optional): 是否只更新最新数据。默认为False，表示下载全部历史数据。
+
+    Returns:
+        DownloadReport: 每个代码的下载或更新结果汇总，调用方据此判断是否有代码失败。
     """
     fetcher = DataFetcher()
     saver = DataSaver()
@@ -68,10 +54,17 @@ def download_all_stock_data(update_only=False):
     if update_only:
         # 如果只更新最新数据，则调用update_stock_data函数
         from .update_data_task import update_stock_data
-        update_stock_data()
-        logger.info("股票数据增量更新任务完成")
+        report = update_stock_data()
+        logger.info(f"股票数据增量更新任务完成: {report.summary()}")
+        return report
     else:
-        # 否则下载全部历史数据
-        for symbol in stock_list["代码"]:
-            download_stock_task(symbol)
-        logger.info("所有股票数据下载任务完成")
\ No newline at end of file
+        # 否则按缺口规划，通过入库流水线并行下载库中缺失的历史数据
+        planner = FetchPlanner('stock')
+        plan = planner.plan(stock_list["代码"].astype(str).tolist())
+        # 批量导入期间推迟索引维护，导入后统一重建并刷新统计信息。
+        # 启用任务队列时其他副本同时写入该表，不能推迟索引
+        with bulk_load(StockDailyData) if not config.WORK_QUEUE_ENABLED else nullcontext():
+            report = run_jobs('stock', 'download', plan.jobs, planner.end_date, bulk_load=True)
+        planner.record_listing_dates()
+        logger.info(f"所有股票数据下载任务完成: {report.summary()}")
+        return report
\ No newline at end of file
@@ -1,24 +1,33 @@
 # src/tasks/scheduled_tasks.py
 """
-此模块负责定时任务的调度和执行。
-包括在交易日的特定时间执行股票列表下载任务。
+此模块定义了服务运行期间的定时任务。
+交易日 09:26 下载股票列表，收盘后增量更新股票和指数日线，由交易日历驱动的调度器统一触发、补跑和加锁。
 Authors: hovi.hyw & AI
 Date: 2024-07-03
 """
 
-import threading
-import time
-from datetime import datetime
+from datetime import timedelta
 
+from ..core.config import config
 from ..core.logger import logger
 from ..services.data_fetcher import DataFetcher
 from ..services.data_saver import DataSaver
-from ..utils.trading_calendar import is_trading_day, get_stock_list_filepath_with_datetime
+from ..services.scheduler import ScheduledJob, Scheduler, parse_time_of_day
+from ..services.work_queue import join_running_jobs
+from ..utils.trading_calendar import get_stock_list_filepath_with_datetime
+from .download_index_task import download_all_index_data
+from .download_stock_task import download_all_stock_data
 
 
-def download_stock_list_task():
+def download_stock_list_task(run_at=None):
     """
     下载股票列表并保存为带有日期时间的文件名。
+
+    Args:
+        run_at (datetime, optional): 触发时间，由调度器传入。
+
+    Returns:
+        bool: 成功返回 True，失败返回 False。
     """
     try:
         logger.info("开始执行股票列表下载任务...")
@@ -44,52 +53,75 @@ def download_stock_list_task():
         saver.save_stock_list_to_csv(stock_list, standard_path)
         
         logger.info(f"股票列表下载任务执行完成，已保存到 {file_path}")
+        return True
     except Exception as e:
         logger.error(f"股票列表下载任务执行失败: {e}")
+        return False
 
 
-def check_and_execute_task():
-    """
-    检查当前是否是交易日的9:26，如果是则执行下载任务。
+def daily_update_task(run_at=None):
     """
-    now = datetime.now()
-    current_time = now.time()
-    
-    # 检查是否是交易日
-    if is_trading_day():
-        # 检查是否是上午9:26
-        target_time = datetime.strptime("09:26", "%H:%M").time()
-        
-        # 允许1分钟的误差范围
-        time_diff_seconds = abs(
-            (current_time.hour * 3600 + current_time.minute * 60 + current_time.second) - 
-            (target_time.hour * 3600 + target_time.minute * 60)
-        )
-        
-        if time_diff_seconds <= 60:  # 在目标时间的1分钟内
-            download_stock_list_task()
+    收盘后增量更新股票和指数日线数据。
 
+    Args:
+        run_at (datetime, optional): 触发时间，由调度器传入。
 
-def run_scheduled_tasks():
+    Returns:
+        bool: 股票和指数都更新成功返回 True；任一更新出错或有代码更新失败时返回 False，调度器记录为失败。
     """
-    定期运行任务检查。
-    每分钟检查一次是否需要执行任务。
-    """
-    while True:
+    succeeded = True
+    # 股票更新失败时仍然更新指数，两者互不影响
+    for label, task in (("股票", download_all_stock_data), ("指数", download_all_index_data)):
         try:
-            check_and_execute_task()
+            report = task(update_only=True)
         except Exception as e:
-            logger.error(f"任务检查执行失败: {e}")
-        
-        # 每分钟检查一次
-        time.sleep(60)
+            logger.error(f"{label}日线增量更新失败: {e}")
+            succeeded = False
+            continue
+        if report.failed:
+            logger.error(f"{label}日线增量更新有 {len(report.failed)} 个代码失败: {report.summary()}")
+            succeeded = False
+    return succeeded
+
+
+def assist_daily_update(run_at):
+    """
+    其他副本执行增量更新时，加入其共享的入库任务。
+
+    Args:
+        run_at (datetime): 触发时间。
+    """
+    join_running_jobs('update', run_at.date())
+
+
+def stock_list_job():
+    """交易日开盘集合竞价结束后下载股票列表，补跑窗口内仍然有效。"""
+    return ScheduledJob(
+        name='stock_list',
+        at=parse_time_of_day(config.SCHEDULE_STOCK_LIST_TIME),
+        func=download_stock_list_task,
+        catch_up=timedelta(hours=2),
+        timeout=timedelta(minutes=10),
+    )
+
+
+def daily_update_job():
+    """交易日收盘后增量更新日线，下一个交易日开盘前都可以补跑。"""
+    return ScheduledJob(
+        name='daily_update',
+        at=parse_time_of_day(config.SCHEDULE_DAILY_UPDATE_TIME),
+        func=daily_update_task,
+        catch_up=timedelta(hours=16),
+        timeout=timedelta(hours=3),
+        assist=assist_daily_update,
+    )
 
 
 def start_scheduled_tasks():
     """
-    启动定时任务线程。
+    在后台启动定时任务调度器。
+
+    Returns:
+        Scheduler: 已启动的调度器。
     """
-    task_thread = threading.Thread(target=run_scheduled_tasks)
-    task_thread.daemon = True  # 设置为守护线程，主线程退出时自动结束
-    task_thread.start()
-    logger.info("定时任务调度器已启动")
\ No newline at end of file
+    return Scheduler([stock_list_job(), daily_update_job()]).start()
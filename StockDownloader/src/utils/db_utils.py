@@ -9,8 +9,10 @@ Date: 2024-07-03
 from sqlalchemy import inspect
 
 from ..core.logger import logger
-from ..database.session import engine
-from .init_db import init_database
+from ..database.session import Base, engine
+from ..services.bulk_loader import interrupted_loads
+from .init_db import init_database, mismatched_primary_keys
+from .partitions import ensure_partitions
 
 
 def check_database_initialized():
@@ -21,10 +23,16 @@ def check_database_initialized():
         bool: 如果数据库已初始化，则返回 True，否则返回 False。
     """
     inspector = inspect(engine)
-    # 检查必要的表是否存在
-    required_tables = {'daily_index', 'daily_stock'}  # 使用模型中定义的实际表名
     existing_tables = set(inspector.get_table_names())
-    return required_tables.issubset(existing_tables)
+    # 模型中定义的表和列都已存在、主键一致才算初始化完成，新增的表或列需要重新初始化
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            return False
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        if not {column.name for column in table.columns}.issubset(existing_columns):
+            return False
+    # 主键与模型不一致（模型变更）或批量导入中断后缺少主键、索引，也需要重新初始化
+    return not mismatched_primary_keys(inspector) and not interrupted_loads(inspector)
 
 
 def initialize_database_if_needed():
@@ -36,6 +44,8 @@ def initialize_database_if_needed():
         init_database()
     else:
         logger.info("数据库已初始化，跳过初始化步骤")
+        # 每次运行任务前补齐未来年份的分区，分区已存在时只有几次目录查询
+        ensure_partitions()
 
 
 if __name__ == '__main__':
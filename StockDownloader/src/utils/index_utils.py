@@ -7,8 +7,6 @@ Date: 2024-07-03
 """
 
 from sqlalchemy.orm import Session
-from sqlalchemy import create_engine, func
-from sqlalchemy.orm import sessionmaker
 
 from ..core.logger import logger
 from ..database.models.index import IndexDailyData
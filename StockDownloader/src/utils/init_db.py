@@ -1,7 +1,64 @@
 # scripts/init_db.py
-from sqlalchemy import inspect
+from sqlalchemy import inspect, text
 from ..database.session import engine, Base
+from ..database import models  # noqa: F401 注册所有模型
 from ..core.logger import logger
+from ..services.bulk_loader import repair_interrupted_loads
+from .partitions import ensure_partitions, unpartitioned_tables
+
+
+def add_missing_columns(inspector=None):
+    """为已存在的表补充模型中新增的可空列"""
+    inspector = inspector or inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                added.append(f"{table.name}.{column.name}")
+    if added:
+        logger.info(f"已为现有表添加新列: {added}")
+    return added
+
+
+# 主键变化后可以直接重建的表：只保存运行记录，丢弃后不影响行情数据
+_REBUILDABLE_TABLES = ('ingest_work',)
+
+
+def mismatched_primary_keys(inspector=None):
+    """找出主键列与模型不一致的已存在表，返回 表名 -> 数据库中现有的主键列"""
+    inspector = inspector or inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    mismatched = {}
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        current = inspector.get_pk_constraint(table.name).get('constrained_columns') or []
+        if list(current) != [column.name for column in table.primary_key.columns]:
+            mismatched[table.name] = current
+    return mismatched
+
+
+def rebuild_changed_tables(inspector=None):
+    """重建主键已变化的运行记录表"""
+    rebuilt = []
+    for name in mismatched_primary_keys(inspector):
+        if name not in _REBUILDABLE_TABLES:
+            continue
+        table = Base.metadata.tables[name]
+        table.drop(bind=engine)
+        table.create(bind=engine)
+        rebuilt.append(name)
+    if rebuilt:
+        logger.warning(f"以下表的主键已变化，已重建，其中未完成的任务无法继续: {rebuilt}")
+    return rebuilt
 
 
 def init_database():
@@ -21,9 +78,24 @@ def init_database():
             logger.info(f"以下表不存在，将创建这些表: {missing_tables}")
             Base.metadata.create_all(bind=engine)  # 创建缺失的表
             logger.info("数据库表创建成功！")
+            if 'ingest_watermark' in missing_tables:
+                # 新建的水位目录需要从已有日线数据统计一次
+                from ..services.watermarks import rebuild_watermarks
+                rebuild_watermarks()
+            if 'adjust_factor' in missing_tables and 'daily_stock' in existing_tables:
+                logger.info("复权因子表为新建，已入库股票在下次按代码获取日线时补齐因子，之前只能读取后复权价格")
+        add_missing_columns(inspector)
+        # 批量导入中断后日线表的主键和索引尚未恢复
+        repair_interrupted_loads(inspector)
+        rebuild_changed_tables(inspector)
+        # PostgreSQL 上补齐日线表的年度分区
+        ensure_partitions()
+        legacy_tables = unpartitioned_tables()
+        if legacy_tables:
+            logger.warning(f"日线表 {legacy_tables} 仍未分区，可执行 python -m StockDownloader.src.utils.partitions 进行转换")
     except Exception as e:
         logger.error(f"创建数据库表时发生错误: {str(e)}")
         raise
 
 if __name__ == '__main__':
-    init_database()
\ No newline at end of file
+    init_database()
@@ -0,0 +1,175 @@
+# src/utils/partitions.py
+"""
+此模块管理 PostgreSQL 上日线表的按年范围分区。
+daily_stock 和 daily_index 在 PostgreSQL 上以 RANGE (date) 方式分区，每年一个分区，
+另有一个 DEFAULT 分区接收范围之外的数据。ensure_partitions() 补齐从 config.START_DATE 所在年份
+到未来 config.PARTITION_YEARS_AHEAD 年的分区，可以重复执行；migrate_to_partitioned() 把旧版本创建的
+普通表转换为分区表。SQLite 不分区，这些函数直接返回。
+Authors: hovi.hyw & AI
+Date: 2026-10-18
+"""
+
+from datetime import date
+
+from sqlalchemy import inspect, text
+
+from ..core.config import config
+from ..core.logger import logger
+from ..database.models.index import IndexDailyData
+from ..database.models.stock import StockDailyData
+from ..database.session import engine
+
+# 按年分区的日线表
+PARTITIONED_MODELS = (StockDailyData, IndexDailyData)
+
+
+def partition_name(table_name, year):
+    return f"{table_name}_y{year}"
+
+
+def _is_postgresql():
+    return engine.dialect.name == "postgresql"
+
+
+def is_partitioned(conn, table_name):
+    """
+    判断表是否为分区表。
+
+    Args:
+        conn (Connection): 数据库连接。
+        table_name (str): 表名。
+
+    Returns:
+        bool: 是分区表时返回 True。
+    """
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"), {'name': table_name}).first() is not None
+
+
+def _existing_partitions(conn, table_name):
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :name AND pg_table_is_visible(p.oid)"),
+        {'name': table_name})
+    return {name for name, in rows}
+
+
+def _create_year_partition(conn, table_name, year):
+    """创建一年的分区。DEFAULT 分区中已有该年数据时，先把它们移入新分区。"""
+    name = partition_name(table_name, year)
+    default = f"{table_name}_default"
+    bounds = {'lo': date(year, 1, 1), 'hi': date(year + 1, 1, 1)}
+    misplaced = conn.execute(text(
+        f"SELECT 1 FROM {default} WHERE date >= :lo AND date < :hi LIMIT 1"), bounds).first() is not None
+    if not misplaced:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table_name} "
+            f"FOR VALUES FROM ('{bounds['lo']}') TO ('{bounds['hi']}')"))
+        return
+    # DEFAULT 分区包含新分区范围内的数据时不能直接创建分区
+    conn.execute(text(f"ALTER TABLE {table_name} DETACH PARTITION {default}"))
+    conn.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {table_name} FOR VALUES FROM ('{bounds['lo']}') TO ('{bounds['hi']}')"))
+    moved = conn.execute(text(
+        f"WITH moved AS (DELETE FROM {default} WHERE date >= :lo AND date < :hi RETURNING *) "
+        f"INSERT INTO {table_name} SELECT * FROM moved"), bounds)
+    conn.execute(text(f"ALTER TABLE {table_name} ATTACH PARTITION {default} DEFAULT"))
+    logger.info(f"Moved {moved.rowcount} rows of {year} from {default} into {name}")
+
+
+def ensure_partitions(years_ahead=None, conn=None):
+    """
+    补齐日线表的年度分区和 DEFAULT 分区。非 PostgreSQL 数据库或非分区表直接跳过。
+
+    Args:
+        years_ahead (int, optional): 预先创建的未来年份数，默认为 config.PARTITION_YEARS_AHEAD。
+        conn (Connection, optional): 数据库连接，默认新开一个事务。
+
+    Returns:
+        list: 新建的分区名。
+    """
+    if not _is_postgresql():
+        return []
+    if conn is None:
+        with engine.begin() as conn:
+            return ensure_partitions(years_ahead, conn)
+
+    years_ahead = config.PARTITION_YEARS_AHEAD if years_ahead is None else years_ahead
+    first_year = int(str(config.START_DATE)[:4])
+    last_year = date.today().year + years_ahead
+    created = []
+    for model in PARTITIONED_MODELS:
+        table_name = model.__tablename__
+        if not is_partitioned(conn, table_name):
+            continue
+        existing = _existing_partitions(conn, table_name)
+        default = f"{table_name}_default"
+        if default not in existing:
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {default} PARTITION OF {table_name} DEFAULT"))
+            created.append(default)
+        for year in range(first_year, last_year + 1):
+            name = partition_name(table_name, year)
+            if name not in existing:
+                _create_year_partition(conn, table_name, year)
+                created.append(name)
+    if created:
+        logger.info(f"Created {len(created)} daily table partitions up to {last_year}")
+    return created
+
+
+def migrate_to_partitioned(model):
+    """
+    把旧版本创建的普通日线表转换为按年分区的表。在一个事务中完成：重命名旧表 → 创建分区表和分区 →
+    复制数据 → 删除旧表。需要与旧表相当的额外磁盘空间，执行期间该表不可写入。
+
+    Args:
+        model: 日线数据模型类，StockDailyData 或 IndexDailyData。
+
+    Returns:
+        bool: 完成转换返回 True，无需转换返回 False。
+    """
+    if not _is_postgresql():
+        return False
+    table = model.__table__
+    legacy = f"{table.name}_unpartitioned"
+    with engine.begin() as conn:
+        if is_partitioned(conn, table.name) or not inspect(conn).has_table(table.name):
+            return False
+        logger.info(f"Migrating {table.name} to a partitioned table...")
+        primary_key = inspect(conn).get_pk_constraint(table.name).get('name')
+        conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {legacy}"))
+        if primary_key:
+            # 约束名与新表冲突，随旧表一起改名
+            conn.execute(text(f"ALTER TABLE {legacy} RENAME CONSTRAINT {primary_key} TO {legacy}_pkey"))
+        for index in inspect(conn).get_indexes(legacy):
+            conn.execute(text(f"ALTER INDEX {index['name']} RENAME TO {legacy}_{index['name']}"))
+        table.create(bind=conn)
+        ensure_partitions(conn=conn)
+        columns = ", ".join(column.name for column in table.columns)
+        result = conn.execute(text(f"INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {legacy}"))
+        conn.execute(text(f"DROP TABLE {legacy}"))
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"ANALYZE {table.name}"))
+    logger.info(f"Migrated {result.rowcount} rows of {table.name} into yearly partitions")
+    return True
+
+
+def unpartitioned_tables():
+    """
+    查询仍为普通表的日线表。
+
+    Returns:
+        list: 需要执行 migrate_to_partitioned() 的表名。
+    """
+    if not _is_postgresql():
+        return []
+    with engine.connect() as conn:
+        return [model.__tablename__ for model in PARTITIONED_MODELS
+                if inspect(conn).has_table(model.__tablename__) and not is_partitioned(conn, model.__tablename__)]
+
+
+if __name__ == '__main__':
+    for daily_model in PARTITIONED_MODELS:
+        migrate_to_partitioned(daily_model)
+    ensure_partitions()
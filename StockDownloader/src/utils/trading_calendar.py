@@ -1,36 +1,295 @@
 # src/utils/trading_calendar.py
 """
 此模块提供交易日历相关的工具函数。
-包括判断当前日期是否为交易日的函数。
+交易日历从新浪接口获取，保存到本地 CSV 文件和数据库 trade_calendar 表中，每天最多联网刷新一次。
+日期保存在有序数组中，判断交易日、序号映射为 O(1)，前后交易日与区间计算为 O(log n)，调度和缺口检测不再访问网络。
 Authors: hovi.hyw & AI
 Date: 2024-07-03
 """
 
-import akshare as ak
-import pandas as pd
-from datetime import datetime, time
+import bisect
 import os
+import threading
+from datetime import date, datetime, time
+
+import pandas as pd
+from sqlalchemy import insert, select
 
-from ..core.logger import logger
 from ..core.config import config
+from ..core.exceptions import DataFetchError
+from ..core.logger import logger
+
+
+def to_date(day):
+    """把 date、datetime、Timestamp 或 YYYYMMDD/YYYY-MM-DD 字符串转换为 date。"""
+    if day is None:
+        return date.today()
+    if isinstance(day, datetime):
+        return day.date()
+    if isinstance(day, date):
+        return day
+    return pd.Timestamp(day).date()
 
 
-def is_trading_day():
+class TradingCalendar:
+    """
+    交易日历。
+
+    Attributes:
+        file_path (str): 本地日历文件路径。
+    """
+
+    def __init__(self, file_path=None, provider=None):
+        """
+        初始化TradingCalendar实例。
+
+        Args:
+            file_path (str, optional): 本地日历文件路径，默认为 config.CACHE_PATH/trade_calendar.csv。
+            provider (DataProvider, optional): 数据源，默认为 config.DATA_PROVIDER 指定的共享数据源。
+        """
+        self.file_path = file_path or os.path.join(config.CACHE_PATH, "trade_calendar.csv")
+        self._provider = provider
+        self._lock = threading.RLock()
+        self._dates = []
+        self._day_numbers = []
+        self._ordinals = {}
+        self._loaded_on = None
+
+    def _set_dates(self, dates):
+        self._dates = sorted(set(dates))
+        self._day_numbers = [day.toordinal() for day in self._dates]
+        self._ordinals = {day: index for index, day in enumerate(self._dates)}
+
+    def _load_file(self, fresh_only):
+        if not os.path.exists(self.file_path):
+            return []
+        if fresh_only and date.fromtimestamp(os.path.getmtime(self.file_path)) != date.today():
+            return []
+        try:
+            return [day.date() for day in pd.to_datetime(pd.read_csv(self.file_path)['trade_date'])]
+        except Exception as e:
+            logger.warning(f"读取本地交易日历 {self.file_path} 失败: {e}")
+            return []
+
+    @staticmethod
+    def _load_db():
+        from ..database.models.calendar import TradeCalendar
+        from ..database.session import SessionLocal
+        db = SessionLocal()
+        try:
+            return list(db.execute(select(TradeCalendar.date)).scalars())
+        except Exception as e:
+            logger.warning(f"从数据库读取交易日历失败: {e}")
+            return []
+        finally:
+            db.close()
+
+    def _load_remote(self):
+        from ..services.fetch_executor import get_fetch_executor
+        from ..services.providers import get_provider
+        from ..services.rate_limiter import get_rate_limiter
+        provider = self._provider or get_provider()
+        try:
+            get_rate_limiter('tool_trade_date_hist_sina').acquire()
+            frame = get_fetch_executor().call(provider.tool_trade_date_hist_sina)
+            return [day.date() for day in pd.to_datetime(frame['trade_date'])]
+        except Exception as e:
+            logger.warning(f"联网获取交易日历失败: {e}")
+            return []
+
+    def _save(self, dates):
+        """把交易日历写入本地文件和数据库，只插入数据库中缺少的日期。"""
+        try:
+            os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+            pd.DataFrame({'trade_date': dates}).to_csv(self.file_path, index=False)
+        except Exception as e:
+            logger.warning(f"保存本地交易日历失败: {e}")
+
+        from ..database.models.calendar import TradeCalendar
+        from ..database.session import SessionLocal, engine
+        db = SessionLocal()
+        try:
+            TradeCalendar.__table__.create(bind=engine, checkfirst=True)
+            existing = set(db.execute(select(TradeCalendar.date)).scalars())
+            missing = [{'date': day} for day in dates if day not in existing]
+            if missing:
+                db.execute(insert(TradeCalendar), missing)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"保存交易日历到数据库失败: {e}")
+        finally:
+            db.close()
+
+    def _ensure_loaded(self):
+        """每天第一次使用时加载日历：当天的本地文件 → 网络 → 数据库 → 过期的本地文件。"""
+        today = date.today()
+        if self._loaded_on == today:
+            return
+        with self._lock:
+            if self._loaded_on == today:
+                return
+            dates = self._load_file(fresh_only=True)
+            if not dates:
+                dates = self._load_remote()
+                if dates:
+                    self._save(sorted(set(dates)))
+            if not dates:
+                dates = self._load_db() or self._load_file(fresh_only=False)
+            if not dates:
+                if self._dates:
+                    logger.warning("无法刷新交易日历，继续使用内存中的日历")
+                    dates = self._dates
+                else:
+                    raise DataFetchError("Trading calendar is unavailable")
+            self._set_dates(dates)
+            # 获取失败也不在当天重复联网
+            self._loaded_on = today
+            logger.info(f"交易日历已加载，共 {len(self._dates)} 个交易日，"
+                        f"范围 {self._dates[0]} 至 {self._dates[-1]}")
+
+    def reload(self):
+        """丢弃内存中的日历，下次使用时重新加载。"""
+        with self._lock:
+            self._loaded_on = None
+
+    def is_trading_day(self, day=None):
+        """
+        判断是否是交易日。
+
+        Args:
+            day (date|str, optional): 日期，默认为今天。
+
+        Returns:
+            bool: 是交易日返回 True。
+        """
+        self._ensure_loaded()
+        return to_date(day) in self._ordinals
+
+    def ordinal(self, day):
+        """
+        获取交易日在日历中的序号。
+
+        Args:
+            day (date|str): 日期。
+
+        Returns:
+            int: 从 0 开始的序号，非交易日返回 None。
+        """
+        self._ensure_loaded()
+        return self._ordinals.get(to_date(day))
+
+    def date_at(self, ordinal):
+        """
+        获取指定序号对应的交易日。
+
+        Args:
+            ordinal (int): 从 0 开始的序号。
+
+        Returns:
+            date: 交易日。
+        """
+        self._ensure_loaded()
+        return self._dates[ordinal]
+
+    def prev_trading_day(self, day=None, inclusive=False):
+        """
+        获取指定日期之前的最近一个交易日。
+
+        Args:
+            day (date|str, optional): 日期，默认为今天。
+            inclusive (bool): 为 True 时，如果当天就是交易日则返回当天。
+
+        Returns:
+            date: 交易日，日历范围之前返回 None。
+        """
+        self._ensure_loaded()
+        number = to_date(day).toordinal()
+        index = (bisect.bisect_right if inclusive else bisect.bisect_left)(self._day_numbers, number) - 1
+        return self._dates[index] if index >= 0 else None
+
+    def next_trading_day(self, day=None, inclusive=False):
+        """
+        获取指定日期之后的最近一个交易日。
+
+        Args:
+            day (date|str, optional): 日期，默认为今天。
+            inclusive (bool): 为 True 时，如果当天就是交易日则返回当天。
+
+        Returns:
+            date: 交易日，超出日历范围返回 None。
+        """
+        self._ensure_loaded()
+        number = to_date(day).toordinal()
+        index = (bisect.bisect_left if inclusive else bisect.bisect_right)(self._day_numbers, number)
+        return self._dates[index] if index < len(self._dates) else None
+
+    def _range(self, start, end):
+        lo = bisect.bisect_left(self._day_numbers, to_date(start).toordinal())
+        hi = bisect.bisect_right(self._day_numbers, to_date(end).toordinal())
+        return lo, max(lo, hi)
+
+    def trading_days_between(self, start, end):
+        """
+        获取区间内的所有交易日，包含两端。
+
+        Args:
+            start (date|str): 开始日期。
+            end (date|str): 结束日期。
+
+        Returns:
+            list[date]: 升序排列的交易日。
+        """
+        self._ensure_loaded()
+        lo, hi = self._range(start, end)
+        return self._dates[lo:hi]
+
+    def count_trading_days(self, start, end):
+        """
+        统计区间内的交易日数量，包含两端。
+
+        Args:
+            start (date|str): 开始日期。
+            end (date|str): 结束日期。
+
+        Returns:
+            int: 交易日数量。
+        """
+        self._ensure_loaded()
+        lo, hi = self._range(start, end)
+        return hi - lo
+
+
+_calendar = None
+_calendar_lock = threading.Lock()
+
+
+def get_trading_calendar():
+    """
+    获取进程内共享的交易日历。
+
+    Returns:
+        TradingCalendar: 共享的交易日历。
+    """
+    global _calendar
+    with _calendar_lock:
+        if _calendar is None:
+            _calendar = TradingCalendar()
+        return _calendar
+
+
+def is_trading_day(day=None):
     """
     判断今天是否是交易日。
-    
+
+    Args:
+        day (date|str, optional): 日期，默认为今天。
+
     Returns:
         bool: 如果今天是交易日，则返回 True，否则返回 False。
     """
     try:
-        # 获取最近的交易日历
-        today = datetime.today().strftime("%Y%m%d")
-        # 使用akshare获取交易日历
-        trade_date_df = ak.tool_trade_date_hist_sina()
-        # 将日期列转换为字符串格式
-        trade_date_df['trade_date'] = trade_date_df['trade_date'].astype(str).str.replace('-', '')
-        # 检查今天是否在交易日列表中
-        return today in trade_date_df['trade_date'].values
+        return get_trading_calendar().is_trading_day(day)
     except Exception as e:
         logger.error(f"判断交易日失败: {e}")
         # 如果无法确定，默认为非交易日